@@ -1,29 +1,12 @@
 '''A script that creates the home page for the dashboard.'''
 
-from os import environ as ENV
 from datetime import datetime, timedelta
 
 import pandas as pd
 import altair as alt
 import streamlit as st
-from dotenv import load_dotenv
 
-from psycopg2 import connect
-from psycopg2.extras import RealDictCursor
-from psycopg2.extensions import connection
-
-
-def get_db_connection(config) -> connection:
-    """Returns a connection to the database."""
-
-    return connect(
-        dbname=config["DB_NAME"],
-        user=config["DB_USER"],
-        password=config["DB_PASSWORD"],
-        host=config["DB_HOST"],
-        port=config["DB_PORT"],
-        cursor_factory=RealDictCursor
-    )
+from pages.functions import get_page_metrics
 
 
 def get_week_list() -> tuple:
@@ -55,126 +38,6 @@ def filter_dates(data_df: pd.DataFrame, dates: list, col: str) -> pd.DataFrame:
     return data_df
 
 
-def metric_games_yest(conn_: connection) -> pd.DataFrame:
-    """Returns a Data-frame of all the games from the yesterday."""
-
-    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT name, rating, price, release_date
-                    FROM game
-                    WHERE release_date = '{yesterday}';""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metric_games_two_days(conn_: connection) -> pd.DataFrame:
-    """Returns a Data-frame of all the games from the yesterday."""
-
-    yesterday = (datetime.now() - timedelta(days=2)).strftime('%Y-%m-%d')
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT name, rating, price, release_date
-                    FROM game
-                    WHERE release_date = '{yesterday}';""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metric_games_all(conn_: connection) -> pd.DataFrame:
-    """Returns a Data-frame of all the games from all time."""
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT name, rating, price, release_date
-                    FROM game;""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metrics_for_graphs_price(conn_: connection) -> pd.DataFrame:
-    """Returns a Data-frame of all the average prices for the last week."""
-    this_week_list = get_week_list()
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT AVG(price), release_date
-                    FROM game
-                    WHERE release_date in {this_week_list}
-                    GROUP BY release_date;""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metrics_for_graphs_count(conn_: connection) -> pd.DataFrame:
-    """Returns a Data-frame of all the number of games for the last week."""
-    this_week_list = get_week_list()
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT COUNT(name), release_date
-                    FROM game
-                    WHERE release_date in {this_week_list}
-                    GROUP BY release_date;""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metrics_for_graphs_rating(conn_: connection) -> pd.DataFrame:
-    """Returns a Data-frame of all the game ratings for the past week."""
-    this_week_list = get_week_list()
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT AVG(rating), release_date
-                    FROM game
-                    WHERE release_date in {this_week_list}
-                    GROUP BY release_date;""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metrics_for_graphs_tags(conn_: connection) -> pd.DataFrame:
-    """Returns a Data-frame of all the games tag data from the past week."""
-    this_week_list = get_week_list()
-
-    with conn_.cursor() as cur:
-        cur.execute(f"""SELECT t.tag_name, count(*) from tag AS t
-                    INNER JOIN game_tag_matching AS gt
-                    ON t.tag_id = gt.tag_id
-                    WHERE gt.game_id IN
-                    (SELECT game_id from game
-                    WHERE release_date IN {this_week_list})
-                    GROUP BY t.tag_name
-                    LIMIT 10;""")
-        tags_ = cur.fetchall()
-
-    return pd.DataFrame(tags_)
-
-
-def metrics_top_twenty(conn_: connection) -> pd.DataFrame:
-    """Returns a Data-frame of top rated the games from the last week. """
-    this_week_list = get_week_list()
-
-    with conn_.cursor() as cur:
-        cur.execute(f"""SELECT g.name, g.rating, g.price, d.developer_name, p.publisher_name, w.website_name
-                    FROM game as g
-                    JOIN developer as d
-                    ON g.developer_id = d.developer_id
-                    JOIN publisher as p
-                    on g.publisher_id = p.publisher_id
-                    JOIN website as w
-                    on g.website_id = w.website_id
-                    WHERE g.release_date in {this_week_list}
-                    AND g.rating IS NOT NULL
-                    ORDER BY rating DESC LIMIT 20;""")
-        tags_ = cur.fetchall()
-
-    return pd.DataFrame(tags_)
-
-
 def price_chart(data_df: pd.DataFrame, sorting: bool = True) -> alt.Chart:
     """"Generates a bar chart of average daily prices of games over their release dates."""
 
@@ -234,21 +97,20 @@ def make_tag_chart(data_df: pd.DataFrame, sorting=True) -> alt.Chart:
 
 if __name__ == "__main__":
 
-    load_dotenv()
-    conn = get_db_connection(ENV)
     week_list = list(get_week_list())
     st.set_page_config(page_title='GameScraper',
                        page_icon=":space_invader:", layout="wide")
 
-    top_twenty_games = metrics_top_twenty(conn).set_index(
-        pd.Index([str(i) for i in range(1, 21)]))
+    metrics = get_page_metrics(top_games=20)
+
+    top_twenty_games = metrics["top_games"]
 
-    tag_df = metrics_for_graphs_tags(conn)
+    tag_df = metrics["tags"]
     tags = tag_df["tag_name"].to_list()
 
-    price_df = metrics_for_graphs_price(conn)
-    count_df = metrics_for_graphs_count(conn)
-    rating_df = metrics_for_graphs_rating(conn)
+    price_df = metrics["price"]
+    count_df = metrics["count"]
+    rating_df = metrics["rating"]
 
     st.title("Welcome To GameScraper")
     st.write("---")
@@ -261,23 +123,23 @@ if __name__ == "__main__":
     on = st.toggle("Yesterday")
 
     if on:
-        metric_df = metric_games_yest(conn)
-        delta = metric_games_two_days(conn)
+        metric = metrics["headline"].loc["yesterday"]
+        delta = metrics["headline"].loc["two_days_ago"]
         st.write('Metrics For Yesterday:')
     else:
-        metric_df = metric_games_all(conn)
+        metric = metrics["headline"].loc["all"]
         st.write('Metrics For All Data:')
 
-    if not metric_df.empty:
+    if metric["games"]:
 
-        no_games = metric_df['name'].nunique()
-        avg_rating = metric_df['rating'].mean()
-        avg_price = metric_df['price'].mean()
+        no_games = metric["games"]
+        avg_rating = metric["avg_rating"]
+        avg_price = metric["avg_price"]
 
         if on:
-            no_games_delta = delta['name'].nunique()
-            avg_rating_delta = delta['rating'].mean()
-            avg_price_delta = delta['price'].mean()
+            no_games_delta = delta["games"]
+            avg_rating_delta = delta["avg_rating"]
+            avg_price_delta = delta["avg_price"]
     else:
         no_games = 0
         avg_rating = 0
@@ -288,7 +150,6 @@ if __name__ == "__main__":
             avg_rating_delta = 0
             avg_price_delta = 0
 
-    conn.close()
     if no_games == 0 and on:
         st.write("No New Games Released Yesterday")
 
@@ -0,0 +1,84 @@
+"""
+Measures how long the search page's in-memory index takes to suggest names
+as a search is typed. An index of generated titles is built without the
+database, then every prefix of a sample of titles is suggested, some with a
+typo, and the p50 and p99 latencies are printed in milliseconds.
+"""
+import argparse
+import random
+from statistics import quantiles
+from time import perf_counter
+
+from pages.search_index import SearchIndex
+
+
+WORDS = ["dark", "souls", "star", "valley", "legend", "quest", "dungeon", "space",
+         "farm", "simulator", "tactics", "chronicles", "hero", "night", "city",
+         "racing", "survival", "kingdom", "shadow", "empire", "island", "ghost",
+         "dragon", "rogue", "arena", "pixel", "cyber", "ancient", "frontier", "war"]
+
+
+def generate_titles(count: int, rng: random.Random) -> list[str]:
+    """Returns count distinct titles made of two to four words."""
+
+    titles = set()
+    while len(titles) < count:
+        words = rng.sample(WORDS, rng.randint(2, 4))
+        titles.add(" ".join(words).title() + f" {rng.randint(1, 9999)}")
+
+    return list(titles)
+
+
+def add_typo(text: str, rng: random.Random) -> str:
+    """Returns text with two neighbouring characters swapped."""
+
+    if len(text) < 2:
+        return text
+    i = rng.randrange(len(text) - 1)
+
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def get_searches(titles: list[str], samples: int, rng: random.Random) -> list[str]:
+    """Returns every prefix of a sample of titles, as they would be typed,
+    with a typo in one in five of them."""
+
+    searches = []
+    for title in rng.sample(titles, samples):
+        for end in range(1, len(title) + 1):
+            prefix = title[:end]
+            searches.append(add_typo(prefix, rng) if rng.random() < 0.2 else prefix)
+
+    return searches
+
+
+def main() -> None:
+    """Builds an index and prints its suggestion latencies."""
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    titles = generate_titles(args.games, rng)
+
+    start = perf_counter()
+    index = SearchIndex()
+    index.add(list(enumerate(titles, 1)))
+    print(f"Built an index of {len(titles)} games in {perf_counter() - start:.2f}s")
+
+    timings = []
+    for search in get_searches(titles, args.samples, rng):
+        start = perf_counter()
+        index.suggest(search)
+        timings.append((perf_counter() - start) * 1000)
+
+    percentiles = quantiles(timings, n=100)
+    print(f"{len(timings)} suggestions: p50 {percentiles[49]:.2f}ms, "
+          f"p99 {percentiles[98]:.2f}ms, max {max(timings):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
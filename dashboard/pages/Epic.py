@@ -1,31 +1,24 @@
 '''A script that creates the Epic games page for the dashboard.'''
 
-from os import environ as ENV
 import streamlit as st
-from dotenv import load_dotenv
 
-
-from pages.functions import (get_db_connection, get_week_list,
-                             make_tag_chart, metric_games_yest,
-                             metrics_for_graphs_count, metrics_for_graphs_price,
-                             metrics_for_graphs_tags, metrics_top_ten_epic, count_chart, price_chart,
-                             filter_dates, filter_tags, metric_games_all,
-                             metric_games_two_days)
+from pages.functions import (get_week_list, get_page_metrics,
+                             make_tag_chart, count_chart, price_chart,
+                             filter_dates, filter_tags)
 
 
 if __name__ == "__main__":
 
-    load_dotenv()
-    conn = get_db_connection(ENV)
     week_list = list(get_week_list())
+    metrics = get_page_metrics(3, rated_only=False)
 
-    top_ten_games = metrics_top_ten_epic(conn, 3)
+    top_ten_games = metrics["top_games"]
     top_ten_games = top_ten_games.drop('rating', axis=1)
-    tag_df = metrics_for_graphs_tags(conn, 3)
+    tag_df = metrics["tags"]
 
-    price_df = metrics_for_graphs_price(conn, 3)
+    price_df = metrics["price"]
 
-    count_df = metrics_for_graphs_count(conn, 3)
+    count_df = metrics["count"]
 
     tags = tag_df["tag_name"].to_list()
 
@@ -43,20 +36,20 @@ if __name__ == "__main__":
     on = st.toggle("Yesterday")
 
     if on:
-        metric_df = metric_games_yest(conn, 3)
-        delta = metric_games_two_days(conn, 3)
+        metric = metrics["headline"].loc["yesterday"]
+        delta = metrics["headline"].loc["two_days_ago"]
         st.write('Metrics For Yesterday:')
     else:
-        metric_df = metric_games_all(conn, 3)
+        metric = metrics["headline"].loc["all"]
         st.write('Metrics For All Data:')
 
-    if not metric_df.empty:
-        no_games = metric_df['name'].nunique()
+    if metric["games"]:
+        no_games = metric["games"]
 
-        avg_price = metric_df['price'].mean()
-        if on and not delta.empty:
-            no_games_delta = delta['name'].nunique()
-            avg_price_delta = delta['price'].mean()
+        avg_price = metric["avg_price"]
+        if on and delta["games"]:
+            no_games_delta = delta["games"]
+            avg_price_delta = delta["avg_price"]
 
         else:
             no_games_delta = 0
@@ -70,7 +63,6 @@ if __name__ == "__main__":
             no_games_delta = 0
             avg_rating_delta = 0
             avg_price_delta = 0
-    conn.close()
 
     if no_games == 0:
         st.write("No New Games Released Yesterday")
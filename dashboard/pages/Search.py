@@ -2,68 +2,173 @@
 for the search page on the dashboard.'''
 
 from os import environ as ENV
+
 import streamlit as st
 from dotenv import load_dotenv
 
-from psycopg2.extensions import connection
 from rapidfuzz.distance import DamerauLevenshtein
 from rapidfuzz.process import extractOne
 from rapidfuzz.utils import default_process
 
-from pages.functions import (get_db_connection)
+from pages.data import run_query
+from pages.search_index import get_search_index
 
 
-def get_name_list(conn: connection) -> list:
-    """Returns list of names of all games in the DB."""
+SEARCH_CANDIDATES = 20
+MAX_SUGGESTIONS = 10
+# The trigram index can only serve a prefix search of at least one trigram.
+MIN_SUGGESTION_LENGTH = 3
 
-    with conn.cursor() as cur:
-        cur.execute(""" SELECT name
-                    FROM game;""")
-        games = cur.fetchall()
 
-    return [row['name'] for row in games]
+def is_memory_backend() -> bool:
+    """Returns True if SEARCH_BACKEND picks the in-memory search index."""
 
+    return ENV.get("SEARCH_BACKEND") == "memory"
 
-def show_result(word: str, conn: connection):
-    """Returns name of the game found after fuzzy matching."""
 
-    games_list = get_name_list(conn)
+def has_suggestion_index() -> bool:
+    """Returns True unless SEARCH_BACKEND is "database", which keeps the
+    in-memory search index from being built at all."""
 
-    result = extractOne(str(word), games_list, scorer=DamerauLevenshtein.normalized_similarity,
-                        score_cutoff=0.8, processor=default_process)
+    return ENV.get("SEARCH_BACKEND") != "database"
 
-    if result:
 
-        return result[0]
-    return "Game not found"
+def get_candidates(word: str, limit: int = SEARCH_CANDIDATES) -> dict:
+    """Returns the names of the games most similar to a search, and the ids
+    of the games with each name, ranked in the database by trigram
+    similarity using the index on game.name."""
 
+    games = run_query("""SELECT name, array_agg(game_id ORDER BY game_id) AS game_ids
+                    FROM game
+                    WHERE name %% %s
+                    GROUP BY name
+                    ORDER BY similarity(name, %s) DESC
+                    LIMIT %s;""", (word, word, limit))
 
-def get_all_game_details(result: str, conn: connection):
-    """Returns dictionary containing all the details of the game found."""
+    return {row['name']: row['game_ids'] for row in games}
 
-    with conn.cursor() as cur:
-        cur.execute(f"""SELECT *
-                    FROM game as g
-                    JOIN developer as d
-                    ON g.developer_id = d.developer_id
-                    JOIN publisher as p
-                    on g.publisher_id = p.publisher_id
-                    WHERE name = '{result}';""")
-        game = cur.fetchone()
-        game_id = game['game_id']
 
-        cur.execute(f"""SELECT t.tag_name
-                    FROM tag AS t
-                    INNER JOIN game_tag_matching AS gt
-                    ON t.tag_id = gt.tag_id
-                    JOIN game as g
-                    ON g.game_id = gt.game_id
-                    WHERE g.game_id = {game_id};""")
-        game_tags = cur.fetchall()
+def show_result(word: str) -> tuple | None:
+    """Returns the name and game ids of the game found after fuzzy
+    matching the closest candidates from the database, or from the
+    in-memory index if SEARCH_BACKEND is "memory"."""
 
-        tags = [row['tag_name'] for row in game_tags]
+    if is_memory_backend():
+        index = get_search_index()
+        index.refresh()
+        name = index.search(str(word))
+        return (name, index.get_game_ids(name)) if name else None
 
-    return {"game_details": game, "game_tags": tags}
+    candidates = get_candidates(str(word))
+
+    result = extractOne(str(word), list(candidates), scorer=DamerauLevenshtein.normalized_similarity,
+                        score_cutoff=0.8, processor=default_process)
+
+    if result:
+
+        return result[0], candidates[result[0]]
+    return None
+
+
+def get_suggestions(word: str) -> dict:
+    """Returns the names suggested for a search, most recent first, and
+    the ids of the games with each name. They come from the in-memory index,
+    which is shared by every session and only reads newly loaded games, so
+    a search does not query the game table. If SEARCH_BACKEND is "database"
+    they are the names starting with the search instead, found with the
+    trigram index on game.name."""
+
+    if has_suggestion_index():
+        index = get_search_index()
+        index.refresh()
+        return {name: index.get_game_ids(name) for name in index.suggest(str(word))}
+
+    if len(word.strip()) < MIN_SUGGESTION_LENGTH:
+        return {}
+
+    pattern = word.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    games = run_query("""SELECT name, array_agg(game_id ORDER BY game_id) AS game_ids
+                    FROM game
+                    WHERE name ILIKE %s
+                    GROUP BY name
+                    ORDER BY MAX(game_id) DESC
+                    LIMIT %s;""", (pattern + "%", MAX_SUGGESTIONS))
+
+    return {row['name']: row['game_ids'] for row in games}
+
+
+def get_game_details(game_ids: list) -> list[dict]:
+    """Returns the details of several games in one query, in the order of
+    their ids, with each game's tags and platforms as lists."""
+
+    if not game_ids:
+        return []
+
+    return run_query("""SELECT g.game_id, g.name, g.description, g.price, g.release_date,
+                g.website_id, d.developer_name, p.publisher_name,
+                ARRAY(SELECT t.tag_name
+                      FROM game_tag_matching AS gt
+                      JOIN tag AS t
+                      ON t.tag_id = gt.tag_id
+                      WHERE gt.game_id = g.game_id
+                      ORDER BY t.tag_name) AS tags,
+                ARRAY(SELECT pl.platform_name
+                      FROM platform_assignment AS pa
+                      JOIN platform AS pl
+                      ON pl.platform_id = pa.platform_id
+                      WHERE pa.game_id = g.game_id
+                      ORDER BY pl.platform_name) AS platforms
+                FROM game as g
+                LEFT JOIN developer as d
+                ON g.developer_id = d.developer_id
+                LEFT JOIN publisher as p
+                on g.publisher_id = p.publisher_id
+                WHERE g.game_id = ANY(%s)
+                ORDER BY array_position(%s, g.game_id);""", (list(game_ids), list(game_ids)))
+
+
+def show_game(game: dict):
+    """Writes the details of a game to the page."""
+
+    st.text(f"Game Title: {game['name']}")
+    st.write(
+        f"Description: {game['description']}")
+
+    st.text(f"Price: {game['price']}")
+    st.text(
+        f"Developer Name: {game['developer_name']}")
+    st.text(
+        f"Publisher Name: {game['publisher_name']}")
+    st.text(
+        f"Release Date: {game['release_date'].strftime('%d/%m/%Y')}")
+    st.text(
+        "Platforms Available: ")
+    if game['website_id'] == 1:
+        st.text(
+            "Steam - https://store.steampowered.com/")
+    elif game['website_id'] == 2:
+        st.write("Good Old Games - https://www.gog.com/en/")
+    elif game['website_id'] == 3:
+        st.write(
+            "Epic Games - https://store.epicgames.com/en-US/")
+    else:
+        st.text("Missing")
+    st.text(f"Operating Systems: {', '.join(game['platforms']) or '-'}")
+    st.text("Genre/ Tags:")
+    st.write(' - '.join(game["tags"]))
+
+
+def show_results(name: str, game_ids: list):
+    """Writes the details of every game with a name to the page,
+    one for each store it is on."""
+
+    st.title("Search Result")
+    st.write("---")
+    st.subheader(f"Game Found: {name}")
+
+    for game in get_game_details(game_ids):
+        st.write("---")
+        show_game(game)
 
 
 if __name__ == "__main__":
@@ -89,52 +194,18 @@ if __name__ == "__main__":
         st.page_link("pages/Weekly_Report.py")
         st.write("---")
 
-    with st.form("main form", clear_on_submit=True):
-
-        search = st.text_input("Search Game:")
-        submit_button = st.form_submit_button(label='Submit')
-
-        if submit_button:
-            if not search:
-                st.write("Please Enter A Game To Search")
+    search = st.text_input("Search Game:")
+
+    if search:
+        suggestions = get_suggestions(search)
+        if suggestions:
+            name = st.selectbox("Suggestions:", list(suggestions), index=None,
+                                placeholder="Pick a game to see its details")
+            if name:
+                show_results(name, suggestions[name])
+        else:
+            result_ = show_result(search)
+            if result_:
+                show_results(*result_)
             else:
-                conn_ = get_db_connection(ENV)
-
-                result_ = show_result(search, conn_)
-                if result_ != "Game not found":
-                    details = get_all_game_details(result_, conn_)
-
-                    conn_.close()
-                    st.title("Search Result")
-                    st.write("---")
-                    st.subheader(f"Game Found: {result_}")
-                    st.text(f"Game Title: {details['game_details']['name']}")
-                    st.write(
-                        f"Description: {details['game_details']['description']}")
-
-                    st.text(f"Price: {details['game_details']['price']}")
-                    st.text(
-                        f"Developer Name: {details['game_details']['developer_name']}")
-                    st.text(
-                        f"Publisher Name: {details['game_details']['publisher_name']}")
-                    st.text(
-                        f"Release Date: {details['game_details']['release_date'].strftime('%d/%m/%Y')}")
-                    st.text(
-                        "Platforms Available: ")
-                    if details['game_details']['website_id'] == 1:
-                        st.text(
-                            "Steam - https://store.steampowered.com/")
-                    elif details['game_details']['website_id'] == 2:
-                        st.write("Good Old Games - https://www.gog.com/en/")
-                    elif details['game_details']['website_id'] == 3:
-                        st.write(
-                            "Epic Games - https://store.epicgames.com/en-US/")
-                    else:
-                        st.text("Missing")
-                    st.text("Genre/ Tags:")
-                    tags = ''
-                    for tag in details["game_tags"]:
-                        tags += ' - ' + tag
-                    st.write(tags[2:])
-                else:
-                    st.text(f"Game not found: {search}")
+                st.text(f"Game not found: {search}")
@@ -1,24 +1,17 @@
 '''A script that creates the Steam page for the dashboard.'''
 
-from os import environ as ENV
 import streamlit as st
-from dotenv import load_dotenv
 import pandas as pd
 
-from pages.functions import (get_db_connection, get_week_list,
-                             make_tag_chart, metric_games_yest,
-                             metrics_for_graphs_count, metrics_for_graphs_price,
-                             metrics_for_graphs_rating, metrics_for_graphs_tags,
-                             metrics_top_ten, rating_chart, count_chart, price_chart,
-                             filter_dates, filter_tags, metric_games_all,
-                             metric_games_two_days)
+from pages.functions import (get_week_list, get_page_metrics,
+                             make_tag_chart, rating_chart, count_chart, price_chart,
+                             filter_dates, filter_tags)
 
 
 if __name__ == "__main__":
 
-    load_dotenv()
-    conn = get_db_connection(ENV)
     week_list = list(get_week_list())
+    metrics = get_page_metrics(1)
 
     st.set_page_config(page_title='GameScraper',
                        page_icon=":space_invader:", layout="wide")
@@ -33,28 +26,28 @@ if __name__ == "__main__":
     on = st.toggle("Yesterday")
 
     if on:
-        metric_df = metric_games_yest(conn, 1)
-        delta = metric_games_two_days(conn, 1)
+        metric = metrics["headline"].loc["yesterday"]
+        delta = metrics["headline"].loc["two_days_ago"]
         st.write('Metrics For Yesterday:')
 
     else:
-        metric_df = metric_games_all(conn, 1)
+        metric = metrics["headline"].loc["all"]
         st.write('Metrics For All Data:')
 
-    top_ten_games = metrics_top_ten(conn, 1)
-    tag_df = metrics_for_graphs_tags(conn, 1)
+    top_ten_games = metrics["top_games"]
+    tag_df = metrics["tags"]
     tags = tag_df["tag_name"].to_list()
 
-    if not metric_df.empty:
+    if metric["games"]:
 
-        no_games = metric_df['name'].nunique()
-        avg_rating = metric_df['rating'].mean()
-        avg_price = metric_df['price'].mean()
+        no_games = metric["games"]
+        avg_rating = metric["avg_rating"]
+        avg_price = metric["avg_price"]
 
-        if on and not delta.empty:
-            no_games_delta = delta['name'].nunique()
-            avg_rating_delta = delta['rating'].mean()
-            avg_price_delta = delta['price'].mean()
+        if on and delta["games"]:
+            no_games_delta = delta["games"]
+            avg_rating_delta = delta["avg_rating"]
+            avg_price_delta = delta["avg_price"]
         else:
             no_games_delta = 0
             avg_rating_delta = 0
@@ -71,10 +64,9 @@ if __name__ == "__main__":
     if no_games == 0:
         st.write("No New Games Released")
 
-    price_df = metrics_for_graphs_price(conn, 1)
-    count_df = metrics_for_graphs_count(conn, 1)
-    rating_df = metrics_for_graphs_rating(conn, 1)
-    conn.close()
+    price_df = metrics["price"]
+    count_df = metrics["count"]
+    rating_df = metrics["rating"]
 
     if on:
         col1, col2, col3 = st.columns(3)
@@ -7,22 +7,7 @@ from dotenv import load_dotenv
 import streamlit as st
 from boto3 import client
 
-from psycopg2 import connect
-from psycopg2.extras import RealDictCursor, RealDictRow
-from psycopg2.extensions import connection
-
-
-def get_db_connection(config) -> connection:
-    """Returns a connection to the database."""
-
-    return connect(
-        dbname=config["DB_NAME"],
-        user=config["DB_USER"],
-        password=config["DB_PASSWORD"],
-        host=config["DB_HOST"],
-        port=config["DB_PORT"],
-        cursor_factory=RealDictCursor
-    )
+from pages.data import run_statement
 
 
 def verify_email(email_address: str, config):
@@ -42,26 +27,14 @@ def add_to_database(first_name: str, last_name: str, email: str) -> None:
     if email == '':
         raise ValueError('No email given!')
 
-    conn = get_db_connection(ENV)
-    with conn.cursor() as cur:
-
-        cur.execute("""INSERT INTO subscriber (first_name,last_name,email)
-                    VALUES (%s,%s,%s)""", (first_name, last_name, email))
-
-    conn.commit()
-    conn.close()
+    run_statement("""INSERT INTO subscriber (first_name,last_name,email)
+                VALUES (%s,%s,%s)""", (first_name, last_name, email))
 
 
 def remove_from_database(email: str) -> None:
     '''Removes a subscriber from the subscrber table in our database.'''
-    conn = get_db_connection(ENV)
-    with conn.cursor() as cur:
-
-        cur.execute("""DELETE FROM subscriber 
-                    WHERE email = (%s)""", (email,))
-
-    conn.commit()
-    conn.close()
+    run_statement("""DELETE FROM subscriber
+                WHERE email = (%s)""", (email,))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+"""The dashboard's data layer. Every page reads the database through
+run_query, which borrows a connection from one pool shared by every
+session, and caches each result by its query and parameters. Streamlit
+reruns a page on every widget interaction, so these reruns are served from
+the cache instead of reconnecting and querying again."""
+
+from os import environ as ENV
+from threading import BoundedSemaphore
+
+import streamlit as st
+from dotenv import load_dotenv
+from psycopg2 import OperationalError, InterfaceError
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+
+
+MAX_CONNECTIONS = 5
+# How long a query waits for a free connection before giving up.
+CONNECTION_TIMEOUT = 30
+# Cached results are kept for an hour, but a finished load changes the
+# data version, so new results are read as soon as it is noticed.
+QUERY_TTL = 3600
+VERSION_TTL = 60
+MAX_CACHED_QUERIES = 500
+
+
+@st.cache_resource
+def get_connection_pool() -> ThreadedConnectionPool:
+    """Returns the connection pool shared by every session."""
+
+    load_dotenv()
+
+    return ThreadedConnectionPool(
+        1, MAX_CONNECTIONS,
+        dbname=ENV["DB_NAME"],
+        user=ENV["DB_USER"],
+        password=ENV["DB_PASSWORD"],
+        host=ENV["DB_HOST"],
+        port=ENV["DB_PORT"],
+        cursor_factory=RealDictCursor
+    )
+
+
+@st.cache_resource
+def get_connection_slots() -> BoundedSemaphore:
+    """Returns a semaphore with a slot for each connection in the pool.
+    The pool raises PoolError when every connection is in use, so sessions
+    take a slot first and wait for one to come free instead."""
+
+    return BoundedSemaphore(MAX_CONNECTIONS)
+
+
+def execute(query: str, params: tuple | dict = None, fetch: bool = True,
+            commit: bool = False) -> list[dict]:
+    """Runs a query on a pooled connection and returns its rows as dicts.
+    Waits up to CONNECTION_TIMEOUT seconds for a connection, and raises
+    PoolError if none comes free. A connection that has been broken is
+    closed rather than returned to the pool."""
+
+    pool = get_connection_pool()
+    slots = get_connection_slots()
+    if not slots.acquire(timeout=CONNECTION_TIMEOUT):
+        raise PoolError("No database connection came free in time")
+
+    try:
+        conn = pool.getconn()
+        broken = False
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                rows = [dict(row) for row in cur.fetchall()] if fetch else []
+            if commit:
+                conn.commit()
+            else:
+                conn.rollback()
+        except (OperationalError, InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn, close=broken)
+    finally:
+        slots.release()
+
+    return rows
+
+
+@st.cache_data(ttl=VERSION_TTL, show_spinner=False)
+def get_data_version() -> int:
+    """Returns the id of the latest finished load, which changes whenever
+    the load step commits new games."""
+
+    rows = execute("""SELECT MAX(load_run_id) AS version FROM load_run;""")
+
+    return rows[0]["version"]
+
+
+@st.cache_data(ttl=QUERY_TTL, max_entries=MAX_CACHED_QUERIES, show_spinner=False)
+def _run_cached_query(query: str, params: tuple | dict, data_version: int) -> list[dict]:
+    """Returns the rows of a query, cached by the query, its parameters and
+    the data version it was read at."""
+
+    return execute(query, params)
+
+
+def run_query(query: str, params: tuple | dict = None) -> list[dict]:
+    """Returns the rows of a read-only query as dicts. Results are cached
+    until they expire or a new load finishes."""
+
+    return _run_cached_query(query, params, get_data_version())
+
+
+def run_statement(query: str, params: tuple | dict = None) -> None:
+    """Runs and commits a statement that changes the database."""
+
+    execute(query, params, fetch=False, commit=True)
@@ -1,37 +1,21 @@
 """A file to hold functions used across all pages"""
 
-from os import environ as ENV
 from datetime import datetime, timedelta
 
 import pandas as pd
 import altair as alt
-import streamlit as st
-from dotenv import load_dotenv
 
-from psycopg2 import connect
-from psycopg2.extras import RealDictCursor
-from psycopg2.extensions import connection
+from pages.data import run_query
+from pages.queries import PAGE_METRICS_QUERY
 
 
-def get_db_connection(config) -> connection:
-    """Returns a connection to the database."""
-
-    return connect(
-        dbname=config["DB_NAME"],
-        user=config["DB_USER"],
-        password=config["DB_PASSWORD"],
-        host=config["DB_HOST"],
-        port=config["DB_PORT"],
-        cursor_factory=RealDictCursor
-    )
-
-
-def get_week_list() -> tuple:
-    """Returns a tuple containing the dates 
-    of the last seven days (not including today)."""
+def get_week_list(days: int = 7) -> tuple:
+    """Returns a tuple containing the dates
+    of the last seven days (not including today),
+    or of the given number of days."""
     w_list = []
 
-    for each in range(1, 8):
+    for each in range(1, days + 1):
         day = datetime.now() - timedelta(days=each)
         w_list.append(day.strftime('%Y-%m-%d'))
 
@@ -53,149 +37,56 @@ def filter_dates(data_df: pd.DataFrame, dates: list, col: str) -> pd.DataFrame:
     return data_df
 
 
-def metric_games_yest(conn_: connection, id: int) -> pd.DataFrame:
-    """Returns a Data-frame of all the games from yesterday."""
-
-    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT name, rating, price, release_date
-                    FROM game
-                    WHERE website_id = '{id}' AND release_date = '{yesterday}';""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metric_games_two_days(conn_: connection, id: int) -> pd.DataFrame:
-    """Returns a Data-frame of all the games from two days ago."""
-
-    yesterday = (datetime.now() - timedelta(days=2)).strftime('%Y-%m-%d')
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT name, rating, price, release_date
-                    FROM game
-                    WHERE website_id = '{id}' AND release_date = '{yesterday}';""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metric_games_all(conn_: connection, id: int) -> pd.DataFrame:
-    """Returns a Data-frame of all the games from the yesterday."""
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT name, rating, price, release_date
-                    FROM game
-                    WHERE website_id = '{id}';""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metrics_for_graphs_price(conn_: connection, id: int) -> pd.DataFrame:
-    """Returns a Data-frame of all the average prices for the last week."""
-    w_list = get_week_list()
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT AVG(price), release_date
-                    FROM game
-                    WHERE website_id = '{id}' and release_date in {w_list}
-                    GROUP BY release_date;""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metrics_for_graphs_count(conn_: connection, id: int) -> pd.DataFrame:
-    """Returns a Data-frame of all the number of games for the last week."""
-    w_list = get_week_list()
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT COUNT(name), release_date
-                    FROM game
-                    WHERE website_id = '{id}' and release_date in {w_list}
-                    GROUP BY release_date;""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metrics_for_graphs_rating(conn_: connection, id: int) -> pd.DataFrame:
-    """Returns a Data-frame of all the game ratings for the past week."""
-    w_list = get_week_list()
-
-    with conn_.cursor() as cur:
-        cur.execute(f""" SELECT AVG(rating), release_date
-                    FROM game
-                    WHERE website_id = '{id}' and release_date in {w_list}
-                    GROUP BY release_date;""")
-        steam_games = cur.fetchall()
-
-    return pd.DataFrame(steam_games)
-
-
-def metrics_for_graphs_tags(conn_: connection, id: int) -> pd.DataFrame:
-    """Returns a Data-frame of all the games tag data from the past week."""
-    w_list = get_week_list()
-
-    with conn_.cursor() as cur:
-        cur.execute(f"""SELECT t.tag_name, count(*) from tag AS t 
-                    INNER JOIN game_tag_matching AS gt 
-                    ON t.tag_id = gt.tag_id 
-                    WHERE gt.game_id IN
-                        (SELECT game_id from game 
-                    WHERE website_id = '{id}' 
-                    AND release_date 
-                    IN {w_list}) 
-                    GROUP BY t.tag_name 
-                    LIMIT 10;""")
-        tag = cur.fetchall()
-
-    return pd.DataFrame(tag)
-
-
-def metrics_top_ten(conn_: connection, id: int) -> pd.DataFrame:
-    """Returns a Data-frame of top rated the games from the last week."""
-    w_list = (get_week_list())
-
-    with conn_.cursor() as cur:
-        cur.execute(f"""SELECT g.name, g.rating, g.price, d.developer_name, p.publisher_name
-    FROM game as g
-    JOIN developer as d
-    ON g.developer_id = d.developer_id
-    JOIN publisher as p
-    on g.publisher_id = p.publisher_id
-    WHERE g.website_id = '{id}' and g.release_date in {w_list}
-    AND g.rating IS NOT NULL
-    ORDER BY rating DESC LIMIT 10; """)
-        tags_ = cur.fetchall()
-
-        min_upper_bd = min(len(tags_) + 1, 11)
-
-    return pd.DataFrame(tags_).set_index(
-        pd.Index([str(i) for i in range(1, min_upper_bd)]))
-
-
-def metrics_top_ten_epic(conn_: connection, id: int) -> pd.DataFrame:
-    """Returns a Data-frame of top rated the games from the last week."""
-    w_list = (get_week_list())
-
-    with conn_.cursor() as cur:
-        cur.execute(f"""SELECT g.name, g.rating, g.price, d.developer_name, p.publisher_name
-    FROM game as g
-    JOIN developer as d
-    ON g.developer_id = d.developer_id
-    JOIN publisher as p
-    on g.publisher_id = p.publisher_id
-    WHERE g.website_id = '{id}' and g.release_date in {w_list}
-    ORDER BY rating DESC LIMIT 10; """)
-        tags_ = cur.fetchall()
-
-        min_upper_bd = min(len(tags_) + 1, 11)
-
-    return pd.DataFrame(tags_).set_index(
-        pd.Index([str(i) for i in range(1, min_upper_bd)]))
+HEADLINE_COLUMNS = {"games": "int64", "avg_rating": "float64", "avg_price": "float64"}
+TOP_GAME_COLUMNS = {"name": "string", "rating": "float64", "price": "float64",
+                    "developer_name": "string", "publisher_name": "string",
+                    "website_name": "string"}
+
+
+def get_page_metrics(website_id: int = None, window: int = 7,
+                     top_games: int = 10, rated_only: bool = True) -> dict[str, pd.DataFrame]:
+    """Returns every Data-frame a summary page shows, for one website or
+    for every website if website_id is None, read in a single query.
+    The graphs cover the last window days (not including today).
+
+    The keys are "headline" (the number of games and their average rating
+    and price, indexed by "yesterday", "two_days_ago" and "all"), "top_games" (the best rated games in the window,
+    numbered from 1), "tags" (the ten most common tags), and "price",
+    "count" and "rating" (one row per day)."""
+
+    yesterday, two_days_ago = get_week_list(2)
+    metrics = run_query(PAGE_METRICS_QUERY, {
+        "website_id": website_id,
+        "yesterday": yesterday,
+        "two_days_ago": two_days_ago,
+        "window": get_week_list(window),
+        "top_games": top_games,
+        "rated_only": rated_only})[0]["metrics"]
+
+    top_games_df = pd.DataFrame(metrics["top_games"], columns=list(TOP_GAME_COLUMNS)).astype(
+        TOP_GAME_COLUMNS)
+    if website_id is not None:
+        top_games_df = top_games_df.drop("website_name", axis=1)
+    top_games_df.index = pd.Index([str(i) for i in range(1, len(top_games_df) + 1)])
+
+    days_df = pd.DataFrame(metrics["days"],
+                           columns=["release_date", "count", "avg_price", "avg_rating"])
+    days_df["release_date"] = pd.to_datetime(days_df["release_date"])
+
+    headline_df = pd.DataFrame(metrics["headline"], columns=["scope", *HEADLINE_COLUMNS])
+    headline_df = headline_df.set_index("scope").astype(HEADLINE_COLUMNS)
+
+    return {
+        "headline": headline_df,
+        "top_games": top_games_df,
+        "tags": pd.DataFrame(metrics["tags"], columns=["tag_name", "count"]).astype(
+            {"tag_name": "string", "count": "int64"}),
+        "price": days_df[["avg_price", "release_date"]].rename(
+            columns={"avg_price": "avg"}).astype({"avg": "float64"}),
+        "count": days_df[["count", "release_date"]].astype({"count": "int64"}),
+        "rating": days_df[["avg_rating", "release_date"]].rename(
+            columns={"avg_rating": "avg"}).astype({"avg": "float64"}),
+    }
 
 
 def price_chart(data_df: pd.DataFrame, sorted_=True) -> alt.Chart:
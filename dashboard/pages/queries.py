@@ -0,0 +1,60 @@
+"""Queries the dashboard runs that are built from shared parts. They are
+kept apart from the pages, with nothing to import, so that
+database/check_query_plans.py can explain them without the dashboard's
+requirements."""
+
+
+# Every subquery filters on the website on its own, so the planner can use
+# an index for each of them.
+WEBSITE_FILTER = "(%(website_id)s IS NULL OR {table}website_id = %(website_id)s)"
+
+# The headline numbers for one scope of days. The averages are read from the
+# daily rollup, so only the distinct game count reads the game table, and
+# each scope comes back as a single row however many games it covers.
+HEADLINE_QUERY = """SELECT '{scope}' AS scope,
+            (SELECT COUNT(DISTINCT name) FROM game
+             WHERE {dates} AND {game_filter}) AS games,
+            SUM(s.rating_sum) / NULLIF(SUM(s.rating_count), 0) AS avg_rating,
+            SUM(s.price_sum) / NULLIF(SUM(s.game_count), 0) AS avg_price
+        FROM daily_game_stats AS s
+        WHERE {dates} AND {s_filter}"""
+
+# Each widget's rows are built as a JSON array, so the whole page comes back
+# as one row from one round trip.
+PAGE_METRICS_QUERY = """SELECT json_build_object(
+    'headline', (SELECT json_agg(h) FROM (
+        {yesterday}
+        UNION ALL {two_days_ago}
+        UNION ALL {all}) AS h),
+    'top_games', (SELECT COALESCE(json_agg(top), '[]') FROM (
+        SELECT g.name, g.rating, g.price, d.developer_name, p.publisher_name,
+               w.website_name
+        FROM game AS g
+        JOIN developer AS d ON g.developer_id = d.developer_id
+        JOIN publisher AS p ON g.publisher_id = p.publisher_id
+        JOIN website AS w ON g.website_id = w.website_id
+        WHERE g.release_date IN %(window)s AND {g_filter}
+        AND (NOT %(rated_only)s OR g.rating IS NOT NULL)
+        ORDER BY g.rating DESC LIMIT %(top_games)s) AS top),
+    'tags', (SELECT COALESCE(json_agg(tg), '[]') FROM (
+        SELECT t.tag_name, SUM(s.game_count) AS count
+        FROM daily_tag_stats AS s
+        JOIN tag AS t ON t.tag_id = s.tag_id
+        WHERE s.release_date IN %(window)s AND {s_filter}
+        GROUP BY t.tag_name ORDER BY count DESC LIMIT 10) AS tg),
+    'days', (SELECT COALESCE(json_agg(ds), '[]') FROM (
+        SELECT release_date, SUM(game_count) AS count,
+               SUM(price_sum) / SUM(game_count) AS avg_price,
+               SUM(rating_sum) / NULLIF(SUM(rating_count), 0) AS avg_rating
+        FROM daily_game_stats AS s
+        WHERE release_date IN %(window)s AND {s_filter}
+        GROUP BY release_date) AS ds)
+) AS metrics;""".format(**{scope: HEADLINE_QUERY.format(
+    scope=scope, dates=dates,
+    game_filter=WEBSITE_FILTER.format(table=""),
+    s_filter=WEBSITE_FILTER.format(table="s."))
+    for scope, dates in (("yesterday", "release_date = %(yesterday)s"),
+                         ("two_days_ago", "release_date = %(two_days_ago)s"),
+                         ("all", "TRUE"))},
+    g_filter=WEBSITE_FILTER.format(table="g."),
+    s_filter=WEBSITE_FILTER.format(table="s."))
@@ -0,0 +1,167 @@
+"""An in-memory fuzzy search index over game names, shared by every session
+of the search page. Names are normalised once when they are added, and an
+inverted index of their trigrams narrows each search down to a few
+candidates before they are scored. The index only fetches games added
+since it was last refreshed, so a search never reads the whole table.
+
+The normalised names are also kept in a sorted array, so suggestions for
+a search that is still being typed are found by bisecting for its prefix."""
+
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+from threading import Lock
+
+import streamlit as st
+from rapidfuzz.distance import DamerauLevenshtein
+from rapidfuzz.process import extract, extractOne
+from rapidfuzz.utils import default_process
+
+from pages.data import execute, get_data_version
+
+
+GRAM_SIZE = 3
+MAX_CANDIDATES = 50
+SCORE_CUTOFF = 0.8
+MAX_SUGGESTIONS = 10
+SUGGESTION_CUTOFF = 0.6
+
+
+def get_grams(text: str) -> set:
+    """Returns the trigrams of a normalised name, padded so that short
+    names and the start and end of a name have grams of their own."""
+
+    padded = f" {text} "
+
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+class SearchIndex:
+    """Game names, the ids of the games with each name, their normalised
+    forms and the positions of the names each trigram appears in. Names are
+    stored in the order their games were loaded, so a later position is a
+    more recent game."""
+
+    def __init__(self) -> None:
+        self.names = []
+        self.game_ids = []
+        self.processed = []
+        self.grams = {}
+        self.prefixes = []
+        self.last_seen = 0
+        self.data_version = None
+        self._positions = {}
+        self._lock = Lock()
+
+    def add(self, games: list[tuple[int, str]]) -> None:
+        """Adds games to the index as (game_id, name) pairs. A name that is
+        already in it only has the game's id added. The sorted prefix array
+        is rebuilt once for the whole batch."""
+
+        added = []
+        for game_id, name in games:
+            if name in self._positions:
+                self.game_ids[self._positions[name]].append(game_id)
+                continue
+
+            position = len(self.names)
+            processed = default_process(name)
+            self._positions[name] = position
+            self.names.append(name)
+            self.game_ids.append([game_id])
+            self.processed.append(processed)
+            added.append((processed, position))
+            for gram in get_grams(processed):
+                self.grams.setdefault(gram, []).append(position)
+
+        if added:
+            self.prefixes = sorted(self.prefixes + added)
+
+    def refresh(self) -> None:
+        """Adds the games loaded since the last refresh. Nothing is fetched
+        until the data version shows that a new load has finished, so the
+        page can call this on every rerun."""
+
+        with self._lock:
+            version = get_data_version()
+            if version == self.data_version:
+                return
+
+            games = execute("""SELECT game_id, name
+                            FROM game
+                            WHERE game_id > %s
+                            ORDER BY game_id;""", (self.last_seen,))
+            self.add([(game["game_id"], game["name"]) for game in games])
+            if games:
+                self.last_seen = games[-1]["game_id"]
+            self.data_version = version
+
+    def get_game_ids(self, name: str) -> list[int]:
+        """Returns the ids of the games with a name, which can be on
+        several stores."""
+
+        if name not in self._positions:
+            return []
+        return list(self.game_ids[self._positions[name]])
+
+    def get_candidates(self, processed: str) -> list[int]:
+        """Returns the positions of the names sharing the most trigrams
+        with a normalised search."""
+
+        hits = Counter()
+        for gram in get_grams(processed):
+            hits.update(self.grams.get(gram, ()))
+
+        return [position for position, _ in hits.most_common(MAX_CANDIDATES)]
+
+    def search(self, word: str) -> str | None:
+        """Returns the name closest to a search, or None if no name is
+        close enough."""
+
+        processed = default_process(word)
+        choices = {position: self.processed[position]
+                   for position in self.get_candidates(processed)}
+
+        result = extractOne(processed, choices, scorer=DamerauLevenshtein.normalized_similarity,
+                            score_cutoff=SCORE_CUTOFF, processor=None)
+
+        if result:
+            return self.names[result[2]]
+        return None
+
+    def suggest(self, word: str, limit: int = MAX_SUGGESTIONS) -> list[str]:
+        """Returns up to limit names for a search that is still being typed.
+        An exact match comes first, then the most recent names starting
+        with the search, followed by the closest fuzzy matches if there are
+        not enough of them."""
+
+        processed = default_process(word)
+        if not processed:
+            return []
+
+        start = bisect_left(self.prefixes, (processed,))
+        end = bisect_left(self.prefixes, (processed + "\uffff",), start)
+        suggestions = nlargest(limit, (position for _, position in self.prefixes[start:end]),
+                               key=lambda position: (self.processed[position] == processed,
+                                                     position))
+
+        if len(suggestions) < limit:
+            # Only as much of each name as has been typed is compared, so a
+            # typo in a prefix still matches the name it is the start of.
+            choices = {position: self.processed[position][:len(processed)]
+                       for position in self.get_candidates(processed)
+                       if position not in suggestions}
+            suggestions += [result[2] for result in extract(
+                processed, choices, scorer=DamerauLevenshtein.normalized_similarity,
+                score_cutoff=SUGGESTION_CUTOFF, processor=None,
+                limit=limit - len(suggestions))]
+
+        return [self.names[position] for position in suggestions]
+
+
+@st.cache_resource
+def get_search_index() -> SearchIndex:
+    """Returns the search index shared by every session. Call its refresh
+    method before searching, to pick up newly loaded games."""
+
+    return SearchIndex()
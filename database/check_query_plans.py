@@ -0,0 +1,192 @@
+"""
+Checks that every dashboard query has an index it can be served by. The
+queries are read from the dashboard's source, so the check follows it as
+it changes, and each is explained with sequential scans turned off, so the
+planner only uses one when no index can serve the query at all. This does
+not show which plan the planner picks with real statistics: a query with a
+usable index still passes if the planner would prefer a sequential scan.
+Exits with a non-zero status if any query sequentially scans one of the
+large tables, or if a query has no parameters to explain it with here.
+"""
+import ast
+import sys
+import json
+from importlib import import_module
+from os import environ as ENV, listdir, path
+from datetime import date, timedelta
+
+from dotenv import load_dotenv
+from psycopg2 import connect
+from psycopg2.extensions import connection
+
+
+CHECKED_TABLES = {"game", "game_tag_matching", "platform_assignment",
+                  "developer", "publisher", "daily_game_stats", "daily_tag_stats"}
+
+DASHBOARD_DIR = path.join(path.dirname(path.abspath(__file__)), "..", "dashboard")
+PAGES_DIR = path.join(DASHBOARD_DIR, "pages")
+QUERY_FUNCTIONS = {"run_query", "execute"}
+
+WEEK = tuple(str(date.today() - timedelta(days=day)) for day in range(1, 8))
+
+
+def get_page_metrics_params(website_id: int | None) -> dict:
+    """Returns the parameters a summary page reads its metrics with."""
+
+    return {"website_id": website_id, "yesterday": WEEK[0], "two_days_ago": WEEK[1],
+            "window": WEEK, "top_games": 10, "rated_only": True}
+
+
+# The parameters each dashboard query is explained with, keyed by the module
+# and function it is run from. The summary query is explained for every
+# website and for all of them, as each filter is planned separately.
+QUERY_PARAMS = {
+    "functions.get_page_metrics": [get_page_metrics_params(website_id)
+                                   for website_id in (None, 1, 2, 3)],
+    "Search.get_candidates": [("Stardew Valley", "Stardew Valley", 20)],
+    "Search.get_suggestions": [("Stard%", 10)],
+    "Search.get_game_details": [([1, 2, 3], [1, 2, 3])],
+    "search_index.refresh": [(0,)],
+    "data.get_data_version": [None],
+}
+
+# Tables a query reads every row of on purpose. The all time headline for
+# every website sums the whole daily rollup, which has one row per website
+# and day, so reading it all is expected.
+EXPECTED_SEQ_SCANS = {"functions.get_page_metrics #1": {"daily_game_stats"}}
+
+
+def get_query_constants() -> dict[str, str]:
+    """Returns the queries in the dashboard's pages/queries.py, which
+    imports nothing the dashboard needs installed, keyed by name."""
+
+    if DASHBOARD_DIR not in sys.path:
+        sys.path.insert(0, DASHBOARD_DIR)
+    queries = import_module("pages.queries")
+
+    return {name: value for name, value in vars(queries).items()
+            if name.isupper() and isinstance(value, str)}
+
+
+def get_module_queries(source: str, module: str,
+                       constants: dict[str, str]) -> dict[str, str]:
+    """Returns the query each function in a module runs, keyed by the
+    module and function name. A query is the first argument of a call to
+    run_query or execute, written out or named by one of the constants, and
+    is None if it is built some other way. Wrappers that pass on a query
+    they were given are skipped."""
+
+    tree = ast.parse(source)
+    queries = {}
+    for function in ast.walk(tree):
+        if not isinstance(function, ast.FunctionDef):
+            continue
+        arguments = {argument.arg for argument in function.args.args}
+        for node in ast.walk(function):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                    and node.func.id in QUERY_FUNCTIONS and node.args):
+                continue
+            query = node.args[0]
+            if isinstance(query, ast.Name) and query.id in arguments:
+                continue
+            if isinstance(query, ast.Constant) and isinstance(query.value, str):
+                queries[f"{module}.{function.name}"] = query.value
+            elif isinstance(query, ast.Name) and isinstance(constants.get(query.id), str):
+                queries[f"{module}.{function.name}"] = constants[query.id]
+            else:
+                queries[f"{module}.{function.name}"] = None
+
+    return queries
+
+
+def get_dashboard_queries(pages_dir: str = PAGES_DIR) -> dict[str, tuple]:
+    """Returns each dashboard query with the parameters to explain it with,
+    keyed by a name for the query. Raises ValueError if a query has no
+    parameters in QUERY_PARAMS, cannot be read from the source, or if one
+    in QUERY_PARAMS is gone."""
+
+    constants = get_query_constants()
+    found = {}
+    for file_name in sorted(listdir(pages_dir)):
+        if file_name.endswith(".py"):
+            with open(path.join(pages_dir, file_name), encoding="utf-8") as page_file:
+                found.update(get_module_queries(page_file.read(), file_name[:-3],
+                                                constants))
+
+    unknown = sorted(set(found) - set(QUERY_PARAMS))
+    unreadable = sorted(name for name, query in found.items() if query is None)
+    missing = sorted(set(QUERY_PARAMS) - set(found))
+    if unknown or unreadable or missing:
+        raise ValueError(f"Queries with no parameters: {unknown}. "
+                         f"Queries that cannot be read: {unreadable}. "
+                         f"Queries no longer in the dashboard: {missing}.")
+
+    queries = {}
+    for name, query in found.items():
+        for number, params in enumerate(QUERY_PARAMS[name], 1):
+            label = f"{name} #{number}" if len(QUERY_PARAMS[name]) > 1 else name
+            queries[label] = (query, params)
+
+    return queries
+
+
+def get_db_connection(config) -> connection:
+    """Returns a connection to the database."""
+
+    return connect(
+        dbname=config["DB_NAME"],
+        user=config["DB_USER"],
+        password=config["DB_PASSWORD"],
+        host=config["DB_HOST"],
+        port=config["DB_PORT"]
+    )
+
+
+def find_seq_scans(plan: dict) -> list[str]:
+    """Returns the names of the checked tables that are sequentially
+    scanned anywhere in a plan."""
+
+    scanned = []
+    if plan["Node Type"] == "Seq Scan" and plan["Relation Name"] in CHECKED_TABLES:
+        scanned.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        scanned += find_seq_scans(child)
+
+    return scanned
+
+
+def check_query_plans(conn: connection, queries: dict[str, tuple]) -> dict:
+    """Explains every query, returning the tables each one
+    sequentially scans."""
+
+    failures = {}
+    with conn.cursor() as cur:
+        cur.execute("SET enable_seqscan = off;")
+        for name, (query, params) in queries.items():
+            cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scanned = [table for table in find_seq_scans(plan[0]["Plan"])
+                       if table not in EXPECTED_SEQ_SCANS.get(name, set())]
+            if scanned:
+                failures[name] = scanned
+    conn.rollback()
+
+    return failures
+
+
+if __name__ == "__main__":
+
+    load_dotenv()
+    dashboard_queries = get_dashboard_queries()
+    db_conn = get_db_connection(ENV)
+    seq_scans = check_query_plans(db_conn, dashboard_queries)
+    db_conn.close()
+
+    for query_name, tables in seq_scans.items():
+        print(f"{query_name}: sequential scan on {', '.join(tables)}")
+
+    if seq_scans:
+        sys.exit(1)
+    print(f"All {len(dashboard_queries)} queries use indexes.")
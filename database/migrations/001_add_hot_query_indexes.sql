@@ -0,0 +1,71 @@
+-- Migration 001: indexes and uniqueness constraints for the hot queries.
+-- The load step filters on developer_name, publisher_name and game.name,
+-- and every dashboard metric filters game on release_date and website_id.
+
+
+-- Merge any duplicate developers and publishers into the earliest row,
+-- so that their names can be made unique.
+UPDATE game AS g
+SET developer_id = keep.developer_id
+FROM developer AS d
+JOIN (SELECT developer_name, MIN(developer_id) AS developer_id
+      FROM developer GROUP BY developer_name) AS keep
+ON d.developer_name = keep.developer_name
+WHERE g.developer_id = d.developer_id
+AND d.developer_id <> keep.developer_id;
+
+DELETE FROM developer AS d
+USING developer AS keep
+WHERE d.developer_name = keep.developer_name
+AND d.developer_id > keep.developer_id;
+
+UPDATE game AS g
+SET publisher_id = keep.publisher_id
+FROM publisher AS p
+JOIN (SELECT publisher_name, MIN(publisher_id) AS publisher_id
+      FROM publisher GROUP BY publisher_name) AS keep
+ON p.publisher_name = keep.publisher_name
+WHERE g.publisher_id = p.publisher_id
+AND p.publisher_id <> keep.publisher_id;
+
+DELETE FROM publisher AS p
+USING publisher AS keep
+WHERE p.publisher_name = keep.publisher_name
+AND p.publisher_id > keep.publisher_id;
+
+ALTER TABLE developer ADD CONSTRAINT developer_name_unique UNIQUE (developer_name);
+ALTER TABLE publisher ADD CONSTRAINT publisher_name_unique UNIQUE (publisher_name);
+
+
+-- Retried loads have inserted the same game more than once. Keep the most
+-- recently loaded copy of each game, and drop the others with their links.
+CREATE TEMPORARY TABLE duplicate_game AS
+SELECT g.game_id
+FROM game AS g
+JOIN (SELECT name, website_id, release_date, MAX(game_id) AS game_id
+      FROM game GROUP BY name, website_id, release_date) AS keep
+ON g.name = keep.name
+AND g.website_id = keep.website_id
+AND g.release_date = keep.release_date
+WHERE g.game_id <> keep.game_id;
+
+DELETE FROM platform_assignment WHERE game_id IN (SELECT game_id FROM duplicate_game);
+DELETE FROM game_tag_matching WHERE game_id IN (SELECT game_id FROM duplicate_game);
+DELETE FROM game WHERE game_id IN (SELECT game_id FROM duplicate_game);
+
+DROP TABLE duplicate_game;
+
+-- The natural key also serves lookups by name, as name is its first column.
+ALTER TABLE game ADD CONSTRAINT game_natural_key UNIQUE (name, website_id, release_date);
+
+
+CREATE INDEX game_website_id_release_date_idx ON game (website_id, release_date);
+CREATE INDEX game_release_date_idx ON game (release_date);
+
+CREATE INDEX game_tag_matching_game_id_idx ON game_tag_matching (game_id);
+CREATE INDEX game_tag_matching_tag_id_idx ON game_tag_matching (tag_id);
+
+CREATE INDEX platform_assignment_game_id_idx ON platform_assignment (game_id);
+
+
+INSERT INTO schema_migration (version) VALUES ('001_add_hot_query_indexes');
@@ -0,0 +1,25 @@
+-- Migration 002: make platform and tag links unique, so the load step can
+-- insert them idempotently with ON CONFLICT DO NOTHING.
+
+
+DELETE FROM platform_assignment AS pa
+USING platform_assignment AS keep
+WHERE pa.game_id = keep.game_id
+AND pa.platform_id = keep.platform_id
+AND pa.assignment_id > keep.assignment_id;
+
+DELETE FROM game_tag_matching AS gt
+USING game_tag_matching AS keep
+WHERE gt.game_id = keep.game_id
+AND gt.tag_id = keep.tag_id
+AND gt.matching_id > keep.matching_id;
+
+ALTER TABLE platform_assignment ADD CONSTRAINT platform_assignment_unique UNIQUE (game_id, platform_id);
+ALTER TABLE game_tag_matching ADD CONSTRAINT game_tag_matching_unique UNIQUE (game_id, tag_id);
+
+-- The new constraints lead with game_id, so these indexes are no longer needed.
+DROP INDEX platform_assignment_game_id_idx;
+DROP INDEX game_tag_matching_game_id_idx;
+
+
+INSERT INTO schema_migration (version) VALUES ('002_unique_game_links');
@@ -0,0 +1,47 @@
+-- Migration 003: daily rollups of the game table, so the dashboard and the
+-- weekly report read one row per website and day instead of every game.
+-- The load step refreshes the rows for the days it loads games into, in
+-- the same transaction as the games themselves.
+
+
+CREATE TABLE daily_game_stats (
+    website_id INT NOT NULL,
+    release_date DATE NOT NULL,
+    game_count INT NOT NULL,
+    price_sum FLOAT NOT NULL,
+    rating_sum FLOAT NOT NULL,
+    rating_count INT NOT NULL,
+    PRIMARY KEY (website_id, release_date),
+    FOREIGN KEY(website_id) REFERENCES website(website_id)
+);
+
+CREATE TABLE daily_tag_stats (
+    website_id INT NOT NULL,
+    release_date DATE NOT NULL,
+    tag_id INT NOT NULL,
+    game_count INT NOT NULL,
+    PRIMARY KEY (website_id, release_date, tag_id),
+    FOREIGN KEY(website_id) REFERENCES website(website_id),
+    FOREIGN KEY(tag_id) REFERENCES tag(tag_id)
+);
+
+-- Pages that cover every website filter on release_date alone.
+CREATE INDEX daily_game_stats_release_date_idx ON daily_game_stats (release_date);
+CREATE INDEX daily_tag_stats_release_date_idx ON daily_tag_stats (release_date);
+
+
+INSERT INTO daily_game_stats (website_id, release_date, game_count,
+                              price_sum, rating_sum, rating_count)
+SELECT website_id, release_date, COUNT(*), SUM(price),
+       COALESCE(SUM(rating), 0), COUNT(rating)
+FROM game
+GROUP BY website_id, release_date;
+
+INSERT INTO daily_tag_stats (website_id, release_date, tag_id, game_count)
+SELECT g.website_id, g.release_date, gt.tag_id, COUNT(*)
+FROM game AS g
+JOIN game_tag_matching AS gt ON gt.game_id = g.game_id
+GROUP BY g.website_id, g.release_date, gt.tag_id;
+
+
+INSERT INTO schema_migration (version) VALUES ('003_daily_stats_rollups');
@@ -0,0 +1,15 @@
+-- Migration 004: a row for every batch of games the load step commits.
+-- The dashboard caches query results until the latest load_run_id changes.
+
+
+CREATE TABLE load_run (
+    load_run_id INT GENERATED ALWAYS AS IDENTITY,
+    loaded_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    game_count INT NOT NULL,
+    PRIMARY KEY (load_run_id)
+);
+
+INSERT INTO load_run (game_count) SELECT COUNT(*) FROM game;
+
+
+INSERT INTO schema_migration (version) VALUES ('004_load_runs');
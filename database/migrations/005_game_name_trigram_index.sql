@@ -0,0 +1,11 @@
+-- Migration 005: a trigram index on game.name for the dashboard's search.
+-- The search page ranks the closest names in the database with pg_trgm,
+-- instead of downloading every name and fuzzy matching all of them.
+
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX game_name_trgm_idx ON game USING GIN (name gin_trgm_ops);
+
+
+INSERT INTO schema_migration (version) VALUES ('005_game_name_trigram_index');
@@ -0,0 +1,17 @@
+source .env
+export PGPASSWORD=$DB_PASSWORD
+
+PSQL="psql --host $DB_HOST -p $DB_PORT -U $DB_USER $DB_NAME -v ON_ERROR_STOP=1"
+
+$PSQL -c "CREATE TABLE IF NOT EXISTS schema_migration (
+              version TEXT PRIMARY KEY,
+              applied_at TIMESTAMP NOT NULL DEFAULT NOW());"
+
+for migration in migrations/*.sql; do
+    version=$(basename $migration .sql)
+    applied=$($PSQL -tAc "SELECT 1 FROM schema_migration WHERE version = '$version';")
+    if [ -z "$applied" ]; then
+        echo "Applying $version"
+        $PSQL --single-transaction -f $migration || exit 1
+    fi
+done
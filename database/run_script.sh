@@ -2,4 +2,6 @@ source .env
 export PGPASSWORD=$DB_PASSWORD
 
 
-psql --host $DB_HOST -p $DB_PORT -U $DB_USER $DB_NAME -f schema.sql
\ No newline at end of file
+psql --host $DB_HOST -p $DB_PORT -U $DB_USER $DB_NAME -f schema.sql
+
+bash run_migrations.sh
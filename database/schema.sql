@@ -1,6 +1,10 @@
 -- This file contains table definitions for the database.
+-- Indexes and later changes are applied on top by the files in migrations/.
 
 
+DROP TABLE load_run;
+DROP TABLE daily_tag_stats;
+DROP TABLE daily_game_stats;
 DROP TABLE website CASCADE;
 DROP TABLE publisher CASCADE;
 DROP TABLE developer CASCADE;
@@ -10,10 +14,16 @@ DROP TABLE game CASCADE;
 DROP TABLE platform_assignment CASCADE;
 DROP TABLE game_tag_matching CASCADE;
 DROP TABLE subscriber;
+DROP TABLE schema_migration;
 
 
 
 
+CREATE TABLE schema_migration (
+    version TEXT PRIMARY KEY,
+    applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
 CREATE TABLE subscriber (
     subscriber_id INT GENERATED ALWAYS AS IDENTITY,
     first_name VARCHAR(20) UNIQUE NOT NULL,
@@ -0,0 +1,74 @@
+"""Tests for check_query_plans.py."""
+import json
+from unittest.mock import MagicMock
+
+from check_query_plans import (get_module_queries, get_dashboard_queries,
+                               find_seq_scans, check_query_plans)
+
+
+PAGE_SOURCE = '''
+from pages.data import run_query, execute
+
+
+def get_games(day):
+    return run_query("""SELECT name FROM game WHERE release_date = %s;""", (day,))
+
+
+def get_metrics(website_id):
+    return run_query(METRICS_QUERY, {"website_id": website_id})
+
+
+def get_new_games(last_seen):
+    return execute(f"SELECT name FROM game WHERE game_id > {last_seen};")
+
+
+def run_statement(query, params):
+    execute(query, params, fetch=False)
+'''
+
+PLAN = [{"Plan": {
+    "Node Type": "Nested Loop",
+    "Plans": [
+        {"Node Type": "Index Scan", "Relation Name": "game", "Index Name": "game_pkey"},
+        {"Node Type": "Hash Join", "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "developer"},
+            {"Node Type": "Seq Scan", "Relation Name": "tag"}]}]}}]
+
+
+def test_get_module_queries():
+    """Tests that written out and constant queries are found for each
+    function, queries built another way are None, and wrappers are skipped."""
+    queries = get_module_queries(PAGE_SOURCE, "page",
+                                 {"METRICS_QUERY": "SELECT 1;"})
+    assert queries == {
+        "page.get_games": """SELECT name FROM game WHERE release_date = %s;""",
+        "page.get_metrics": "SELECT 1;",
+        "page.get_new_games": None}
+
+
+def test_get_dashboard_queries():
+    """Tests that every query in the dashboard has parameters to be
+    explained with."""
+    queries = get_dashboard_queries()
+    assert "Search.get_game_details" in queries
+    assert len([name for name in queries
+                if name.startswith("functions.get_page_metrics")]) == 4
+
+
+def test_find_seq_scans():
+    """Tests that sequential scans are found at any depth of a plan, and
+    only on the checked tables."""
+    assert find_seq_scans(PLAN[0]["Plan"]) == ["developer"]
+
+
+def test_check_query_plans():
+    """Tests that each query's sequential scans are reported by name, and
+    expected ones are left out."""
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    rollup_scan = [{"Plan": {"Node Type": "Seq Scan", "Relation Name": "daily_game_stats"}}]
+    cursor.fetchone.side_effect = [[PLAN], [json.dumps(rollup_scan)]]
+    failures = check_query_plans(conn, {"a": ("SELECT 1;", None),
+                                        "functions.get_page_metrics #1": ("SELECT 2;", None)})
+    assert failures == {"a": ["developer"]}
+    conn.rollback.assert_called_once()
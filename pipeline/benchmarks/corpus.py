@@ -0,0 +1,319 @@
+"""Builds the corpus of store pages the benchmarks replay.
+
+A corpus is a directory of page files and a manifest.json mapping each
+request path to its file. Pages are templates: the replay server swaps
+the placeholders below for its own address and for dates relative to
+when it is run, so the extractors always see today's games.
+
+The corpus can be generated, with pages the size and shape of the live
+ones, or recorded from the live stores. Recorded pages are rewritten to
+point back at the replay server, and their release dates are templated.
+
+    python3 corpus.py generate corpus/
+    python3 corpus.py record corpus/
+"""
+
+import importlib
+import sys
+import json
+import os
+import re
+from random import Random
+from datetime import date, datetime, timedelta, timezone
+
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+from requests import get
+
+
+BASE_URL = "@@BASE_URL@@"
+STEAM_TODAY = "@@STEAM_TODAY@@"
+GOG_NOW = "@@GOG_NOW@@"
+GOG_OLD = "@@GOG_OLD@@"
+
+STEAM_SEARCH_PATH = "/steam/search/"
+GOG_LISTING_PATH = "/gog/games?order=desc:releaseDate"
+EPIC_GRAPHQL_PATH = "/epic/graphql"
+STORE_PATHS = {"https://store.steampowered.com": "/steam",
+               "https://www.gog.com": "/gog"}
+
+WORDS = ("dark souls quest pixel retro space station colony survival craft "
+         "dungeon hero legend puzzle racing farm city builder horror tactical "
+         "roguelike story adventure open world island mystery kingdom").split()
+TAGS = ["Action", "Adventure", "Indie", "Casual", "RPG", "Simulation",
+        "Strategy", "Puzzle", "Singleplayer", "Multiplayer", "Horror",
+        "Pixel Graphics", "Atmospheric", "Story Rich", "2D", "Fantasy"]
+
+
+def get_base_urls(base_url: str) -> dict:
+    """Returns the base URL environment variables that point each
+    extractor at a replay server."""
+    return {"STEAM_BASE_URL": base_url + STEAM_SEARCH_PATH,
+            "GOG_BASE_URL": base_url + GOG_LISTING_PATH,
+            "EPIC_BASE_URL": base_url + EPIC_GRAPHQL_PATH}
+
+
+def get_substitutions(base_url: str, now: datetime = None) -> dict:
+    """Returns the value of each placeholder for a server at base_url."""
+    now = now or datetime.now()
+    return {BASE_URL: base_url,
+            STEAM_TODAY: now.strftime("%d %b, %Y"),
+            GOG_NOW: (now - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+            GOG_OLD: (now - timedelta(days=2)).strftime("%Y-%m-%dT%H:%M:%S+00:00")}
+
+
+def get_text(rng: Random, words: int) -> str:
+    """Returns made up text of the given number of words."""
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def get_filler(rng: Random, size: int) -> str:
+    """Returns markup nothing reads, standing in for the navigation,
+    scripts and media of a live page."""
+    parts = []
+    length = 0
+    while length < size:
+        part = (f'<div class="block_{rng.randint(0, 999)}">'
+                f'<a href="/app/{rng.randint(0, 10**6)}/">'
+                f'<img src="/img/{rng.getrandbits(64):x}.jpg"></a>'
+                f'<p>{get_text(rng, 30)}</p></div>\n'
+                f'<script>var data_{rng.randint(0, 999)} = {{"id": {rng.randint(0, 10**6)}, '
+                f'"hash": "{rng.getrandbits(128):x}"}};</script>\n')
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)
+
+
+def get_steam_search_page(rng: Random, games: int) -> str:
+    """Returns a search page of games released today, then one older game."""
+    rows = []
+    for i in range(games + 1):
+        released = STEAM_TODAY if i < games else "24 Apr, 2023"
+        price = "Free" if i % 7 == 0 else f"£{rng.randint(1, 59)}.99"
+        rows.append(f'<a href="{BASE_URL}/steam/app/{i}/" '
+                    'class="search_result_row ds_collapse_flag">\n'
+                    f'<div class="col search_capsule"><img src="/capsule/{i}.jpg"></div>\n'
+                    '<div class="responsive_search_name_combined">\n'
+                    '<div class="col search_name ellipsis">'
+                    f'<span class="title">{get_text(rng, 3)} {i}</span></div>\n'
+                    f'<div class="col search_released responsive_secondrow"> {released} </div>\n'
+                    '<div class="col search_price_discount_combined">'
+                    f'<div class="discount_final_price">{price}</div></div>\n'
+                    '</div></a>')
+    return (f"<html><head><title>Steam Search</title></head><body>{get_filler(rng, 40000)}"
+            f'<div id="search_resultsRows">{"".join(rows)}</div>'
+            f"{get_filler(rng, 20000)}</body></html>")
+
+
+def get_steam_game_page(rng: Random, i: int) -> str:
+    """Returns a Steam product page."""
+    tags = "".join(f'<a href="/tags/{tag}/" class="app_tag">\n{tag}\n</a>'
+                   for tag in rng.sample(TAGS, 5))
+    platforms = "".join(f'<div class="sysreq_tab">{name}</div>'
+                        for name in rng.sample(["Windows", "macOS", "SteamOS + Linux"],
+                                               rng.randint(1, 3)))
+    filler = get_filler(rng, 150000)
+    reviews = ('<div class="review_ctn"><label for="review_type_positive">Positive&nbsp;'
+               f'<span class="user_reviews_count">({rng.randint(1, 5000):,})</span></label>\n'
+               '<label for="review_type_negative">Negative&nbsp;'
+               f'<span class="user_reviews_count">({rng.randint(1, 900):,})</span></label></div>')
+    description = get_text(rng, 400)
+    return f"""<html><head><title>Game {i}</title></head><body>{filler}
+{reviews}
+<div class="glance_tags popular_tags">{tags}</div>
+<div class="dev_row">
+<div class="subtitle column">Developer:</div>
+<div class="summary column" id="developers_list">
+<a href="/developer/{i}">Studio {i % 40}</a></div>
+</div>
+<div class="dev_row">
+<div class="subtitle column">Publisher:</div>
+<div class="summary column">
+<a href="/publisher/{i}">Publisher {i % 15}</a></div>
+</div>
+<div id="game_area_description" class="game_area_description">\
+<h2>About This Game</h2>{description}</div>
+<div class="sysreq_tabs">{platforms}</div>
+<div class="sysreq_contents"><div class="game_area_sys_req_full">\
+<ul class="bb_ul"><li>OS: Windows 10</li></ul></div></div>
+{get_filler(rng, 100000)}</body></html>"""
+
+
+def get_gog_listing_page(rng: Random, page: int, tiles: int) -> str:
+    """Returns a page of GOG's search results."""
+    rows = "".join('<product-tile class="ng-star-inserted">'
+                   '<a class="product-tile product-tile--grid" '
+                   f'href="{BASE_URL}/gog/game/{page}-{i}">\n'
+                   f'<div class="product-tile__image"><img src="/img/{page}-{i}.jpg"></div>\n'
+                   '<div class="product-tile__title" '
+                   f'title="{get_text(rng, 3)} {page}-{i}"></div>\n'
+                   f'<span class="final-value">{rng.randint(1, 59)}.99</span></a></product-tile>'
+                   for i in range(tiles))
+    return (f"<html><body>{get_filler(rng, 60000)}"
+            f'<div class="catalog">{rows}</div></body></html>')
+
+
+def get_gog_game_page(rng: Random, released: str) -> str:
+    """Returns a GOG product page released at the released placeholder."""
+    systems = json.dumps({name: {"min": "x"} for name in
+                          rng.sample(["windows", "osx", "linux"], rng.randint(1, 3))})
+    game_json = json.dumps({"@type": "Product", "offers": {"price": f"{rng.randint(1, 59)}.99"},
+                            "aggregateRating": {"ratingValue": round(rng.uniform(1, 5), 1)}})
+    tags = "".join(f'<a class="details__link" href="/games?tags={tag}">'
+                   f'<span class="details__link-text">{tag}</span></a>'
+                   for tag in rng.sample(TAGS, 5))
+    rows = "".join('<div class="details__content table__row-content">'
+                   f'<span>{{{{"{value}"}}}} </span></div>'
+                   for value in ["a", "b", "c", "d", "e", released])
+    return f"""<html><head><script type="application/ld+json">{game_json}</script></head><body>
+{get_filler(rng, 200000)}
+<script>window.productcardData.cardProductSystemRequirements = {systems};</script>
+<div class="details">{tags}
+<a class="details__link" href="/games?developers=studio">Studio {rng.randint(0, 40)}</a>
+<a class="details__link" href="/games?publishers=publisher">Publisher {rng.randint(0, 15)}</a>
+{rows}</div>
+<div class="description">{get_text(rng, 400)}</div>
+{get_filler(rng, 100000)}</body></html>"""
+
+
+def get_epic_response(rng: Random, start: int, games: int, total: int) -> dict:
+    """Returns a page of an Epic GraphQL search response."""
+    elements = [{"id": f"{i:032x}",
+                 "title": f"{get_text(rng, 3)} {i}",
+                 "releaseDate": "2024-04-24T16:00:00.000Z",
+                 "description": get_text(rng, 40),
+                 "publisherDisplayName": f"Publisher {i % 15}",
+                 "developerDisplayName": f"Studio {i % 40}",
+                 "currentPrice": rng.randint(0, 5999),
+                 "seller": {"name": f"Publisher {i % 15}"},
+                 "tags": [{"name": tag, "groupName": "genre"}
+                          for tag in rng.sample(TAGS + ["Windows", "Mac OS"], 6)],
+                 "categories": [{"path": "games"}, {"path": "applications"}]}
+                for i in range(start, start + games)]
+    return {"data": {"Catalog": {"searchStore": {"elements": elements,
+                                                 "paging": {"total": total}}}}}
+
+
+def write_page(directory: str, manifest: list, method: str, path: str,
+               name: str, body: str, content_type: str = "text/html",
+               body_contains: str = None) -> None:
+    """Writes a page file and adds it to the manifest. A page with
+    body_contains is only served to requests whose body contains it."""
+    os.makedirs(os.path.dirname(os.path.join(directory, name)), exist_ok=True)
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as page_file:
+        page_file.write(body)
+    entry = {"method": method, "path": path, "file": name, "content_type": content_type}
+    if body_contains:
+        entry["body_contains"] = body_contains
+    manifest.append(entry)
+
+
+def write_manifest(directory: str, manifest: list) -> None:
+    """Writes the manifest for a corpus."""
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+
+def generate_corpus(directory: str, steam_games: int = 50, gog_pages: int = 2,
+                    gog_tiles: int = 48, epic_games: int = 120, epic_page_size: int = 40,
+                    seed: int = 0) -> None:
+    """Generates a corpus. GOG gets gog_pages pages of recent games and
+    one more page of older ones, where its extractor stops. Epic's games
+    are split into pages of epic_page_size."""
+    rng = Random(seed)
+    manifest = []
+
+    write_page(directory, manifest, "GET", f"{STEAM_SEARCH_PATH}?page=1", "steam/search.html",
+               get_steam_search_page(rng, steam_games))
+    for i in range(steam_games):
+        write_page(directory, manifest, "GET", f"/steam/app/{i}/", f"steam/app_{i}.html",
+                   get_steam_game_page(rng, i))
+
+    for page in range(1, gog_pages + 2):
+        write_page(directory, manifest, "GET", f"{GOG_LISTING_PATH}&page={page}",
+                   f"gog/listing_{page}.html", get_gog_listing_page(rng, page, gog_tiles))
+        for i in range(gog_tiles):
+            released = GOG_NOW if page <= gog_pages else GOG_OLD
+            write_page(directory, manifest, "GET", f"/gog/game/{page}-{i}",
+                       f"gog/game_{page}-{i}.html", get_gog_game_page(rng, released))
+
+    for start in range(0, epic_games, epic_page_size):
+        write_page(directory, manifest, "POST", EPIC_GRAPHQL_PATH, f"epic/graphql_{start}.json",
+                   json.dumps(get_epic_response(rng, start, min(epic_page_size, epic_games - start),
+                                                epic_games)),
+                   "application/json", body_contains=f"start: {start},")
+
+    write_manifest(directory, manifest)
+
+
+def template_page(body: str, store_url: str) -> str:
+    """Returns a recorded page with links to the store pointed at the
+    replay server and recent release dates swapped for placeholders."""
+    body = body.replace(store_url, BASE_URL + STORE_PATHS[store_url])
+    body = body.replace(date.today().strftime("%d %b, %Y"), STEAM_TODAY)
+
+    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+
+    def template_date(match: re.Match) -> str:
+        released = datetime.fromisoformat(match.group(0))
+        return GOG_NOW if released > yesterday else GOG_OLD
+
+    return re.sub(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d[+-]\d\d:\d\d", template_date, body)
+
+
+def record_corpus(directory: str, config) -> None:
+    """Records a corpus from the live stores, using the extractors'
+    base URL environment variables. Only the pages the extractors would
+    request today are recorded."""
+    manifest = []
+    steam_url = "https://store.steampowered.com"
+    rows = []
+    for page_number in range(1, 11):
+        search = get(config["STEAM_BASE_URL"], params={"page": page_number}, timeout=10,
+                     cookies={"timezoneOffset": "3600,0"}).text
+        write_page(directory, manifest, "GET", f"{STEAM_SEARCH_PATH}?page={page_number}",
+                   f"steam/search_{page_number}.html", template_page(search, steam_url))
+        page_rows = BeautifulSoup(search, "lxml").find_all("a", class_="search_result_row")
+        rows += page_rows
+        # The extractor reads pages until one ends with a game released before today.
+        if not page_rows or page_rows[-1].find(class_="search_released").text.strip() \
+                != date.today().strftime("%d %b, %Y"):
+            break
+    for i, row in enumerate(rows):
+        page = get(row["href"], timeout=10).text
+        path = row["href"].replace(steam_url, STORE_PATHS[steam_url])
+        write_page(directory, manifest, "GET", path, f"steam/app_{i}.html",
+                   template_page(page, steam_url))
+
+    gog_url = "https://www.gog.com"
+    for page_number in (1, 2):
+        listing = get(f'{config["GOG_BASE_URL"]}&page={page_number}', timeout=10).text
+        write_page(directory, manifest, "GET", f"{GOG_LISTING_PATH}&page={page_number}",
+                   f"gog/listing_{page_number}.html", template_page(listing, gog_url))
+        for i, tile in enumerate(BeautifulSoup(listing, "lxml").find_all(
+                "a", class_="product-tile--grid")):
+            page = get(tile["href"], timeout=10).text
+            path = tile["href"].replace(gog_url, STORE_PATHS[gog_url])
+            write_page(directory, manifest, "GET", path, f"gog/game_{page_number}-{i}.html",
+                       template_page(page, gog_url))
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "common"))
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "extract", "epic"))
+    games = importlib.import_module("extract_epic").get_games_data(config)
+    write_page(directory, manifest, "POST", EPIC_GRAPHQL_PATH, "epic/graphql.json",
+               json.dumps({"data": {"Catalog": {"searchStore": {"elements": games}}}}),
+               "application/json")
+
+    write_manifest(directory, manifest)
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) != 3 or sys.argv[1] not in ("generate", "record"):
+        sys.exit("Usage: python3 corpus.py generate|record DIRECTORY")
+
+    if sys.argv[1] == "generate":
+        generate_corpus(sys.argv[2])
+    else:
+        load_dotenv()
+        record_corpus(sys.argv[2], os.environ)
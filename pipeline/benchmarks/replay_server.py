@@ -0,0 +1,98 @@
+"""A local stand-in for the stores that serves a recorded corpus.
+
+Every page is read and templated once when the server starts, so the
+benchmarks time the extractors rather than the server's file reads."""
+
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from corpus import get_substitutions
+
+
+def load_corpus(directory: str, base_url: str) -> dict:
+    """Returns the pages in a corpus keyed by (method, path), with their
+    placeholders filled in for a server at base_url. Each key has a list
+    of (body_contains, body, content_type), so requests to the same path,
+    such as each page of a GraphQL search, can get different pages."""
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    substitutions = get_substitutions(base_url)
+    pages = {}
+    for entry in manifest:
+        with open(os.path.join(directory, entry["file"]), encoding="utf-8") as page_file:
+            body = page_file.read()
+        for placeholder, value in substitutions.items():
+            body = body.replace(placeholder, value)
+        pages.setdefault((entry["method"], entry["path"]), []).append(
+            (entry.get("body_contains"), body.encode("utf-8"), entry["content_type"]))
+    return pages
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Answers each request with its page from the corpus, or a 404. Where
+    several pages share a path, the first whose body_contains is in the
+    request body is used."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request_body = self.rfile.read(length).decode("utf-8") if length else ""
+
+        page = next((page for page in self.server.pages.get((self.command, self.path), [])
+                     if page[0] is None or page[0] in request_body), None)
+        _, body, content_type = page or (None, b"<html></html>", "text/html")
+        self.server.requests += 1
+
+        self.send_response(200 if page else 404)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, format, *args) -> None:
+        """Keeps request logs out of the benchmark output."""
+
+
+class ReplayServer:
+    """Serves a corpus on a free local port for as long as it is open.
+
+        with ReplayServer("corpus/") as server:
+            server.base_url
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), ReplayHandler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self.httpd.pages = load_corpus(directory, self.base_url)
+        self.httpd.requests = 0
+        self.thread = Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def requests(self) -> int:
+        """Returns the number of requests served so far."""
+        return self.httpd.requests
+
+    def __enter__(self) -> "ReplayServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+
+    with ReplayServer(sys.argv[1]) as replay_server:
+        print(replay_server.base_url, flush=True)
+        sys.stdin.read()
@@ -0,0 +1,192 @@
+"""Benchmarks each extractor against a replayed corpus of store pages.
+
+Each extractor's handler is run in its own process, pointed at a local
+replay server, and measured for games per second, parse time per page,
+peak RSS and the memory its allocations reach. Results are compared to
+baselines.json, and the script exits 1 if any has regressed by more
+than the tolerance.
+
+    python3 run_benchmarks.py
+    python3 run_benchmarks.py --update-baselines
+"""
+
+import argparse
+import importlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from statistics import median
+from time import perf_counter
+
+from corpus import generate_corpus, get_base_urls
+
+
+PIPELINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(PIPELINE_DIR, "benchmarks")
+DEFAULT_CORPUS = os.path.join(BENCHMARKS_DIR, "corpus")
+BASELINES_PATH = os.path.join(BENCHMARKS_DIR, "baselines.json")
+
+EXTRACTORS = {"steam": ("extract/steam", "steam_extract", "STEAM_CLIENT"),
+              "gog": ("extract/gog", "extract_gog", "GOG_CLIENT"),
+              "epic": ("extract/epic", "extract_epic", "EPIC_CLIENT")}
+
+# How much worse than its baseline each checked measurement can get, on top
+# of the tolerance, before it counts as a regression. This keeps runs that
+# take milliseconds from failing on scheduling noise. games_per_second is
+# not checked, as it moves with seconds.
+SLACK = {"seconds": 0.05, "parse_ms_per_page": 1.0, "peak_rss_mb": 5.0,
+         "traced_peak_mb": 1.0}
+
+
+def measure_extractor(name: str, base_url: str, repeat: int,
+                      rate_limit: bool = False) -> dict:
+    """Runs an extractor's handler repeat times against the replay server
+    at base_url, then once more with tracemalloc on, and returns its
+    measurements. The store's rate limit is turned off unless rate_limit
+    is set, so the runs time the extractor rather than the throttle."""
+
+    folder, module_name, client_name = EXTRACTORS[name]
+    sys.path[:0] = [os.path.join(PIPELINE_DIR, "common"),
+                    os.path.join(PIPELINE_DIR, folder)]
+    os.environ.update(get_base_urls(base_url))
+    # Batches too big to return inline need a blob store to go in.
+    os.environ.setdefault("PAYLOAD_DIR", tempfile.mkdtemp(prefix="payloads-"))
+    extractor = importlib.import_module(module_name)
+    if not rate_limit:
+        getattr(extractor, client_name).limiter = None
+
+    timings = []
+    parse_times = []
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = perf_counter()
+            payload = extractor.handler()
+            timings.append(perf_counter() - start)
+            parse = payload["metrics"]["phases"].get("parse", {"seconds": 0.0, "count": 1})
+            parse_times.append(parse["seconds"] / parse["count"])
+
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        tracemalloc.start()
+        extractor.handler()
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        retained_blocks = sum(stat.count for stat in
+                              tracemalloc.take_snapshot().statistics("filename"))
+        tracemalloc.stop()
+
+    seconds = median(timings)
+    return {"games": payload["count"],
+            "seconds": round(seconds, 3),
+            "games_per_second": round(payload["count"] / seconds, 1),
+            "parse_ms_per_page": round(median(parse_times) * 1000, 2),
+            "peak_rss_mb": round(peak_rss_mb, 1),
+            "traced_peak_mb": round(traced_peak / 2**20, 1),
+            "retained_blocks": retained_blocks}
+
+
+def run_in_subprocess(name: str, base_url: str, repeat: int, rate_limit: bool) -> dict:
+    """Measures an extractor in a fresh process, so each one's peak RSS
+    and imports are its own."""
+    command = [sys.executable, __file__, "--child", name, "--base-url", base_url,
+               "--repeat", str(repeat)]
+    if rate_limit:
+        command.append("--rate-limit")
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def start_replay_server(corpus: str) -> subprocess.Popen:
+    """Starts a replay server in its own process and returns it once it is
+    serving. The corpus is held in that process, not this one, so it does
+    not count towards the peak RSS the extractors' processes inherit.
+    The server stops when its stdin is closed."""
+    return subprocess.Popen([sys.executable, os.path.join(BENCHMARKS_DIR, "replay_server.py"),
+                             corpus], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            text=True)
+
+
+def find_regressions(results: dict, baselines: dict, tolerance: float) -> list[str]:
+    """Returns a description of every measurement worse than its baseline
+    by more than the tolerance."""
+    regressions = []
+    for name, result in results.items():
+        for metric, slack in SLACK.items():
+            baseline = baselines.get(name, {}).get(metric)
+            value = result.get(metric)
+            if baseline is None or value is None:
+                continue
+            if value > baseline * (1 + tolerance) + slack:
+                regressions.append(f"{name} {metric}: {value} (baseline {baseline})")
+    return regressions
+
+
+def main() -> int:
+    """Runs the benchmarks and returns the exit code."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("extractors", nargs="*", metavar="EXTRACTOR",
+                        help=f"any of {', '.join(EXTRACTORS)}, all by default")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS,
+                        help="corpus directory, generated if it does not exist")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="keep each store's rate limit on")
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--child", choices=list(EXTRACTORS), help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_extractor(args.child, args.base_url,
+                                           args.repeat, args.rate_limit)))
+        return 0
+
+    extractors = args.extractors or list(EXTRACTORS)
+    unknown = set(extractors) - EXTRACTORS.keys()
+    if unknown:
+        parser.error(f"unknown extractors: {', '.join(sorted(unknown))}")
+
+    if not os.path.exists(os.path.join(args.corpus, "manifest.json")):
+        print(f"Generating corpus in {args.corpus}")
+        generate_corpus(args.corpus)
+
+    server = start_replay_server(args.corpus)
+    try:
+        base_url = server.stdout.readline().strip()
+        results = {name: run_in_subprocess(name, base_url, args.repeat, args.rate_limit)
+                   for name in extractors}
+    finally:
+        server.stdin.close()
+        server.wait()
+
+    for name, result in results.items():
+        print(f"{name:6} {json.dumps(result)}")
+
+    baselines = {}
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH, encoding="utf-8") as baselines_file:
+            baselines = json.load(baselines_file)
+
+    if args.update_baselines:
+        baselines.update(results)
+        with open(BASELINES_PATH, "w", encoding="utf-8") as baselines_file:
+            json.dump(baselines, baselines_file, indent=2)
+            baselines_file.write("\n")
+        print(f"Baselines written to {BASELINES_PATH}")
+        return 0
+
+    regressions = find_regressions(results, baselines, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""Tests for the benchmark corpus, replay server and regression check."""
+
+from datetime import date
+
+from requests import get, post
+
+from corpus import generate_corpus, get_base_urls
+from replay_server import ReplayServer
+from run_benchmarks import find_regressions
+
+
+def test_replay_server_fills_in_placeholders(tmp_path):
+    """Tests that pages are served with links back to the server and
+    today's date, that POSTs get the page matching their body, and that
+    unknown paths are a 404."""
+    generate_corpus(str(tmp_path), steam_games=2, gog_pages=1, gog_tiles=2,
+                    epic_games=3, epic_page_size=2)
+
+    with ReplayServer(str(tmp_path)) as server:
+        urls = get_base_urls(server.base_url)
+        search = get(urls["STEAM_BASE_URL"], params={"page": 1}, timeout=5).text
+        epic = post(urls["EPIC_BASE_URL"], json={"query": "(start: 2, count: 2,"},
+                    timeout=5).json()
+        missing = get(f'{urls["GOG_BASE_URL"]}&page=9', timeout=5)
+
+        assert f"{server.base_url}/steam/app/1/" in search
+        assert date.today().strftime("%d %b, %Y") in search
+        assert "@@" not in search
+        assert len(epic["data"]["Catalog"]["searchStore"]["elements"]) == 1
+        assert epic["data"]["Catalog"]["searchStore"]["paging"] == {"total": 3}
+        assert missing.status_code == 404
+        assert server.requests == 3
+
+
+def test_find_regressions():
+    """Tests that only measurements worse than baseline by more than the
+    tolerance and slack are reported."""
+    baselines = {"steam": {"seconds": 2.0, "peak_rss_mb": 50.0},
+                 "epic": {"seconds": 0.005}}
+    results = {"steam": {"seconds": 2.4, "peak_rss_mb": 70.0},
+               "epic": {"seconds": 0.02}}
+
+    assert find_regressions(results, baselines, tolerance=0.25) == [
+        "steam peak_rss_mb: 70.0 (baseline 50.0)"]
+    assert find_regressions(results, {}, tolerance=0.25) == []
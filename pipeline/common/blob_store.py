@@ -0,0 +1,88 @@
+"""Claim-check storage for payloads too large to pass through the step
+function. A stage puts the bytes in a blob store and passes on the key;
+the next stage gets the bytes back with the key. State that outlives a
+run, such as each store's watermark, is kept under a fixed key."""
+
+import os
+from uuid import uuid4
+
+
+class BlobStore:
+    """The interface every blob store backend provides."""
+
+    def put(self, data: bytes, key: str = None) -> str:
+        """Stores the bytes under key, or a new key if none is given,
+        and returns the key to get them back with."""
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        """Returns the bytes stored under a key, or None if there are none."""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """Stores blobs as files in a local directory."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _get_path(self, key: str) -> str:
+        """Returns the file a key is stored in."""
+        return os.path.join(self.directory, key.replace("/", "_"))
+
+    def put(self, data: bytes, key: str = None) -> str:
+        key = key or f"{uuid4().hex}.bin"
+        with open(self._get_path(key), "wb") as blob_file:
+            blob_file.write(data)
+        return key
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._get_path(key), "rb") as blob_file:
+                return blob_file.read()
+        except FileNotFoundError:
+            return None
+
+
+# With s3:ListBucket, S3 answers a GET for a missing key with 404. A 403 is
+# a real permission failure, so it is raised rather than read as no blob.
+MISSING_KEY_CODES = {"NoSuchKey", "404"}
+
+
+class S3BlobStore(BlobStore):
+    """Stores blobs as objects in an S3 bucket. New keys go under prefix,
+    which the bucket should expire after a day, as nothing reads a payload
+    after its run. Keys given to put are used as they are."""
+
+    def __init__(self, bucket: str, prefix: str = "payloads/", s3_client=None) -> None:
+        if s3_client is None:
+            from boto3 import client
+            s3_client = client("s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.s3_client = s3_client
+
+    def put(self, data: bytes, key: str = None) -> str:
+        key = key or f"{self.prefix}{uuid4().hex}.bin"
+        self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        return key
+
+    def get(self, key: str) -> bytes:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+        except self.s3_client.exceptions.ClientError as error:
+            if error.response.get("Error", {}).get("Code") in MISSING_KEY_CODES:
+                return None
+            raise
+        return response["Body"].read()
+
+
+def get_blob_store(config) -> BlobStore:
+    """Returns the blob store set by PAYLOAD_BUCKET or PAYLOAD_DIR,
+    or None if neither is set."""
+    if config.get("PAYLOAD_BUCKET"):
+        return S3BlobStore(config["PAYLOAD_BUCKET"])
+    if config.get("PAYLOAD_DIR"):
+        return LocalBlobStore(config["PAYLOAD_DIR"])
+    return None
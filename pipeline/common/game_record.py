@@ -0,0 +1,89 @@
+"""A typed record for one game, shared by every stage of the pipeline.
+
+Games travel between the step function's Lambdas as JSON lists with their
+values in the order of FIELDS. Each stage turns the payload into GameRecords
+as it reads it and back into lists as it returns it, so no stage has to
+know which index holds which value."""
+
+from collections.abc import Iterable
+from datetime import datetime
+
+
+RELEASE_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+FIELDS = ("title", "description", "price", "developer", "publisher",
+          "release_date", "rating", "website_id", "tags", "platform_ids")
+
+
+class GameRecord:
+    """A single game. release_date is a datetime, tags are the names the
+    website uses and platform_ids are ids from the platform table."""
+
+    __slots__ = FIELDS
+
+    def __init__(self, title: str, description: str, price: float,
+                 developer: str, publisher: str, release_date: datetime,
+                 rating: float, website_id: int, tags: list[str],
+                 platform_ids: list[int]) -> None:
+        self.title = title
+        self.description = description
+        self.price = price
+        self.developer = developer
+        self.publisher = publisher
+        self.release_date = release_date
+        self.rating = rating
+        self.website_id = website_id
+        self.tags = tags
+        self.platform_ids = platform_ids
+
+    @classmethod
+    def from_list(cls, values: list) -> "GameRecord":
+        """Returns the record for a game in the payload's list form."""
+        record = cls(*values)
+        if isinstance(record.release_date, str):
+            record.release_date = datetime.strptime(record.release_date,
+                                                    RELEASE_DATE_FORMAT)
+        return record
+
+    def to_list(self) -> list:
+        """Returns the game in the payload's list form."""
+        values = [getattr(self, field) for field in FIELDS]
+        values[5] = self.release_date.strftime(RELEASE_DATE_FORMAT)
+        return values
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, GameRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field)
+                   for field in FIELDS)
+
+    def __repr__(self) -> str:
+        return (f"GameRecord(title={self.title!r}, website_id={self.website_id!r}, "
+                f"release_date={self.release_date!r})")
+
+
+def records_to_payload(records: list[GameRecord]) -> list[list]:
+    """Returns the records as the JSON-serialisable payload
+    passed between Lambdas."""
+    return [record.to_list() for record in records]
+
+
+def records_from_payload(payload: list[list]) -> list[GameRecord]:
+    """Returns the records in a payload."""
+    return [GameRecord.from_list(values) for values in payload]
+
+
+def records_to_columns(records: Iterable[GameRecord]) -> dict[str, list]:
+    """Returns the records as one list per field, so each field's
+    values are stored together. Each record is added to the columns as it
+    is reached, so the records can come from a generator."""
+    columns = {field: [] for field in FIELDS}
+    for record in records:
+        for field, value in zip(FIELDS, record.to_list()):
+            columns[field].append(value)
+    return columns
+
+
+def records_from_columns(columns: dict[str, list]) -> list[GameRecord]:
+    """Returns the records in the columnar form made by
+    records_to_columns."""
+    return records_from_payload(zip(*(columns[field] for field in FIELDS)))
@@ -0,0 +1,109 @@
+"""A pooled HTTP client shared by the extract Lambdas."""
+
+from threading import BoundedSemaphore, Lock
+from time import perf_counter
+from urllib.parse import urlparse
+
+from requests import Session, Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limit import HostRateLimiter
+
+
+DEFAULT_TIMEOUT = 10
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HttpClient:
+    """Wraps a requests Session so that connections are kept alive and
+    reused between requests. Failed requests are retried with exponential
+    backoff, each host gets a cap on concurrent requests (and optionally a
+    rate limit), and the time spent on each host is recorded."""
+
+    def __init__(self, max_per_host: int = 8, requests_per_second: float = None,
+                 max_retries: int = 3, backoff_factor: float = 0.5,
+                 headers: dict = None) -> None:
+        """Sizes the connection pool to match the per-host concurrency cap,
+        so every worker thread can hold on to its own connection."""
+        self.max_per_host = max_per_host
+        self.session = Session()
+        if headers:
+            self.session.headers.update(headers)
+
+        retry = Retry(total=max_retries, backoff_factor=backoff_factor,
+                      status_forcelist=RETRY_STATUSES,
+                      allowed_methods=frozenset({"GET", "POST"}),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=max_per_host,
+                              pool_maxsize=max_per_host, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.limiter = None
+        if requests_per_second:
+            self.limiter = HostRateLimiter(requests_per_second,
+                                           capacity=max_per_host)
+
+        self._semaphores = {}
+        self._stats = {}
+        self._lock = Lock()
+
+    def _get_semaphore(self, host: str) -> BoundedSemaphore:
+        """Returns the semaphore capping concurrent requests to a host."""
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = BoundedSemaphore(self.max_per_host)
+            return self._semaphores[host]
+
+    def _record(self, host: str, response: Response, elapsed: float,
+                throttled: float) -> None:
+        """Adds a finished request to the stats for its host."""
+        retries = getattr(getattr(response.raw, "retries", None), "history", ())
+        with self._lock:
+            stats = self._stats.setdefault(host, {
+                "requests": 0, "retries": 0, "bytes": 0, "total_seconds": 0.0,
+                "max_seconds": 0.0, "throttle_seconds": 0.0, "statuses": {}})
+            stats["requests"] += 1
+            stats["retries"] += len(retries)
+            stats["bytes"] += len(response.content)
+            stats["total_seconds"] += elapsed
+            stats["throttle_seconds"] += throttled
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            stats["statuses"][response.status_code] = stats["statuses"].get(
+                response.status_code, 0) + 1
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        """Sends a request through the pooled session, waiting for the
+        host's rate limit and concurrency cap first."""
+        host = urlparse(url).netloc
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+
+        throttled = self.limiter.acquire(url) if self.limiter else 0.0
+
+        with self._get_semaphore(host):
+            start = perf_counter()
+            response = self.session.request(method, url, **kwargs)
+            elapsed = perf_counter() - start
+
+        self._record(host, response, elapsed, throttled)
+        return response
+
+    def get(self, url: str, **kwargs) -> Response:
+        """Sends a GET request."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Response:
+        """Sends a POST request."""
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self) -> dict:
+        """Returns a copy of the per-host request stats."""
+        with self._lock:
+            return {host: {**stats, "statuses": dict(stats["statuses"])}
+                    for host, stats in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        """Clears the per-host request stats, keeping the open connections."""
+        with self._lock:
+            self._stats = {}
@@ -0,0 +1,110 @@
+"""Run-level metrics for the extract Lambdas: how long each phase of a run
+took and counts of what it did. At the end of a run the metrics are printed
+as a CloudWatch Embedded Metric Format log line, which CloudWatch turns
+into metrics, and a summary is returned with the handler's response."""
+
+import json
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from time import perf_counter, time
+
+
+NAMESPACE = "GamesTracker/Extract"
+
+
+class RunMetrics:
+    """Collects phase timings and counters for one run. A phase entered
+    from several threads at once adds up the time spent in each, so it
+    shows the total work done rather than the wall time of the run."""
+
+    def __init__(self, service: str, namespace: str = NAMESPACE,
+                 clock=perf_counter) -> None:
+        self.service = service
+        self.namespace = namespace
+        self.clock = clock
+        self._phases = {}
+        self._counters = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times the block as one entry into the named phase."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add_time(name, self.clock() - start)
+
+    def timed(self, name: str):
+        """Decorator that times each call of a function as the named phase."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.phase(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_time(self, name: str, seconds: float, count: int = 1) -> None:
+        """Adds time spent in a phase."""
+        with self._lock:
+            phase = self._phases.setdefault(name, {"seconds": 0.0, "count": 0})
+            phase["seconds"] += seconds
+            phase["count"] += count
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Adds to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def add_http_stats(self, http_stats: dict) -> None:
+        """Adds the per-host stats from an HttpClient: time spent waiting on
+        the network and on the rate limiter, bytes downloaded, retries and
+        a counter for each status code."""
+        for stats in http_stats.values():
+            self.add_time("http", stats["total_seconds"], stats["requests"])
+            self.add_time("throttle", stats["throttle_seconds"], stats["requests"])
+            self.increment("bytes_downloaded", stats["bytes"])
+            self.increment("http_retries", stats["retries"])
+            for status, count in stats["statuses"].items():
+                self.increment(f"http_{status}", count)
+
+    def summary(self) -> dict:
+        """Returns the phase timings and counters recorded so far."""
+        with self._lock:
+            return {"phases": {name: {"seconds": round(phase["seconds"], 3),
+                                      "count": phase["count"]}
+                               for name, phase in self._phases.items()},
+                    "counters": dict(self._counters)}
+
+    def to_emf(self) -> dict:
+        """Returns the metrics as a CloudWatch Embedded Metric Format
+        document, with the service as its only dimension."""
+        summary = self.summary()
+        document = {"Service": self.service}
+        metrics = []
+
+        for name, phase in summary["phases"].items():
+            document[f"{name}_seconds"] = phase["seconds"]
+            metrics.append({"Name": f"{name}_seconds", "Unit": "Seconds"})
+        for name, value in summary["counters"].items():
+            document[name] = value
+            metrics.append({"Name": name,
+                            "Unit": "Bytes" if name.startswith("bytes") else "Count"})
+
+        document["_aws"] = {"Timestamp": int(time() * 1000),
+                            "CloudWatchMetrics": [{"Namespace": self.namespace,
+                                                   "Dimensions": [["Service"]],
+                                                   "Metrics": metrics}]}
+        return document
+
+    def emit(self) -> None:
+        """Prints the metrics as one EMF log line."""
+        print(json.dumps(self.to_emf()))
+
+    def reset(self) -> None:
+        """Clears everything recorded, ready for the next run."""
+        with self._lock:
+            self._phases = {}
+            self._counters = {}
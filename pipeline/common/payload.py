@@ -0,0 +1,88 @@
+"""The payload format games are passed between the step function's
+Lambdas in.
+
+A batch of games is stored by column rather than by row, so each field's
+values sit together and compress well, then zlib compressed and base64
+encoded so it is still valid JSON. A batch whose encoded form is bigger
+than MAX_INLINE_BYTES is put in a blob store and only the key is passed
+on. The Parallel state hands all three extractors' payloads to the load
+step together, so each branch is kept to MAX_BRANCH_BYTES, including the
+metrics and watermark added to it, and the three stay under the state
+machine's 256 KB limit.
+
+Payloads made before this format, plain lists of game lists, can still
+be read."""
+
+import json
+import zlib
+from base64 import b64encode, b64decode
+from collections.abc import Iterable, Iterator
+
+from blob_store import BlobStore
+from game_record import FIELDS, GameRecord, records_to_columns
+
+
+PAYLOAD_FORMAT = "columns+zlib"
+MAX_STATE_BYTES = 256 * 1024
+MAX_BRANCH_BYTES = 75 * 1000
+# Room left in each branch for the metrics and watermark the handler adds.
+METADATA_BYTES = 10 * 1000
+MAX_INLINE_BYTES = MAX_BRANCH_BYTES - METADATA_BYTES
+
+
+def encode_payload(records: Iterable[GameRecord], blob_store: BlobStore = None,
+                   max_inline_bytes: int = MAX_INLINE_BYTES) -> dict:
+    """Returns the records as a payload, building its columns straight from
+    the records, which can be a generator. If the encoded batch is bigger
+    than max_inline_bytes, the batch is put in the blob store and the
+    payload holds its key instead. Raises a ValueError if such a batch
+    has no blob store to go in."""
+
+    columns = records_to_columns(records)
+    data = zlib.compress(json.dumps(columns, separators=(",", ":")).encode("utf-8"))
+    encoded = b64encode(data).decode("ascii")
+
+    payload = {"format": PAYLOAD_FORMAT, "count": len(columns[FIELDS[0]])}
+    if len(encoded) <= max_inline_bytes:
+        payload["data"] = encoded
+    elif blob_store is not None:
+        payload["blob"] = blob_store.put(data)
+    else:
+        raise ValueError(f"Payload of {len(encoded)} bytes is over the inline limit "
+                         f"of {max_inline_bytes}, and no blob store is set")
+
+    return payload
+
+
+def decode_columns(payload: dict, blob_store: BlobStore = None) -> dict[str, list]:
+    """Returns the columns in a payload, getting them from the blob
+    store if the payload holds a key."""
+
+    if payload["format"] != PAYLOAD_FORMAT:
+        raise ValueError(f"Unknown payload format: {payload['format']}")
+
+    if "blob" in payload:
+        if blob_store is None:
+            raise ValueError("Payload is in a blob store, but none is set")
+        data = blob_store.get(payload["blob"])
+        if data is None:
+            raise ValueError(f"Payload {payload['blob']} is not in the blob store")
+    else:
+        data = b64decode(payload["data"])
+
+    return json.loads(zlib.decompress(data))
+
+
+def iter_records(payload, blob_store: BlobStore = None) -> Iterator[GameRecord]:
+    """Yields the records in a payload one at a time, building each from
+    its columns as it is reached. Payloads in the old list form are read
+    a game list at a time."""
+
+    if isinstance(payload, list):
+        rows = payload
+    else:
+        columns = decode_columns(payload, blob_store)
+        rows = zip(*(columns[field] for field in FIELDS))
+
+    for values in rows:
+        yield GameRecord.from_list(values)
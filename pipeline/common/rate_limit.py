@@ -0,0 +1,75 @@
+"""Rate limiting helpers shared by the extract Lambdas."""
+
+from threading import Lock
+from time import monotonic, sleep
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """A thread-safe token bucket. Tokens refill at `rate` per second
+    up to `capacity`, and each request spends one token."""
+
+    def __init__(self, rate: float, capacity: int = 1,
+                 clock=monotonic, sleeper=sleep) -> None:
+        """Starts the bucket full so the first `capacity` requests
+        go out straight away."""
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleeper
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = Lock()
+
+    def _refill(self) -> None:
+        """Adds the tokens earned since the last refill."""
+        now = self._clock()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Takes a token, blocking until one is available.
+        Returns the number of seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+
+class HostRateLimiter:
+    """Keeps a separate token bucket for each host, so that one slow store
+    does not hold back requests to another."""
+
+    def __init__(self, rate: float, capacity: int = 1,
+                 clock=monotonic, sleeper=sleep) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleeper
+        self._buckets = {}
+        self._lock = Lock()
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        """Returns the token bucket for the host of the given URL."""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.capacity,
+                                                  self._clock, self._sleep)
+            return self._buckets[host]
+
+    def acquire(self, url: str) -> float:
+        """Blocks until a request to the URL's host is allowed.
+        Returns the number of seconds spent waiting."""
+        return self.get_bucket(url).acquire()
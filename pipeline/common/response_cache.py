@@ -0,0 +1,153 @@
+"""A cache of extracted game page records, revalidated with conditional
+requests so unchanged pages are neither downloaded nor parsed again."""
+
+import json
+import sqlite3
+from hashlib import sha256
+from threading import Lock
+from time import time
+
+from requests import Response
+
+from blob_store import BlobStore, S3BlobStore
+from http_client import HttpClient
+
+
+DEFAULT_MAX_ENTRIES = 5000
+
+
+class ResponseCache:
+    """The interface every cache backend provides. This base class
+    stores nothing, so it can be used when caching is turned off."""
+
+    def get(self, url: str) -> dict:
+        """Returns the cached entry for a URL, or None. An entry has
+        the keys etag, last_modified and record."""
+        return None
+
+    def put(self, url: str, etag: str, last_modified: str, record) -> None:
+        """Stores the validators and extracted record for a URL."""
+
+    def close(self) -> None:
+        """Releases anything the backend holds open."""
+
+
+class SQLiteCache(ResponseCache):
+    """Keeps entries in a SQLite file, evicting the least recently used
+    entries once there are more than max_entries."""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS response_cache (
+                              url TEXT PRIMARY KEY,
+                              etag TEXT,
+                              last_modified TEXT,
+                              record TEXT NOT NULL,
+                              accessed_at REAL NOT NULL);""")
+        self._conn.commit()
+
+    def get(self, url: str) -> dict:
+        with self._lock:
+            row = self._conn.execute("""SELECT etag, last_modified, record
+                                        FROM response_cache WHERE url = ?;""",
+                                     (url,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("""UPDATE response_cache SET accessed_at = ?
+                                  WHERE url = ?;""", (time(), url))
+            self._conn.commit()
+        return {"etag": row[0], "last_modified": row[1],
+                "record": json.loads(row[2])}
+
+    def put(self, url: str, etag: str, last_modified: str, record) -> None:
+        with self._lock:
+            self._conn.execute("""INSERT OR REPLACE INTO response_cache
+                                  (url, etag, last_modified, record, accessed_at)
+                                  VALUES (?, ?, ?, ?, ?);""",
+                               (url, etag, last_modified, json.dumps(record), time()))
+            self._conn.execute("""DELETE FROM response_cache WHERE url IN
+                                  (SELECT url FROM response_cache
+                                  ORDER BY accessed_at DESC LIMIT -1 OFFSET ?);""",
+                               (self.max_entries,))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM response_cache;").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class BlobStoreCache(ResponseCache):
+    """Keeps each entry as a JSON blob in a blob store, so the cache
+    outlives the container it was filled in. Entries are not evicted
+    here; an S3 bucket should expire them under the store's prefix."""
+
+    def __init__(self, blob_store: BlobStore, prefix: str = "response-cache/") -> None:
+        self.blob_store = blob_store
+        self.prefix = prefix
+
+    def _get_key(self, url: str) -> str:
+        """Returns the key an entry for a URL is stored under."""
+        return f"{self.prefix}{sha256(url.encode()).hexdigest()}.json"
+
+    def get(self, url: str) -> dict:
+        data = self.blob_store.get(self._get_key(url))
+        if data is None:
+            return None
+        return json.loads(data)
+
+    def put(self, url: str, etag: str, last_modified: str, record) -> None:
+        entry = {"etag": etag, "last_modified": last_modified, "record": record}
+        self.blob_store.put(json.dumps(entry).encode(), self._get_key(url))
+
+
+def get_response_cache(config) -> ResponseCache:
+    """Returns the cache backend named by the config: a SQLite file at
+    RESPONSE_CACHE_PATH, or objects in the S3 bucket RESPONSE_CACHE_BUCKET.
+    Caching is off unless one of them is set."""
+    if config.get("RESPONSE_CACHE_BUCKET"):
+        return BlobStoreCache(S3BlobStore(config["RESPONSE_CACHE_BUCKET"]))
+    if config.get("RESPONSE_CACHE_PATH"):
+        return SQLiteCache(config["RESPONSE_CACHE_PATH"],
+                           int(config.get("RESPONSE_CACHE_MAX_ENTRIES",
+                                          DEFAULT_MAX_ENTRIES)))
+    return ResponseCache()
+
+
+def get_conditional_headers(entry: dict) -> dict:
+    """Returns the headers that ask the server to reply 304 if the
+    cached entry is still current."""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def get_record(client: HttpClient, cache: ResponseCache, url: str,
+               parse, **kwargs):
+    """Returns the record extracted from a page by parse(response).
+    If the cache has an entry for the URL the request is made conditional,
+    and on a 304 the cached record is returned without parsing anything."""
+    entry = cache.get(url)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry:
+        headers.update(get_conditional_headers(entry))
+
+    response: Response = client.get(url, headers=headers, **kwargs)
+    if entry and response.status_code == 304:
+        return entry["record"]
+
+    record = parse(response)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if response.status_code == 200 and (etag or last_modified):
+        cache.put(url, etag, last_modified, record)
+    return record
@@ -0,0 +1,44 @@
+"""Tests for game_record.py."""
+
+from datetime import datetime
+
+from game_record import (GameRecord, records_to_payload, records_from_payload,
+                         records_to_columns, records_from_columns)
+
+
+PAYLOAD = [["Stardew Valley", "A great game", 4.99, "ConcernedApe", None,
+            "2000-11-29 14:48:00", 5, 1, ["A", "Great"], [1, 2]],
+           ["Minecraft", "So blocky", 25.01, "Mojang", "Notch",
+            "2024-08-12 10:01:01", None, 3, [], [1]]]
+
+
+def test_from_list_parses_release_date():
+    """Tests that the payload's release date string becomes a datetime."""
+    record = GameRecord.from_list(PAYLOAD[0])
+    assert record.title == "Stardew Valley"
+    assert record.publisher is None
+    assert record.release_date == datetime(2000, 11, 29, 14, 48)
+    assert record.platform_ids == [1, 2]
+
+
+def test_payload_round_trip():
+    """Tests that records survive being turned into a payload and back."""
+    records = records_from_payload(PAYLOAD)
+    assert records_to_payload(records) == PAYLOAD
+    assert records_from_payload(records_to_payload(records)) == records
+
+
+def test_columns_round_trip():
+    """Tests that the columnar form holds one list per field."""
+    records = records_from_payload(PAYLOAD)
+    columns = records_to_columns(records)
+    assert columns["title"] == ["Stardew Valley", "Minecraft"]
+    assert columns["release_date"] == ["2000-11-29 14:48:00", "2024-08-12 10:01:01"]
+    assert records_from_columns(columns) == records
+
+
+def test_records_have_no_dict():
+    """Tests that records use slots rather than a per-instance dict."""
+    record = GameRecord.from_list(PAYLOAD[1])
+    assert not hasattr(record, "__dict__")
+    assert record != GameRecord.from_list(PAYLOAD[0])
@@ -0,0 +1,50 @@
+"""Tests for http_client.py."""
+
+from http_client import HttpClient
+
+
+def test_get_records_stats(requests_mock):
+    """Tests that each request is counted against its host."""
+    requests_mock.get("https://www.gog.com/a", text="ok")
+    requests_mock.get("https://www.gog.com/b", status_code=404)
+    client = HttpClient()
+
+    assert client.get("https://www.gog.com/a").text == "ok"
+    client.get("https://www.gog.com/b")
+
+    stats = client.get_stats()["www.gog.com"]
+    assert stats["requests"] == 2
+    assert stats["statuses"] == {200: 1, 404: 1}
+    assert stats["bytes"] == 2
+    assert stats["total_seconds"] >= stats["max_seconds"] >= 0
+    assert stats["throttle_seconds"] == 0
+
+
+def test_post_sends_json(requests_mock):
+    """Tests that post passes its arguments on to the session."""
+    requests_mock.post("https://graphql.epicgames.com/graphql", json={"data": 1})
+    client = HttpClient(headers={"User-Agent": "test"})
+
+    assert client.post("https://graphql.epicgames.com/graphql",
+                       json={"query": "{}"}).json() == {"data": 1}
+    assert requests_mock.last_request.json() == {"query": "{}"}
+    assert requests_mock.last_request.headers["User-Agent"] == "test"
+
+
+def test_session_is_pooled_with_retries():
+    """Tests that the mounted adapter keeps a pool and retries."""
+    client = HttpClient(max_per_host=4, max_retries=2)
+    adapter = client.session.get_adapter("https://store.steampowered.com")
+
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 2
+    assert 503 in adapter.max_retries.status_forcelist
+
+
+def test_reset_stats(requests_mock):
+    """Tests that reset_stats clears the counters."""
+    requests_mock.get("https://www.gog.com/a", text="ok")
+    client = HttpClient(requests_per_second=100)
+    client.get("https://www.gog.com/a")
+    client.reset_stats()
+    assert client.get_stats() == {}
@@ -0,0 +1,82 @@
+"""Tests for metrics.py."""
+
+from metrics import RunMetrics
+
+
+class FakeClock:
+    """A clock that moves on one second every time it is read."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now += 1.0
+        return self.now
+
+
+def test_phase_and_timed_add_up():
+    """Tests that each entry into a phase adds its time and a count."""
+    metrics = RunMetrics("test", clock=FakeClock())
+
+    @metrics.timed("parse")
+    def parse(value):
+        return value * 2
+
+    with metrics.phase("listing"):
+        pass
+    assert parse(2) == 4
+    assert parse(3) == 6
+
+    assert metrics.summary()["phases"] == {"listing": {"seconds": 1.0, "count": 1},
+                                           "parse": {"seconds": 2.0, "count": 2}}
+
+
+def test_phase_records_time_when_it_raises():
+    """Tests that a phase that raises is still timed."""
+    metrics = RunMetrics("test", clock=FakeClock())
+    try:
+        with metrics.phase("listing"):
+            raise ValueError
+    except ValueError:
+        pass
+    assert metrics.summary()["phases"]["listing"]["count"] == 1
+
+
+def test_add_http_stats():
+    """Tests that client stats become network and throttle phases and counters."""
+    metrics = RunMetrics("test")
+    metrics.add_http_stats({"a.com": {"requests": 3, "retries": 1, "bytes": 100,
+                                      "total_seconds": 2.0, "max_seconds": 1.0,
+                                      "throttle_seconds": 0.5,
+                                      "statuses": {200: 2, 503: 1}}})
+    summary = metrics.summary()
+    assert summary["phases"]["http"] == {"seconds": 2.0, "count": 3}
+    assert summary["phases"]["throttle"] == {"seconds": 0.5, "count": 3}
+    assert summary["counters"] == {"bytes_downloaded": 100, "http_retries": 1,
+                                   "http_200": 2, "http_503": 1}
+
+
+def test_to_emf_declares_every_metric():
+    """Tests that every value in the EMF document is declared with a unit."""
+    metrics = RunMetrics("steam_extract", clock=FakeClock())
+    with metrics.phase("listing"):
+        pass
+    metrics.increment("games_emitted", 4)
+    metrics.increment("bytes_downloaded", 10)
+
+    document = metrics.to_emf()
+    declared = document["_aws"]["CloudWatchMetrics"][0]
+    assert document["Service"] == "steam_extract"
+    assert declared["Dimensions"] == [["Service"]]
+    assert {metric["Name"]: metric["Unit"] for metric in declared["Metrics"]} == {
+        "listing_seconds": "Seconds", "games_emitted": "Count",
+        "bytes_downloaded": "Bytes"}
+    assert document["games_emitted"] == 4
+
+
+def test_reset():
+    """Tests that reset clears phases and counters."""
+    metrics = RunMetrics("test")
+    metrics.increment("games_emitted")
+    metrics.reset()
+    assert metrics.summary() == {"phases": {}, "counters": {}}
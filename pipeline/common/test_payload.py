@@ -0,0 +1,137 @@
+"""Tests for payload.py and blob_store.py."""
+
+import json
+from random import Random
+from string import ascii_letters
+from unittest.mock import MagicMock
+
+from pytest import raises, mark
+
+from blob_store import LocalBlobStore, S3BlobStore, get_blob_store
+from game_record import records_from_payload
+from payload import (encode_payload, decode_columns, iter_records,
+                     MAX_BRANCH_BYTES, MAX_STATE_BYTES)
+
+
+GAMES = [["Stardew Valley", "A great game " * 50, 4.99, "ConcernedApe", None,
+          "2000-11-29 14:48:00", 5, 1, ["A", "Great"], [1, 2]],
+         ["Minecraft", "So blocky", 25.01, "Mojang", "Notch",
+          "2024-08-12 10:01:01", None, 3, [], [1]]]
+
+
+def test_inline_payload_round_trip():
+    """Tests that a small batch is held inline and read back in order."""
+    records = records_from_payload(GAMES)
+    payload = encode_payload(records)
+    assert payload["count"] == 2
+    assert "blob" not in payload
+    assert len(json.dumps(payload)) < len(json.dumps(GAMES))
+    assert list(iter_records(payload)) == records
+    assert decode_columns(payload)["title"] == ["Stardew Valley", "Minecraft"]
+
+
+def test_payload_from_a_generator():
+    """Tests that records can be encoded as they are generated."""
+    records = records_from_payload(GAMES)
+    payload = encode_payload(record for record in records)
+    assert payload["count"] == 2
+    assert list(iter_records(payload)) == records
+
+
+def test_large_payload_spills_to_blob_store(tmp_path):
+    """Tests that a batch over the inline limit is put in the blob store."""
+    store = LocalBlobStore(str(tmp_path))
+    records = records_from_payload(GAMES)
+    payload = encode_payload(records, store, max_inline_bytes=10)
+    assert "data" not in payload
+    assert (tmp_path / payload["blob"]).exists()
+    assert list(iter_records(payload, store)) == records
+
+
+def test_blob_payload_needs_a_store(tmp_path):
+    """Tests that a payload in a blob store cannot be read without one."""
+    payload = encode_payload(records_from_payload(GAMES),
+                             LocalBlobStore(str(tmp_path)), max_inline_bytes=10)
+    with raises(ValueError):
+        decode_columns(payload)
+
+
+def test_large_payload_needs_a_store():
+    """Tests that a batch over the inline limit is not inlined without a store."""
+    with raises(ValueError):
+        encode_payload(records_from_payload(GAMES), max_inline_bytes=10)
+
+
+def test_three_branches_fit_in_the_state_limit(tmp_path):
+    """Tests that the biggest inline payloads of all three branches, with
+    their metrics and watermarks, fit in one step function state."""
+    rng = Random(0)
+    store = LocalBlobStore(str(tmp_path))
+    metrics = {"phases": {name: {"seconds": 12.345, "count": 1000}
+                          for name in ("run", "listing", "products", "parse", "encode")},
+               "counters": {f"counter_{i}": 123456 for i in range(20)}}
+    watermark = {"store": "steam", "release_date": "2024-08-12T10:01:01",
+                 "seen_ids": [f"/app/{i}/some-long-game-title-{i}/" for i in range(100)]}
+
+    biggest = None
+    for count in range(0, 2000, 50):
+        games = [[f"Game {i}", "".join(rng.choices(ascii_letters, k=100)), 4.99,
+                  "Dev", "Pub", "2024-08-12 10:01:01", 75.0, 1, ["Tag"], [1]]
+                 for i in range(count)]
+        payload = encode_payload(records_from_payload(games), store)
+        if "data" in payload:
+            biggest = {**payload, "metrics": metrics, "watermark": watermark}
+
+    assert biggest["count"] > 0
+    assert len(json.dumps(biggest)) <= MAX_BRANCH_BYTES
+    assert len(json.dumps([biggest] * 3)) < MAX_STATE_BYTES
+
+
+def test_iter_records_reads_old_list_payloads():
+    """Tests that payloads of plain game lists can still be read."""
+    assert list(iter_records(GAMES)) == records_from_payload(GAMES)
+
+
+def test_s3_blob_store_round_trip():
+    """Tests that the S3 store puts and gets objects under its prefix."""
+    s3_client = MagicMock()
+    store = S3BlobStore("bucket", s3_client=s3_client)
+    key = store.put(b"data")
+    assert key.startswith("payloads/")
+    s3_client.put_object.assert_called_once_with(Bucket="bucket", Key=key, Body=b"data")
+    s3_client.get_object.return_value = {"Body": MagicMock(read=lambda: b"data")}
+    assert store.get(key) == b"data"
+
+
+class ClientError(Exception):
+    """Stands in for botocore's ClientError."""
+
+    def __init__(self, code: str) -> None:
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+@mark.parametrize("code", ["NoSuchKey", "404"])
+def test_s3_blob_store_missing_key(code):
+    """Tests that a missing key is None."""
+    s3_client = MagicMock()
+    s3_client.exceptions.ClientError = ClientError
+    s3_client.get_object.side_effect = ClientError(code)
+    assert S3BlobStore("bucket", s3_client=s3_client).get("watermarks/steam.json") is None
+
+
+@mark.parametrize("code", ["403", "AccessDenied", "SlowDown"])
+def test_s3_blob_store_raises_other_errors(code):
+    """Tests that errors other than a missing key, such as a permission
+    failure, are raised."""
+    s3_client = MagicMock()
+    s3_client.exceptions.ClientError = ClientError
+    s3_client.get_object.side_effect = ClientError(code)
+    with raises(ClientError):
+        S3BlobStore("bucket", s3_client=s3_client).get("watermarks/steam.json")
+
+
+def test_get_blob_store(tmp_path):
+    """Tests that the blob store is chosen from the config."""
+    assert get_blob_store({}) is None
+    assert isinstance(get_blob_store({"PAYLOAD_DIR": str(tmp_path)}), LocalBlobStore)
@@ -0,0 +1,52 @@
+"""Tests for rate_limit.py."""
+
+from pytest import raises
+
+from rate_limit import TokenBucket, HostRateLimiter
+
+
+class FakeClock:
+    """A clock that only moves when something sleeps on it."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Moves the clock forward instead of sleeping."""
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst():
+    """Tests that a full bucket hands out its capacity without waiting."""
+    clock = FakeClock()
+    bucket = TokenBucket(2, capacity=3, clock=clock, sleeper=clock.sleep)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+
+
+def test_token_bucket_waits_for_refill():
+    """Tests that an empty bucket waits 1/rate seconds for a token."""
+    clock = FakeClock()
+    bucket = TokenBucket(4, capacity=1, clock=clock, sleeper=clock.sleep)
+    bucket.acquire()
+    assert bucket.acquire() == 0.25
+    assert clock.now == 0.25
+
+
+def test_token_bucket_bad_rate():
+    """Tests that a non-positive rate is rejected."""
+    with raises(ValueError):
+        TokenBucket(0)
+
+
+def test_host_rate_limiter_separates_hosts():
+    """Tests that each host gets its own bucket."""
+    clock = FakeClock()
+    limiter = HostRateLimiter(1, clock=clock, sleeper=clock.sleep)
+    assert limiter.acquire("https://store.steampowered.com/app/1") == 0
+    assert limiter.acquire("https://www.gog.com/en/game/a") == 0
+    assert limiter.acquire("https://store.steampowered.com/app/2") == 1
+    assert limiter.get_bucket("https://www.gog.com/x") is limiter.get_bucket(
+        "https://www.gog.com/y")
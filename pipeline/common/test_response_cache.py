@@ -0,0 +1,79 @@
+"""Tests for response_cache.py."""
+
+from blob_store import LocalBlobStore
+from http_client import HttpClient
+from response_cache import (ResponseCache, SQLiteCache, BlobStoreCache, get_record,
+                            get_response_cache, get_conditional_headers)
+
+
+def test_sqlite_cache_round_trip(tmp_path):
+    """Tests that a stored entry comes back unchanged."""
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    cache.put("https://a", '"v1"', None, {"tags": ["Indie"], "rating": 50.0})
+    assert cache.get("https://a") == {"etag": '"v1"', "last_modified": None,
+                                      "record": {"tags": ["Indie"], "rating": 50.0}}
+    assert cache.get("https://b") is None
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    """Tests that the cache stays within max_entries."""
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=2)
+    cache.put("https://a", "a", None, 1)
+    cache.put("https://b", "b", None, 2)
+    cache.get("https://a")
+    cache.put("https://c", "c", None, 3)
+    assert len(cache) == 2
+    assert cache.get("https://b") is None
+    assert cache.get("https://a")["record"] == 1
+
+
+def test_blob_store_cache_outlives_its_instance(tmp_path):
+    """Tests that an entry put by one cache is read back by a new one
+    over the same blob store."""
+    BlobStoreCache(LocalBlobStore(str(tmp_path))).put(
+        "https://a", '"v1"', "Mon", {"tags": ["Indie"]})
+    cache = BlobStoreCache(LocalBlobStore(str(tmp_path)))
+    assert cache.get("https://a") == {"etag": '"v1"', "last_modified": "Mon",
+                                      "record": {"tags": ["Indie"]}}
+    assert cache.get("https://b") is None
+
+
+def test_get_response_cache_off_by_default(tmp_path):
+    """Tests that caching is only turned on by RESPONSE_CACHE_PATH."""
+    assert type(get_response_cache({})) is ResponseCache
+    assert isinstance(get_response_cache(
+        {"RESPONSE_CACHE_PATH": str(tmp_path / "c.db")}), SQLiteCache)
+
+
+def test_get_conditional_headers():
+    """Tests that both validators are sent when stored."""
+    assert get_conditional_headers({"etag": '"x"', "last_modified": "Mon"}) == {
+        "If-None-Match": '"x"', "If-Modified-Since": "Mon"}
+
+
+def test_get_record_reuses_record_on_304(requests_mock, tmp_path):
+    """Tests that a 304 returns the stored record without parsing."""
+    url = "https://store.steampowered.com/app/1/"
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    client = HttpClient()
+    parsed = []
+
+    def parse(response):
+        parsed.append(response.text)
+        return {"description": response.text}
+
+    requests_mock.get(url, text="first", headers={"ETag": '"v1"'})
+    assert get_record(client, cache, url, parse) == {"description": "first"}
+
+    requests_mock.get(url, status_code=304, request_headers={"If-None-Match": '"v1"'})
+    assert get_record(client, cache, url, parse) == {"description": "first"}
+    assert parsed == ["first"]
+
+
+def test_get_record_without_validators_is_not_cached(requests_mock, tmp_path):
+    """Tests that responses without an ETag or Last-Modified are not stored."""
+    url = "https://www.gog.com/en/game/a"
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    requests_mock.get(url, text="page")
+    get_record(HttpClient(), cache, url, lambda response: response.text)
+    assert cache.get(url) is None
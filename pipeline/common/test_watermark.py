@@ -0,0 +1,72 @@
+"""Tests for watermark.py."""
+
+import json
+from datetime import datetime, timedelta
+
+from blob_store import LocalBlobStore
+from watermark import (Watermark, read_watermark, save_watermark, get_product_id,
+                       MAX_CATCH_UP)
+
+
+NOW = datetime(2024, 4, 24, 12, 0)
+
+
+def test_is_new_at_the_watermark():
+    """Tests that only unseen games at the watermark are new."""
+    watermark = Watermark("gog", NOW, ["/game/a"])
+    assert watermark.is_new(NOW + timedelta(seconds=1), "/game/a")
+    assert watermark.is_new(NOW, "/game/b")
+    assert not watermark.is_new(NOW, "/game/a")
+    assert not watermark.is_new(NOW - timedelta(seconds=1), "/game/c")
+    assert watermark.is_older(NOW - timedelta(seconds=1))
+
+
+def test_advanced_keeps_ids_at_the_latest_date():
+    """Tests that the advanced watermark moves to the latest game observed
+    and only keeps the ids released then."""
+    watermark = Watermark("gog", NOW, ["/game/a"])
+    later = NOW + timedelta(hours=2)
+    watermark.observe(NOW, "/game/b")
+    watermark.observe(later, "/game/c")
+    watermark.observe(NOW + timedelta(hours=1), "/game/d")
+    watermark.observe(later, "/game/e")
+    assert watermark.advanced() == Watermark("gog", later, ["/game/c", "/game/e"])
+    assert watermark.release_date == NOW
+
+
+def test_advanced_without_games_is_unchanged():
+    """Tests that a run with no new games keeps the watermark."""
+    watermark = Watermark("gog", NOW, ["/game/a"])
+    watermark.observe(NOW, "/game/b")
+    assert watermark.advanced() == Watermark("gog", NOW, ["/game/a", "/game/b"])
+    assert Watermark("epic", NOW).advanced() == Watermark("epic", NOW)
+
+
+def test_read_watermark_defaults_to_a_day_back(tmp_path):
+    """Tests that a store without a saved watermark starts a day back."""
+    assert read_watermark("steam", now=NOW) == Watermark("steam", NOW - timedelta(days=1))
+    store = LocalBlobStore(str(tmp_path))
+    assert read_watermark("steam", store, NOW) == Watermark("steam", NOW - timedelta(days=1))
+
+
+def test_save_and_read_watermark(tmp_path):
+    """Tests that a saved watermark is read back for its own store only."""
+    store = LocalBlobStore(str(tmp_path))
+    watermark = Watermark("gog", NOW - timedelta(hours=3), ["/game/a"])
+    save_watermark(watermark, store)
+    assert read_watermark("gog", store, NOW) == watermark
+    assert read_watermark("epic", store, NOW) == Watermark("epic", NOW - timedelta(days=1))
+    assert json.loads(store.get("watermarks/gog.json"))["seen_ids"] == ["/game/a"]
+
+
+def test_read_watermark_caps_catch_up(tmp_path):
+    """Tests that a watermark left behind by an outage is moved up to the
+    oldest point a single run catches up from."""
+    store = LocalBlobStore(str(tmp_path))
+    save_watermark(Watermark("gog", NOW - timedelta(days=30), ["/game/a"]), store)
+    assert read_watermark("gog", store, NOW) == Watermark("gog", NOW - MAX_CATCH_UP)
+
+
+def test_get_product_id_ignores_query():
+    """Tests that tracking parameters do not change a product's id."""
+    assert get_product_id("https://store.steampowered.com/app/10/?snr=1_7") == "/app/10/"
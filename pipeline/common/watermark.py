@@ -0,0 +1,108 @@
+"""Per-store high-watermarks, so each extract run picks up from where the
+last loaded run stopped instead of a fixed 24 hour window.
+
+A watermark is the latest release date loaded for a store, along with the
+ids of the products released at exactly that time. An extractor reads the
+watermark at the start of a run, keeps the games it marks as new, and
+passes the advanced watermark on in its payload. The load stage saves it
+once the games are committed, so a failed run is simply retried."""
+
+import json
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from blob_store import BlobStore
+
+
+WATERMARK_KEY = "watermarks/{store}.json"
+DEFAULT_LOOKBACK = timedelta(days=1)
+MAX_CATCH_UP = timedelta(days=7)
+
+
+class Watermark:
+    """The latest release date loaded for a store, and the ids of the
+    products released at that time. Games seen during a run are recorded
+    with observe, and advanced returns the watermark to save after it."""
+
+    def __init__(self, store: str, release_date: datetime, seen_ids=()) -> None:
+        self.store = store
+        self.release_date = release_date
+        self.seen_ids = set(seen_ids)
+        self._next_date = release_date
+        self._next_ids = set(seen_ids)
+
+    def is_older(self, release_date: datetime) -> bool:
+        """Returns True if a game was released before the watermark."""
+        return release_date < self.release_date
+
+    def is_seen(self, product_id: str) -> bool:
+        """Returns True if a product at the watermark has been loaded."""
+        return product_id in self.seen_ids
+
+    def is_new(self, release_date: datetime, product_id: str) -> bool:
+        """Returns True if a game has not been loaded by an earlier run."""
+        if release_date > self.release_date:
+            return True
+        return release_date == self.release_date and not self.is_seen(product_id)
+
+    def observe(self, release_date: datetime, product_id: str) -> None:
+        """Records a game extracted in this run."""
+        if release_date > self._next_date:
+            self._next_date = release_date
+            self._next_ids = set()
+        if release_date == self._next_date:
+            self._next_ids.add(product_id)
+
+    def advanced(self) -> "Watermark":
+        """Returns the watermark to save once this run's games are loaded."""
+        return Watermark(self.store, self._next_date, self._next_ids)
+
+    def to_dict(self) -> dict:
+        """Returns the watermark as a JSON-safe dict."""
+        return {"store": self.store,
+                "release_date": self.release_date.isoformat(),
+                "seen_ids": sorted(self.seen_ids)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Watermark":
+        """Builds a watermark from the dict made by to_dict."""
+        return cls(data["store"], datetime.fromisoformat(data["release_date"]),
+                   data["seen_ids"])
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Watermark):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return (f"Watermark({self.store!r}, {self.release_date!r}, "
+                f"{len(self.seen_ids)} seen)")
+
+
+def read_watermark(store: str, blob_store: BlobStore = None,
+                   now: datetime = None) -> Watermark:
+    """Returns the saved watermark for a store. A store with no watermark
+    starts a day back, and one older than MAX_CATCH_UP is moved up to it,
+    so catching up after an outage is a single bounded run."""
+    now = now or datetime.now()
+    data = blob_store.get(WATERMARK_KEY.format(store=store)) if blob_store else None
+
+    if data is None:
+        return Watermark(store, now - DEFAULT_LOOKBACK)
+
+    watermark = Watermark.from_dict(json.loads(data))
+    if watermark.release_date < now - MAX_CATCH_UP:
+        return Watermark(store, now - MAX_CATCH_UP)
+    return watermark
+
+
+def save_watermark(watermark: Watermark, blob_store: BlobStore) -> None:
+    """Saves a store's watermark for the next run to read."""
+    blob_store.put(json.dumps(watermark.to_dict()).encode(),
+                   WATERMARK_KEY.format(store=watermark.store))
+
+
+def get_product_id(url: str) -> str:
+    """Returns the id a product is tracked by: the path of its store URL,
+    which stays the same when tracking parameters are added to it."""
+    return urlparse(url).path
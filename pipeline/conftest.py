@@ -0,0 +1,8 @@
+"""A conftest file shared by every pipeline test. Each Lambda image has the
+modules in common/ copied next to its own script, so we put that folder on
+the path to mirror that flat layout."""
+
+import sys
+from os import path
+
+sys.path.insert(0, path.join(path.dirname(__file__), "common"))
@@ -12,6 +12,7 @@ def epic_game_post_response() -> dict:
                 "searchStore": {
                     "elements": [
                         {
+                            "id": "4b5f6ed4c09e4bcb8e46d8ba7ea1a5b2",
                             "title": "Vengeance of Mr. Peppermint",
                             "releaseDate": "2024-04-24T16:00:00.000Z",
                             "description": "Long ago, they killed his sister. Now, he will kill them.",
@@ -69,6 +70,7 @@ def epic_game_post_response() -> dict:
 def epic_game_data_game_obj() -> dict:
     '''Returns an example post response.'''
     return {
+        "id": "4b5f6ed4c09e4bcb8e46d8ba7ea1a5b2",
         "title": "Vengeance of Mr. Peppermint",
         "releaseDate": "2024-04-24T16:00:00.000Z",
         "description": "Long ago, they killed his sister. Now, he will kill them.",
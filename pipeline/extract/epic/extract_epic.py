@@ -1,49 +1,101 @@
 """Extracting game details from EPIC games"""
 
-import requests as req
 from dotenv import load_dotenv
 from os import environ
 from datetime import datetime, timedelta
-
-
-def get_games_data(config) -> list[dict]:
-    """Returns games json data."""
-    today_date = datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-    yesterday_date = (
-        (datetime.now()-timedelta(days=1.0)).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z')
-    query = """{{
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import HttpClient
+from game_record import GameRecord
+from blob_store import get_blob_store
+from payload import encode_payload
+from metrics import RunMetrics
+from watermark import Watermark, read_watermark
+
+
+EPIC_CLIENT = HttpClient(max_per_host=4, headers={
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:123.0) Gecko/20100101 Firefox/123.0"
+})
+METRICS = RunMetrics("extract_epic")
+PAGE_SIZE = 40
+MAX_WORKERS = 4
+
+
+def get_search_query(start: int, count: int, previous_day: str, today: str) -> str:
+    """Returns the GraphQL query for one page of games released between
+    previous_day and today, asking only for the fields get_game_details
+    reads and the total number of games."""
+    return """{{
 	Catalog {{
-		searchStore (count:40, sortBy: "releaseDate", sortDir: "DESC",
+		searchStore (start: {start}, count: {count}, sortBy: "releaseDate", sortDir: "DESC",
 								 releaseDate: "[{previous_day},{today}]") {{
 			elements {{
-				title,
-				releaseDate,
-				description,
-				publisherDisplayName,
+				id
+				title
+				releaseDate
+				description
+				publisherDisplayName
 				developerDisplayName
 				currentPrice
-				seller {{
-					name
-				}}
 				tags {{
 					name
-					groupName
-				}}
-				categories {{
-					path
 				}}
 			}}
+			paging {{
+				total
+			}}
 		}}
 	}}
-}}""".format(previous_day=yesterday_date, today=today_date)
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:123.0) Gecko/20100101 Firefox/123.0"
-    }
-    res = req.post(config["EPIC_BASE_URL"], json={
-                   "query": query}, headers=headers, timeout=10)
+}}""".format(start=start, count=count, previous_day=previous_day, today=today)
+
+
+@METRICS.timed("listing")
+def get_games_page(config, start: int, count: int, previous_day: str,
+                   today: str) -> dict:
+    """Returns one page of the search results, with its elements and paging."""
+    query = get_search_query(start, count, previous_day, today)
+    res = EPIC_CLIENT.post(config["EPIC_BASE_URL"], json={
+                           "query": query}, timeout=10)
     game_data = res.json()
-    games = game_data['data']['Catalog']['searchStore']['elements']
-    return games
+    return game_data['data']['Catalog']['searchStore']
+
+
+def iter_games_data(config, page_size: int = PAGE_SIZE,
+                    max_workers: int = MAX_WORKERS,
+                    since: datetime = None) -> Iterator[list[dict]]:
+    """Yields each page of games json data released since the given time,
+    or in the last day, in order. The first page gives the total number of
+    games, then every other page is fetched at once, and each page is
+    yielded as soon as it and the pages before it are in. A response
+    without paging is taken to be the only page."""
+    since = since or datetime.now() - timedelta(days=1.0)
+    today_date = datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+    yesterday_date = since.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    first_page = get_games_page(config, 0, page_size, yesterday_date, today_date)
+    yield first_page['elements']
+
+    total = (first_page.get('paging') or {}).get('total') or 0
+    if total <= page_size:
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = [executor.submit(get_games_page, config, start, page_size,
+                                 yesterday_date, today_date)
+                 for start in range(page_size, total, page_size)]
+        for page in pages:
+            yield page.result()['elements']
+
+
+def get_games_data(config) -> list[dict]:
+    """Returns games json data, from every page of the search results."""
+    return [game for page in iter_games_data(config) for game in page]
+
+
+def get_game_id(game_obj: dict) -> str:
+    """Returns the store's id for a game from game json object."""
+    return game_obj['id']
 
 
 def get_game_title(game_obj: dict) -> str:
@@ -85,9 +137,9 @@ def get_price(game_obj: dict) -> float:
     return game_obj['currentPrice']/100
 
 
-def get_release_date(game_obj: dict):
+def get_release_date(game_obj: dict) -> datetime:
     """Returns release date from game json object."""
-    return str(datetime.fromisoformat(game_obj['releaseDate'][:-5]))
+    return datetime.fromisoformat(game_obj['releaseDate'][:-5])
 
 
 def get_platform_ids(game_tags: list[str]) -> list[int]:
@@ -111,8 +163,8 @@ def remove_platforms_from_tags(game_tags: list[str]) -> list[str]:
     return game_tags
 
 
-def get_game_details(game_obj: dict) -> list:
-    """Returns list of relevant details from game json object."""
+def get_game_details(game_obj: dict) -> GameRecord:
+    """Returns a record of relevant details from game json object."""
     title = get_game_title(game_obj)
     description = get_game_description(game_obj)
     tags_with_platform = get_tags(game_obj)
@@ -122,11 +174,12 @@ def get_game_details(game_obj: dict) -> list:
     publisher = get_publisher(game_obj)
     price = get_price(game_obj)
     release_date = get_release_date(game_obj)
-    return [title, description, price, developer, publisher,
-            release_date, None, 3, tags, platform_ids]
+    return GameRecord(title, description, price, developer, publisher,
+                      release_date, None, 3, tags, platform_ids)
 
 
-def get_all_games_details(games_obj: dict) -> list:
+@METRICS.timed("parse")
+def get_all_games_details(games_obj: Iterable[dict]) -> list[GameRecord]:
     """Returns list of games and their relevant details."""
     games_details = []
     for game in games_obj:
@@ -134,20 +187,44 @@ def get_all_games_details(games_obj: dict) -> list:
     return games_details
 
 
-def epic_extract_process(config):
+def epic_extract_process(config, watermark: Watermark = None):
     """Extract details from all new games originating from epic games
-    in the last 24 hours."""
-    games = get_games_data(config)
-    if len(games) > 0:
-        games_details = get_all_games_details(games)
-        return games_details
-    return []
+    since the watermark, which is a day back if none is given. Games
+    already loaded at the watermark are skipped. Each page of games is
+    turned into records while the pages after it are still being fetched."""
+    watermark = watermark or read_watermark("epic")
+    games_details = []
+    for games in iter_games_data(config, since=watermark.release_date):
+        new_games = [game for game in games
+                     if not watermark.is_seen(get_game_id(game))]
+        for game in new_games:
+            watermark.observe(get_release_date(game), get_game_id(game))
+        games_details.extend(get_all_games_details(new_games))
+    return games_details
 
 
-def handler(event: dict = None, context: dict = None) -> list:
+def handler(event: dict = None, context: dict = None) -> dict:
     """
-    Handler function for epic extraction.
+    Handler function for epic extraction. Returns the games as a
+    compressed, columnar payload, with a summary of the run's
+    metrics under "metrics" and the watermark to save once the games
+    are loaded under "watermark".
     """
-    games = epic_extract_process(environ)
+    EPIC_CLIENT.reset_stats()
+    METRICS.reset()
+    blob_store = get_blob_store(environ)
+    watermark = read_watermark("epic", blob_store)
+
+    with METRICS.phase("run"):
+        games = epic_extract_process(environ, watermark)
+
+        with METRICS.phase("encode"):
+            payload = encode_payload(games, blob_store)
+
+    METRICS.increment("games_emitted", len(games))
+    METRICS.add_http_stats(EPIC_CLIENT.get_stats())
+    METRICS.emit()
+    payload["metrics"] = METRICS.summary()
+    payload["watermark"] = watermark.advanced().to_dict()
 
-    return games
+    return payload
@@ -1,7 +1,12 @@
 """This file contains tests for the extract_epic.py functions."""
 import datetime
 
-from extract_epic import get_games_data, get_game_details, epic_extract_process
+import re
+
+from extract_epic import (get_games_data, get_game_details, epic_extract_process,
+                          handler, iter_games_data)
+from game_record import records_to_payload
+from watermark import Watermark
 
 
 def test_pull_data_from_graphql(requests_mock, epic_game_post_response):
@@ -21,7 +26,7 @@ def test_correct_game_details_pulled(epic_game_data_game_obj):
     """Tests successful extracting of data from json object."""
     result = get_game_details(epic_game_data_game_obj)
     print(result)
-    assert result == ['Vengeance of Mr. Peppermint',
+    assert result.to_list() == ['Vengeance of Mr. Peppermint',
                       "Long ago, they killed his sister. Now, he will kill them.",
                       19.99, 'Hack The Publisher', 'Freedom Games', str(datetime.datetime(
                           2024, 4, 24, 16, 0)), None, 3,
@@ -48,9 +53,73 @@ def test_no_one_new_games(requests_mock, epic_game_post_response):
     requests_mock.post('http://www.epic/test/graphql.com',
                        json=epic_game_post_response)
     result = epic_extract_process(config)
-    assert result == [['Vengeance of Mr. Peppermint',
+    assert records_to_payload(result) == [['Vengeance of Mr. Peppermint',
                        "Long ago, they killed his sister. Now, he will kill them.",
                       19.99, 'Hack The Publisher', 'Freedom Games', str(datetime.datetime(
                           2024, 4, 24, 16, 0)),
                        None, 3, ['Action', 'Action-Adventure',
                                  'Single Player', 'Indie'], [1, 2]]]
+
+
+def test_extract_process_from_watermark(requests_mock, epic_game_post_response):
+    """Tests the search starts at the watermark and games already loaded
+    at the watermark are skipped."""
+    config = {
+        'EPIC_BASE_URL': 'http://www.epic/test/graphql.com'
+    }
+    requests_mock.post('http://www.epic/test/graphql.com',
+                       json=epic_game_post_response)
+    release_date = datetime.datetime(2024, 4, 24, 16, 0)
+    watermark = Watermark('epic', release_date)
+
+    assert len(epic_extract_process(config, watermark)) == 1
+    assert '[2024-04-24T16:00:00.000Z,' in requests_mock.last_request.json()['query']
+    assert watermark.advanced() == Watermark(
+        'epic', release_date, ['4b5f6ed4c09e4bcb8e46d8ba7ea1a5b2'])
+
+    assert epic_extract_process(config, watermark.advanced()) == []
+
+
+def test_handler_returns_metrics(requests_mock, epic_game_post_response, monkeypatch):
+    """Tests the handler returns a payload with a summary of the run."""
+    monkeypatch.setenv('EPIC_BASE_URL', 'http://www.epic/test/graphql.com')
+    requests_mock.post('http://www.epic/test/graphql.com',
+                       json=epic_game_post_response)
+    result = handler()
+    assert result['count'] == 1
+    assert result['metrics']['counters']['games_emitted'] == 1
+    assert result['metrics']['counters']['http_200'] == 1
+    assert set(result['metrics']['phases']) == {'run', 'listing', 'parse',
+                                                'encode', 'http', 'throttle'}
+    assert result['watermark']['store'] == 'epic'
+
+
+def paged_response(request, context):
+    """Returns the page of 90 made up games starting at the query's start."""
+    start = int(re.search(r'start: (\d+)', request.json()['query']).group(1))
+    elements = [{'title': f'Game {i}'} for i in range(start, min(start + 40, 90))]
+    return {'data': {'Catalog': {'searchStore': {'elements': elements,
+                                                 'paging': {'total': 90}}}}}
+
+
+def test_iter_games_data_fetches_every_page(requests_mock):
+    """Tests every page is fetched and yielded in order."""
+    config = {'EPIC_BASE_URL': 'http://www.epic/test/graphql.com'}
+    requests_mock.post(config['EPIC_BASE_URL'], json=paged_response)
+
+    pages = list(iter_games_data(config))
+
+    assert [len(page) for page in pages] == [40, 40, 10]
+    assert [game['title'] for game in get_games_data(config)] == [
+        f'Game {i}' for i in range(90)]
+    assert requests_mock.call_count == 6
+
+
+def test_search_query_only_asks_for_used_fields(requests_mock, epic_empty_post_request):
+    """Tests the query asks for paging and not for unused fields."""
+    config = {'EPIC_BASE_URL': 'http://www.epic/test/graphql.com'}
+    requests_mock.post(config['EPIC_BASE_URL'], json=epic_empty_post_request)
+    get_games_data(config)
+    query = requests_mock.last_request.json()['query']
+    assert 'paging' in query and 'start: 0' in query
+    assert 'seller' not in query and 'categories' not in query
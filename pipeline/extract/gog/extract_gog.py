@@ -2,46 +2,75 @@
 
 from os import environ as ENV
 import json
-from datetime import datetime, timedelta
-from time import sleep
+import re
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
-import requests as req
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from bs4.element import Tag
+from requests import Response
 
+from http_client import HttpClient
+from response_cache import ResponseCache, get_record, get_response_cache
+from game_record import GameRecord
+from blob_store import get_blob_store
+from payload import encode_payload
+from metrics import RunMetrics
+from watermark import Watermark, read_watermark, get_product_id
 
+
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 4
+GOG_CLIENT = HttpClient(max_per_host=MAX_WORKERS,
+                        requests_per_second=REQUESTS_PER_SECOND)
 PLATFORM_TITLE = 'window.productcardData.cardProductSystemRequirements'
+PLATFORM_PATTERN = re.compile(re.escape(PLATFORM_TITLE.encode()) + rb' = ([^;]*)')
+LD_JSON_PATTERN = re.compile(
+    rb'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', re.S)
+# Strainers are matched against the whole class attribute, so each class is
+# matched as one whitespace-separated word of it.
+GAME_PAGE_STRAINER = SoupStrainer(attrs={'class': re.compile(
+    r'(^|\s)(details__link|details__link-text|details__content|description)(\s|$)')})
+LISTING_PAGE_STRAINER = SoupStrainer(
+    'product-tile', attrs={'class': re.compile(r'(^|\s)ng-star-inserted(\s|$)')})
+NO_CACHE = ResponseCache()
+METRICS = RunMetrics("extract_gog")
 FILTER_1 = 'This Game may contain content not appropriate for all ages or may not be appropriate for viewing at work'
 FILTER_2 = 'Buying this game on GOG.COM you will receive a censored version of the game'
 
 
-def get_platforms(game_soup: BeautifulSoup) -> list:
-    '''Returns a list of platforms that the game can be run on.'''
-    scripts = (game_soup.find_all(
-        'script'))
+def get_platforms(page_html: bytes) -> list:
+    '''Returns a list of platforms that the game can be run on,
+    read straight from the product card script in the page HTML.'''
+    requirements = PLATFORM_PATTERN.search(page_html)
+    if requirements is None:
+        return []
+    requirements = requirements.group(1).decode(errors='replace').lower()
 
-    filtered_script = [
-        t.text.strip() for t in scripts if PLATFORM_TITLE in str(t)][0]
-    script_dict = [l.split(' = ')
-                   for l in filtered_script.split(';')]
-    script_dict = [l for l in script_dict if len(l) == 2]
-    script_dict = {l[0].strip(): l[1] for l in script_dict}
     platforms = []
-    if "windows" in script_dict[PLATFORM_TITLE].lower():
+    if "windows" in requirements:
         platforms.append("windows")
-    if "osx" in script_dict[PLATFORM_TITLE].lower():
+    if "osx" in requirements:
         platforms.append("osx")
-    if "linux" in script_dict[PLATFORM_TITLE].lower():
+    if "linux" in requirements:
         platforms.append("linux")
 
     return platforms
 
 
-def get_soup(web_address: str) -> BeautifulSoup:
-    '''Returns a soup object for a game given the web address.'''
-    res = req.get(web_address, timeout=5)
-    return BeautifulSoup(res.text, features="html.parser")
+def get_page(web_address: str) -> bytes:
+    '''Returns the raw HTML of a page given the web address.'''
+    res = GOG_CLIENT.get(web_address, timeout=5)
+    return res.content
+
+
+def get_soup(web_address: str, parse_only: SoupStrainer = None) -> BeautifulSoup:
+    '''Returns a soup object for a page given the web address. Only
+    the parts of the page matched by parse_only are built.'''
+    return BeautifulSoup(get_page(web_address), features="lxml",
+                         parse_only=parse_only)
 
 
 def get_detail_links(game_soup: BeautifulSoup) -> list:
@@ -51,10 +80,10 @@ def get_detail_links(game_soup: BeautifulSoup) -> list:
         'a', class_='details__link')
 
 
-def get_game_data_json(game_soup: BeautifulSoup) -> dict:
-    '''Returns a JSON object about a given game soup.'''
-    return json.loads(game_soup.find(
-        'script', type='application/ld+json').text)
+def get_game_data_json(page_html: bytes) -> dict:
+    '''Returns a JSON object about a game, read from the
+    ld+json script in the page HTML.'''
+    return json.loads(LD_JSON_PATTERN.search(page_html).group(1))
 
 
 def get_developer(links: list[BeautifulSoup]) -> str:
@@ -132,81 +161,145 @@ def get_description(game_soup: BeautifulSoup) -> str:
     return description_soup.text.strip()
 
 
-def get_game_details(game: BeautifulSoup) -> list:
-    '''Returns a list of key data points about a given
-    game soup.'''
-
-    address = game.find('a', class_='product-tile product-tile--grid')['href']
+@METRICS.timed("parse")
+def parse_game_page(response: Response) -> list:
+    '''Returns a list of the description, price, developer, publisher,
+    release date, rating, tags and platform IDs read from a game page.'''
 
-    response = req.get(address, timeout=5)
-    game_data = BeautifulSoup(response.text, features="html.parser")
+    page_html = response.content
+    game_data = BeautifulSoup(page_html, features="lxml",
+                              parse_only=GAME_PAGE_STRAINER)
 
-    game_json = get_game_data_json(game_data)
+    game_json = get_game_data_json(page_html)
     release_date = get_release_date(game_data)
 
     link = get_detail_links(game_data)
-    return [get_title(game), get_description(game_data), get_price(game_json),
-            get_developer(link), get_publisher(link), release_date,
-            get_rating(game_json), 2, get_tags(game_data),
-            get_platform_ids(get_platforms(game_data))]
+    return [get_description(game_data), get_price(game_json),
+            get_developer(link), get_publisher(link), str(release_date),
+            get_rating(game_json), get_tags(game_data),
+            get_platform_ids(get_platforms(page_html))]
+
+
+def get_game_address(game: BeautifulSoup) -> str:
+    '''Returns the web address of a game's page given
+    its product tile.'''
+    return game.find('a', class_='product-tile product-tile--grid')['href']
+
+
+def get_game_details(game: BeautifulSoup, cache: ResponseCache = NO_CACHE) -> GameRecord:
+    '''Returns a record of key data points about a given
+    game soup. Game pages that have not changed since they
+    were cached are not downloaded or parsed again.'''
+
+    address = get_game_address(game)
 
+    (description, price, developer, publisher, release_date,
+     rating, tags, platform_ids) = get_record(GOG_CLIENT, cache, address,
+                                              parse_game_page, timeout=5)
 
-def get_games_from_page(soup: BeautifulSoup) -> list:
-    '''Searches all games released recently, and
-    returns a list of lists containing details about
-    all the games released in the last 24 hours.'''
-    yesterday = datetime.now() - timedelta(days=1)
+    return GameRecord(get_title(game), description, price, developer, publisher,
+                      datetime.fromisoformat(release_date), rating, 2, tags, platform_ids)
+
+
+def is_censored(description: str) -> bool:
+    '''Returns True if the description carries one of GOG's
+    content warnings.'''
+    return (FILTER_1 in description) or (FILTER_2 in description)
+
+
+@METRICS.timed("listing")
+def get_listing_page(page_number: int) -> list:
+    '''Returns the product tiles on a page of the
+    search results.'''
+    page_soup = get_soup(f'{ENV["GOG_BASE_URL"]}&page={page_number}',
+                         LISTING_PAGE_STRAINER)
+    return page_soup.findAll('product-tile', class_='ng-star-inserted')
+
+
+def search_pages_last_day(max_workers: int = MAX_WORKERS,
+                          cache: ResponseCache = NO_CACHE,
+                          watermark: Watermark = None) -> list[GameRecord]:
+    '''Searches all pages until a game released before the
+    watermark is found. Returns a list of records of games released
+    since the watermark, which is a day back if none is given.
+
+    The next listing page is prefetched while game pages are being
+    fetched, and game pages from several listing pages can be in flight
+    at once. Games already loaded at the watermark are not fetched again.
+    Results are read in listing order, so the first game older than the
+    watermark cancels everything still queued.'''
+    load_dotenv()
+    watermark = watermark or read_watermark("gog")
     recently_released = []
-    for game in soup:
-        game_data = get_game_details(game)
-        release_date = game_data[5]
-        desc = game_data[1]
-        if (release_date > yesterday):
-            if (FILTER_1 not in desc) and (FILTER_2 not in desc):
-                game_data[5] = str(game_data[5])
+    pending_games = deque()
+    page_number = 1
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        next_page = executor.submit(get_listing_page, page_number)
+
+        while True:
+            if next_page and (next_page.done() or not pending_games) \
+                    and len(pending_games) < max_workers * 2:
+                games_soup = next_page.result()
+                if games_soup:
+                    for game in games_soup:
+                        product_id = get_product_id(get_game_address(game))
+                        if not watermark.is_seen(product_id):
+                            pending_games.append(
+                                (product_id, executor.submit(get_game_details, game, cache)))
+                    page_number += 1
+                    next_page = executor.submit(get_listing_page, page_number)
+                else:
+                    next_page = None
+
+            if not pending_games:
+                break
+
+            product_id, game_details = pending_games.popleft()
+            game_data = game_details.result()
+            if watermark.is_older(game_data.release_date):
+                break
+            watermark.observe(game_data.release_date, product_id)
+            if not is_censored(game_data.description):
                 recently_released.append(game_data)
+            else:
+                METRICS.increment("games_skipped")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
 
-            sleep(1)
-        else:
-            break
     return recently_released
 
 
-def search_pages_last_day() -> list:
-    '''Searches all pages until the last game on the
-    page was released more than a day ago.Returns a
-    list of lists of games released less than 24 hours
-    ago.'''
+def handler(event: dict = None, context=None) -> dict:
+    """Collects the required data for each game and then returns it
+    as a compressed, columnar payload, with a summary of the run's
+    metrics under "metrics" and the watermark to save once the games are
+    loaded under "watermark"."""
     load_dotenv()
-    counter = 1
-    games_from_page = req.get(
-        f'{ENV["GOG_BASE_URL"]}&page={counter}', timeout=5)
-    page_soup = BeautifulSoup(games_from_page.text, features="html.parser")
-    games_soup = page_soup.findAll('product-tile', class_='ng-star-inserted')
-    game_data_list = get_games_from_page(games_soup)
-    more_pages = True
-    while more_pages:
-        sleep(1)
-        counter += 1
-        games_from_page = req.get(
-            f'{ENV["GOG_BASE_URL"]}&page={counter}', timeout=5)
-        page_soup = BeautifulSoup(games_from_page.text, features="html.parser")
-        games_soup = page_soup.findAll(
-            'product-tile', class_='ng-star-inserted')
-        game_data = get_games_from_page(games_soup)
-        if len(game_data) == 0:
-            more_pages = False
-        else:
-            game_data_list.append(game_data)
-
-    return game_data_list
-
-
-def handler(event: dict = None, context=None) -> list[list]:
-    """Collects the required data for each game and then returns a
-    list of lists of this data."""
-
-    return search_pages_last_day()
+    GOG_CLIENT.reset_stats()
+    METRICS.reset()
+    blob_store = get_blob_store(ENV)
+    watermark = read_watermark("gog", blob_store)
+
+    with METRICS.phase("run"):
+        cache = get_response_cache(ENV)
+        try:
+            with METRICS.phase("products"):
+                games = search_pages_last_day(cache=cache, watermark=watermark)
+        finally:
+            cache.close()
+
+        with METRICS.phase("encode"):
+            payload = encode_payload(games, blob_store)
+
+    METRICS.increment("games_emitted", len(games))
+    METRICS.add_http_stats(GOG_CLIENT.get_stats())
+    METRICS.emit()
+    payload["metrics"] = METRICS.summary()
+    payload["watermark"] = watermark.advanced().to_dict()
+
+    return payload
 
 
 if __name__ == "__main__":
@@ -1,12 +1,21 @@
 '''Tests extract_gog.py.'''
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from unittest.mock import patch
 
 from pytest import raises
+from bs4 import BeautifulSoup
 
 from extract_gog import (get_price, get_rating, get_developer,
                          get_release_date, get_platform_ids, get_publisher,
-                         get_tags, get_title, get_description)
+                         get_tags, get_title, get_description,
+                         search_pages_last_day, get_platforms,
+                         get_game_data_json, FILTER_1, GAME_PAGE_STRAINER)
+from game_record import GameRecord
+from watermark import Watermark
+
+
+NOW = datetime.now().replace(microsecond=0)
 
 
 def test_get_price():
@@ -96,3 +105,90 @@ def test_get_description_good_input(gog_description):
     '''Tests get_description on a standard input.'''
     assert get_description(
         gog_description) == 'a very nice really thorough description'
+
+
+def fake_listing_page(page_number: int) -> list:
+    '''Returns two made up game tiles per page for three pages.'''
+    if page_number > 3:
+        return []
+    return [f'{page_number}-a', f'{page_number}-b']
+
+
+def fake_game_details(game: str, cache=None) -> GameRecord:
+    '''Returns made up game details. Games on page 3 are two days old,
+    and the second game on page 1 is censored.'''
+    released = NOW - timedelta(hours=1)
+    if game.startswith('3'):
+        released = NOW - timedelta(days=2)
+    description = FILTER_1 if game == '1-b' else 'desc'
+    return GameRecord(game, description, 0, None, None, released, None, 2, [], [1])
+
+
+def fake_game_address(game: str) -> str:
+    '''Returns a made up web address for a game tile.'''
+    return f'https://www.gog.com/en/game/{game}'
+
+
+@patch('extract_gog.get_game_address', side_effect=fake_game_address)
+@patch('extract_gog.get_game_details', side_effect=fake_game_details)
+@patch('extract_gog.get_listing_page', side_effect=fake_listing_page)
+def test_search_pages_last_day_stops_at_old_game(mock_page, mock_details, mock_address):
+    '''Tests search_pages_last_day keeps listing order across pages, skips
+    censored games and stops at the first game older than a day.'''
+    result = search_pages_last_day(max_workers=2)
+    assert [game.title for game in result] == ['1-a', '2-a', '2-b']
+    assert mock_page.call_count <= 4
+
+
+@patch('extract_gog.get_game_address', side_effect=fake_game_address)
+@patch('extract_gog.get_game_details', side_effect=fake_game_details)
+@patch('extract_gog.get_listing_page', return_value=[])
+def test_search_pages_last_day_no_games(mock_page, mock_details, mock_address):
+    '''Tests search_pages_last_day with an empty first page.'''
+    assert search_pages_last_day() == []
+    mock_details.assert_not_called()
+
+
+@patch('extract_gog.get_game_address', side_effect=fake_game_address)
+@patch('extract_gog.get_game_details', side_effect=fake_game_details)
+@patch('extract_gog.get_listing_page', side_effect=fake_listing_page)
+def test_search_pages_last_day_from_watermark(mock_page, mock_details, mock_address):
+    '''Tests search_pages_last_day does not fetch games already loaded at
+    the watermark, goes back as far as the watermark and advances it.'''
+    watermark = Watermark('gog', NOW - timedelta(days=3),
+                          ['/en/game/1-a', '/en/game/3-a'])
+    result = search_pages_last_day(max_workers=2, watermark=watermark)
+    assert [game.title for game in result] == ['2-a', '2-b', '3-b']
+    assert '1-a' not in [call.args[0] for call in mock_details.call_args_list]
+    advanced = watermark.advanced()
+    assert advanced.release_date == NOW - timedelta(hours=1)
+    assert advanced.seen_ids == {'/en/game/1-b', '/en/game/2-a', '/en/game/2-b'}
+
+
+def test_get_platforms():
+    '''Tests get_platforms reads the product card script.'''
+    page = (b'<script>window.productcardData.cardProductId = "1";'
+            b'window.productcardData.cardProductSystemRequirements = '
+            b'{"windows":{},"osx":{}};</script>')
+    assert get_platforms(page) == ['windows', 'osx']
+
+
+def test_game_page_strainer_keeps_release_dates():
+    '''Tests the game page strainer keeps rows that have several classes.'''
+    rows = ''.join(f'<div class="details__content table__row-content"><span>{{{{"{day}"}}}} </span></div>'
+                   for day in ['a', 'b', 'c', 'd', 'e', '2024-04-24T09:55:00+03:00'])
+    game_soup = BeautifulSoup(f'<div class="details">{rows}</div>', features='lxml',
+                              parse_only=GAME_PAGE_STRAINER)
+    assert get_release_date(game_soup) == datetime(2024, 4, 24, 9, 55)
+
+
+def test_get_platforms_missing():
+    '''Tests get_platforms on a page without a product card script.'''
+    assert get_platforms(b'<script>var a = 1;</script>') == []
+
+
+def test_get_game_data_json():
+    '''Tests get_game_data_json reads the ld+json script.'''
+    page = (b'<script>var a = 1;</script><script type="application/ld+json">'
+            b'{"offers": {"price": 5}}</script>')
+    assert get_game_data_json(page) == {'offers': {'price': 5}}
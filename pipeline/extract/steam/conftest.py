@@ -1,4 +1,6 @@
 """Conftest file for test_extract_steam."""
+from datetime import date
+
 import pytest
 
 from bs4 import BeautifulSoup
@@ -106,3 +108,37 @@ def search_result() -> BeautifulSoup:
     return BeautifulSoup("""<span class="title">Culling of Normality</span>
 <div class="discount_final_price free">Free</div>
 <div class="col search_released responsive_secondrow"> 24 Apr, 2024</div>""", features='html.parser')
+
+
+@pytest.fixture
+def search_page_containers() -> list:
+    '''Returns search result rows for two games released today,
+    followed by one released last year.'''
+    today = date.today().strftime("%d %b, %Y")
+    rows = ""
+    for i, release_date in enumerate([today, today, "24 Apr, 2023"]):
+        rows += f"""<a class="search_result_row" href="https://store.steampowered.com/app/{i}/">
+<span class="title">Game {i}</span>
+<div class="discount_final_price">£{i}.99</div>
+<div class="col search_released responsive_secondrow"> {release_date}</div></a>"""
+    return BeautifulSoup(rows, features='html.parser').find_all(
+        'a', class_="search_result_row")
+
+
+@pytest.fixture
+def steam_game_page() -> bytes:
+    '''Returns an example of a game page, with some markup
+    that none of the functions read.'''
+    return b"""<html><head><script>var junk = 1;</script></head><body>
+<div class="page_content"><p>Lots of other content</p>
+<div class="review_ctn"><label for="review_type_positive">Positive&nbsp;<span class="user_reviews_count">(3)</span></label>
+<label for="review_type_negative">Negative&nbsp;<span class="user_reviews_count">(1)</span></label></div>
+<a href="https://store.steampowered.com/tags/en/Horror/" class="app_tag"> Horror </a>
+<div id="game_area_description" class="game_area_description"><h2>About This Game</h2>Spooky.</div>
+<div class="sysreq_contents"><div class="game_area_sys_req_full"><ul class="bb_ul"><li>OS: Windows 10</li></ul></div></div>
+<div class="dev_row">
+<div class="subtitle column">Developer:</div>
+<div class="summary column" id="developers_list">
+<a href="https://store.steampowered.com/search/?developer=Dev">Dev Co</a></div>
+</div>
+</div></body></html>"""
@@ -1,12 +1,41 @@
 """Script to scrape relevant data from the epic games website."""
 
 from os import environ as ENV
-from datetime import datetime, date, timedelta
-from time import sleep
+import re
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 
 from dotenv import load_dotenv
-import requests as req
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from requests import Response
+
+from http_client import HttpClient
+from response_cache import ResponseCache, get_record, get_response_cache
+from game_record import GameRecord
+from blob_store import get_blob_store
+from payload import encode_payload
+from metrics import RunMetrics
+from watermark import Watermark, read_watermark, get_product_id
+
+
+MAX_WORKERS = 8
+# A week of catching up is a few dozen pages of search results, so this
+# only stops a search that never reaches the watermark.
+MAX_SEARCH_PAGES = 60
+COOKIES = {"timezoneOffset": "3600,0"}
+REQUESTS_PER_SECOND = 4
+STEAM_CLIENT = HttpClient(max_per_host=MAX_WORKERS,
+                          requests_per_second=REQUESTS_PER_SECOND)
+# Strainers are matched against the whole class attribute, so each class is
+# matched as one whitespace-separated word of it.
+GAME_PAGE_STRAINER = SoupStrainer(attrs={'class': re.compile(
+    r'(^|\s)(review_ctn|sysreq_tab|sysreq_contents|app_tag|dev_row|'
+    r'game_area_description)(\s|$)')})
+SEARCH_PAGE_STRAINER = SoupStrainer('a', attrs={'class': re.compile(
+    r'(^|\s)search_result_row(\s|$)')})
+NO_CACHE = ResponseCache()
+METRICS = RunMetrics("steam_extract")
 
 
 def get_rating(game_soup: BeautifulSoup) -> float:
@@ -109,6 +138,13 @@ def get_description(game_soup: BeautifulSoup) -> str:
     return game_soup.find('div', id='game_area_description').text.strip()
 
 
+def get_game_soup(page_html: bytes) -> BeautifulSoup:
+    """Function that parses a game page with lxml, only building the
+    parts of the page that the other functions read."""
+    return BeautifulSoup(page_html, features="lxml",
+                         parse_only=GAME_PAGE_STRAINER)
+
+
 def get_platform_ids(platform: list) -> list:
     '''Returns a list of platform IDs given a
     string of playable platforms.'''
@@ -121,11 +157,11 @@ def get_platform_ids(platform: list) -> list:
     return id_list
 
 
-def get_each_game_details(game_url: str) -> list:
-    """Function to get all the details of a game from its URL
-    returns a list."""
-    game_res = req.get(game_url, timeout=10)
-    game_soup = BeautifulSoup(game_res.text, features="html.parser")
+@METRICS.timed("parse")
+def parse_game_page(game_res: Response) -> list:
+    """Function to get the details of a game from its page, returns a list
+    of the description, developer, publisher, rating, tags and platform IDs."""
+    game_soup = get_game_soup(game_res.content)
 
     game_tags = get_tags(game_soup)
     platform_list = get_platforms(game_soup)
@@ -135,47 +171,139 @@ def get_each_game_details(game_url: str) -> list:
     publisher = get_publisher(game_soup)
     description = get_description(game_soup)
 
-    return [description, developer, publisher, str(datetime.now().strftime("%Y-%m-%d %H:%M:%S")), rating, 1, game_tags, platform_id_list]
+    return [description, developer, publisher, rating, game_tags, platform_id_list]
 
 
-def grab_all_games_details(all_web_containers: BeautifulSoup) -> list[list]:
-    """Function to combine all the details of from the search results page
-      returns a list of lists."""
+def get_each_game_details(game_url: str, cache: ResponseCache = NO_CACHE) -> list:
+    """Function to get the details of a game from its URL, returns a list
+    of the description, developer, publisher, rating, tags and platform IDs.
+    Pages that have not changed since they were cached are not downloaded
+    or parsed again."""
+    return get_record(STEAM_CLIENT, cache, game_url, parse_game_page, timeout=10)
+
+
+def get_release_date(container: BeautifulSoup) -> datetime:
+    """Function that returns the release date of a game from its row
+    on the search page."""
+    return datetime.strptime(get_name_price_date(container)[-1], "%d %b, %Y")
+
+
+def get_search_page(page_number: int) -> list:
+    """Function that returns the result rows on a page of the search results."""
+    res = STEAM_CLIENT.get(ENV["STEAM_BASE_URL"], params={"page": page_number},
+                           timeout=10, cookies=COOKIES)
+    soup = BeautifulSoup(res.content, features="lxml",
+                         parse_only=SEARCH_PAGE_STRAINER)
+    return soup.find_all('a', class_="search_result_row")
+
+
+def get_search_containers(watermark: Watermark,
+                          max_pages: int = MAX_SEARCH_PAGES) -> tuple[list, bool]:
+    """Function that returns the result rows of the search pages up to the
+    first page with a game released before the watermark, and whether the
+    search got back to the watermark. It only falls short when max_pages
+    are read first; running out of results means every game was read."""
+    all_containers = []
+    for page_number in range(1, max_pages + 1):
+        containers = get_search_page(page_number)
+        all_containers.extend(containers)
+        if not containers or watermark.is_older(get_release_date(containers[-1])):
+            return all_containers, True
+
+    return all_containers, False
 
-    final_list = []
+
+def get_todays_games(all_web_containers: BeautifulSoup,
+                     watermark: Watermark = None) -> list[tuple]:
+    """Function that returns the name, price and release date, and the URL,
+    of each game on the search page released since the watermark, stopping
+    at the first older game. Games already loaded at the watermark date are
+    skipped, and counted in the games_skipped metric."""
+
+    watermark = watermark or read_watermark("steam")
+    todays_games = []
 
     for container in all_web_containers:
 
         name_price_date_list = get_name_price_date(container)
-        game_date = datetime.strptime(
-            name_price_date_list[-1], "%d %b, %Y").date()
-        name_price_date_list.pop(-1)
-        if game_date < date.today():
+        game_date = get_release_date(container)
+        name_price_date_list[-1] = game_date
+        if watermark.is_older(game_date):
             break
-        game_url = container['href']
+        product_id = get_product_id(container['href'])
+        if not watermark.is_new(game_date, product_id):
+            METRICS.increment("games_skipped")
+            continue
+        watermark.observe(game_date, product_id)
+        todays_games.append((name_price_date_list, container['href']))
 
-        detail_list = get_each_game_details(game_url)
-        description = detail_list.pop(0)
-        name_price_date_list.append(name_price_date_list[1])
-        name_price_date_list[1] = description
-        final_list.append(name_price_date_list + detail_list)
-        sleep(0.5)
+    return todays_games
 
-    return final_list
 
+def grab_all_games_details(all_web_containers: BeautifulSoup,
+                           max_workers: int = MAX_WORKERS,
+                           cache: ResponseCache = NO_CACHE,
+                           watermark: Watermark = None) -> list[GameRecord]:
+    """Function to combine all the details of from the search results page
+      returns a list of game records. Game pages are fetched concurrently,
+      but the results keep the order of the search page."""
+
+    todays_games = get_todays_games(all_web_containers, watermark)
+    final_list = []
 
-def handler(event: dict = None, context=None) -> list[list]:
-    """Collects the required data for each game and then returns a
-    list of lists of this data."""
-    cookies = {
-        "timezoneOffset": "3600,0"
-    }
-    res = req.get(ENV["STEAM_BASE_URL"], timeout=10, cookies=cookies)
-    soup = BeautifulSoup(res.text, features="html.parser")
-    all_containers = soup.find_all(
-        'a', class_="search_result_row")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        all_details = executor.map(get_each_game_details,
+                                   [game_url for _, game_url in todays_games],
+                                   repeat(cache))
 
-    return grab_all_games_details(all_containers)
+        for ((title, price, release_date), _), detail_list in zip(todays_games, all_details):
+            description, developer, publisher, rating, game_tags, platform_id_list = detail_list
+            final_list.append(GameRecord(title, description, price, developer, publisher,
+                                         release_date, rating,
+                                         1, game_tags, platform_id_list))
+
+    return final_list
+
+
+def handler(event: dict = None, context=None) -> dict:
+    """Collects the required data for each game and then returns it
+    as a compressed, columnar payload, with a summary of the run's
+    metrics under "metrics" and the watermark to save once the games are
+    loaded under "watermark". The watermark is only advanced if the search
+    got back to it, so games on pages that were not read are picked up by
+    the next run."""
+    STEAM_CLIENT.reset_stats()
+    METRICS.reset()
+    blob_store = get_blob_store(ENV)
+    watermark = read_watermark("steam", blob_store)
+
+    with METRICS.phase("run"):
+        with METRICS.phase("listing"):
+            all_containers, reached_watermark = get_search_containers(watermark)
+
+        cache = get_response_cache(ENV)
+        try:
+            with METRICS.phase("products"):
+                games = grab_all_games_details(all_containers, cache=cache,
+                                               watermark=watermark)
+        finally:
+            cache.close()
+
+        with METRICS.phase("encode"):
+            payload = encode_payload(games, blob_store)
+
+    if not reached_watermark:
+        METRICS.increment("listing_truncated")
+        next_watermark = watermark
+    else:
+        next_watermark = watermark.advanced()
+    METRICS.increment("games_emitted", len(games))
+    METRICS.add_http_stats(STEAM_CLIENT.get_stats())
+    METRICS.emit()
+    payload["metrics"] = METRICS.summary()
+    payload["watermark"] = next_watermark.to_dict()
+
+    return payload
 
 
 if __name__ == "__main__":
@@ -1,7 +1,17 @@
 """Test file for steam_extract.py."""
+from time import sleep
+from datetime import datetime, date, time, timedelta
+from unittest.mock import patch
+
+from bs4 import BeautifulSoup
 
 from steam_extract import (get_rating, get_platform_ids,
-get_tags, get_developer, get_publisher, get_name_price_date)
+get_tags, get_developer, get_publisher, get_name_price_date,
+get_todays_games, grab_all_games_details, get_game_soup,
+get_description, get_each_game_details, get_platforms,
+get_search_containers, handler, SEARCH_PAGE_STRAINER, METRICS)
+from response_cache import SQLiteCache
+from watermark import Watermark
 
 
 # ratings tests
@@ -82,3 +92,175 @@ def test_get_name_price_date(search_result):
     """Test the get_name_price_date function is working."""
     assert get_name_price_date(search_result) == [
         'Culling of Normality', 0.0, '24 Apr, 2024']
+
+
+# grab_all_games_details tests
+
+def test_get_todays_games_stops_at_older_game(search_page_containers):
+    """Test the get_todays_games function stops at the first older game."""
+    today = datetime.combine(date.today(), time())
+    result = get_todays_games(search_page_containers)
+    assert result == [(['Game 0', 0.99, today], 'https://store.steampowered.com/app/0/'),
+                      (['Game 1', 1.99, today], 'https://store.steampowered.com/app/1/')]
+
+
+def test_get_todays_games_from_watermark(search_page_containers):
+    """Test the get_todays_games function goes back to the watermark, skips
+    and counts games loaded at the watermark date and advances the watermark."""
+    today = datetime.combine(date.today(), time())
+    watermark = Watermark('steam', datetime(2023, 4, 24), ['/app/2/'])
+    result = get_todays_games(search_page_containers, watermark)
+    assert [url for _, url in result] == ['https://store.steampowered.com/app/0/',
+                                          'https://store.steampowered.com/app/1/']
+    assert watermark.advanced() == Watermark('steam', today, ['/app/0/', '/app/1/'])
+
+    later_watermark = Watermark('steam', today - timedelta(days=1))
+    assert len(get_todays_games(search_page_containers, later_watermark)) == 2
+    METRICS.reset()
+    assert get_todays_games(search_page_containers, watermark.advanced()) == []
+    assert METRICS.summary()["counters"]["games_skipped"] == 2
+
+
+SEARCH_URL = "https://store.steampowered.com/search/?sort_by=Released_DESC"
+
+
+def make_search_page(first_id: int, release_dates: list) -> str:
+    """Returns a search page with a row for each release date."""
+    return "".join(f"""<a class="search_result_row" href="https://store.steampowered.com/app/{i}/">
+<span class="title">Game {i}</span><div class="discount_final_price">Free</div>
+<div class="col search_released responsive_secondrow"> {release_date}</div></a>"""
+                   for i, release_date in enumerate(release_dates, first_id))
+
+
+def test_get_search_containers_reads_pages_back_to_watermark(requests_mock, monkeypatch):
+    """Test the search is read page by page until a page reaches a game
+    released before the watermark."""
+    monkeypatch.setenv("STEAM_BASE_URL", SEARCH_URL)
+    requests_mock.get(SEARCH_URL + "&page=1", text=make_search_page(0, ["26 Apr, 2023"] * 2))
+    requests_mock.get(SEARCH_URL + "&page=2", text=make_search_page(2, ["25 Apr, 2023",
+                                                                        "23 Apr, 2023"]))
+    watermark = Watermark('steam', datetime(2023, 4, 24))
+
+    containers, reached_watermark = get_search_containers(watermark)
+
+    assert reached_watermark
+    assert requests_mock.call_count == 2
+    assert [url for _, url in get_todays_games(containers, watermark)] == [
+        f'https://store.steampowered.com/app/{i}/' for i in range(3)]
+
+
+def test_get_search_containers_stops_when_results_run_out(requests_mock, monkeypatch):
+    """Test an empty page ends the search as having read every game."""
+    monkeypatch.setenv("STEAM_BASE_URL", SEARCH_URL)
+    requests_mock.get(SEARCH_URL + "&page=1", text=make_search_page(0, ["26 Apr, 2023"]))
+    requests_mock.get(SEARCH_URL + "&page=2", text="")
+
+    containers, reached_watermark = get_search_containers(
+        Watermark('steam', datetime(2023, 4, 24)))
+
+    assert reached_watermark
+    assert len(containers) == 1
+
+
+def test_get_search_containers_falls_short_of_watermark(requests_mock, monkeypatch):
+    """Test the search reports not reaching the watermark when it stops
+    at max_pages."""
+    monkeypatch.setenv("STEAM_BASE_URL", SEARCH_URL)
+    requests_mock.get(SEARCH_URL, text=make_search_page(0, ["26 Apr, 2023"]))
+
+    containers, reached_watermark = get_search_containers(
+        Watermark('steam', datetime(2023, 4, 24)), max_pages=1)
+
+    assert not reached_watermark
+    assert requests_mock.call_count == 1
+    assert len(containers) == 1
+
+
+@patch("steam_extract.grab_all_games_details", return_value=[])
+@patch("steam_extract.get_search_containers", return_value=([], False))
+def test_handler_keeps_watermark_when_search_falls_short(mock_search, mock_details,
+                                                         monkeypatch, tmp_path):
+    """Test the watermark is not advanced past games on pages that were
+    not read."""
+    monkeypatch.setenv("PAYLOAD_DIR", str(tmp_path))
+
+    payload = handler()
+
+    watermark = mock_search.call_args.args[0]
+    assert payload["metrics"]["counters"]["listing_truncated"] == 1
+    assert payload["watermark"] == watermark.to_dict()
+
+
+def fake_game_details(game_url: str, cache=None) -> list:
+    """Returns made up game details, with the first game being the slowest."""
+    if game_url.endswith('/0/'):
+        sleep(0.05)
+    return [f"About {game_url}", "dev", "pub", 50.0, ["Indie"], [1]]
+
+
+@patch("steam_extract.get_each_game_details", side_effect=fake_game_details)
+def test_grab_all_games_details_keeps_order(mock_details, search_page_containers):
+    """Test the grab_all_games_details function keeps the search page order
+    when fetching concurrently."""
+    result = grab_all_games_details(search_page_containers, max_workers=2)
+    assert mock_details.call_count == 2
+    assert [game.title for game in result] == ['Game 0', 'Game 1']
+    assert result[1].to_list()[:5] == ['Game 1', 'About https://store.steampowered.com/app/1/',
+                                       1.99, 'dev', 'pub']
+    assert result[1].to_list()[6:] == [50.0, 1, ['Indie'], [1]]
+
+
+@patch("steam_extract.get_each_game_details", side_effect=fake_game_details)
+def test_grab_all_games_details_keeps_release_dates(mock_details):
+    """Test a game from an earlier day, read on a catch-up run, keeps the
+    release date from its search row."""
+    containers = BeautifulSoup(make_search_page(0, ["26 Apr, 2023", "25 Apr, 2023"]),
+                               features='html.parser').find_all('a', class_="search_result_row")
+    result = grab_all_games_details(containers, watermark=Watermark('steam', datetime(2023, 4, 24)))
+    assert [game.release_date for game in result] == [datetime(2023, 4, 26),
+                                                      datetime(2023, 4, 25)]
+
+
+# get_game_soup tests
+
+def test_get_game_soup_only_keeps_needed_parts(steam_game_page):
+    """Test the get_game_soup function drops markup nothing reads."""
+    game_soup = get_game_soup(steam_game_page)
+    assert game_soup.find('p') is None
+    assert game_soup.find('script') is None
+
+
+def test_get_game_soup_fields(steam_game_page):
+    """Test the field functions work on the partially parsed page."""
+    game_soup = get_game_soup(steam_game_page)
+    assert get_rating(game_soup) == 75.0
+    assert get_tags(game_soup) == ["Horror"]
+    assert get_developer(game_soup) == "Dev Co"
+    assert get_description(game_soup) == "About This GameSpooky."
+
+
+def test_strainers_match_elements_with_several_classes():
+    """Test the strainers keep elements that have other classes too."""
+    page = b"""<a class="search_result_row ds_collapse_flag" href="/app/1/">Game</a>
+<div class="sysreq_tab active">Windows</div><div class="sysreq_tab">macOS</div>"""
+    search_soup = BeautifulSoup(page, features="lxml", parse_only=SEARCH_PAGE_STRAINER)
+    assert len(search_soup.find_all('a', class_="search_result_row")) == 1
+    assert get_platforms(get_game_soup(page)) == ["Windows", "macOS"]
+
+
+# get_each_game_details tests
+
+def test_get_each_game_details_revalidates_cached_page(requests_mock, tmp_path,
+                                                       steam_game_page):
+    """Test an unchanged page is served from the cache on a 304."""
+    url = "https://store.steampowered.com/app/1/"
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    requests_mock.get(url, content=steam_game_page, headers={"ETag": '"1"'})
+    first = get_each_game_details(url, cache)
+
+    requests_mock.get(url, status_code=304)
+    second = get_each_game_details(url, cache)
+
+    assert requests_mock.last_request.headers["If-None-Match"] == '"1"'
+    assert second == first == ["About This GameSpooky.", "Dev Co", None,
+                               75.0, ["Horror"], [1]]
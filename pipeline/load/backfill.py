@@ -0,0 +1,211 @@
+"""
+Streams a large backfill of games into the database. Games are read one at a
+time from a JSON Lines file, each line a game list in the same order as
+load.py expects, and written with COPY FROM STDIN into an unlogged staging
+table, which is then merged into the real tables with set-based SQL.
+Batches are copied and merged in turn, so memory use stays flat however
+many games there are.
+"""
+import sys
+import json
+from os import environ as ENV
+from itertools import islice
+from collections.abc import Iterable, Iterator
+
+from dotenv import load_dotenv
+from psycopg2.extensions import connection
+
+from game_record import GameRecord
+from load import (get_db_connection, format_tag, refresh_daily_stats, record_load_run,
+                  TAG_EXCEPTIONS)
+
+
+BATCH_SIZE = 50000
+STAGING_COLUMNS = ("name", "description", "price", "developer_name",
+                   "publisher_name", "release_date", "rating", "website_id",
+                   "tags", "platform_ids")
+
+MERGE_STATEMENTS = (
+    """INSERT INTO developer (developer_name)
+       SELECT DISTINCT developer_name FROM staging_game
+       WHERE developer_name IS NOT NULL
+       ON CONFLICT (developer_name) DO NOTHING;""",
+    """INSERT INTO publisher (publisher_name)
+       SELECT DISTINCT publisher_name FROM staging_game
+       WHERE publisher_name IS NOT NULL
+       ON CONFLICT (publisher_name) DO NOTHING;""",
+    """INSERT INTO tag (tag_name)
+       SELECT DISTINCT unnest(tags) FROM staging_game
+       ON CONFLICT (tag_name) DO NOTHING;""",
+    """INSERT INTO game (name, description, price, developer_id, publisher_id,
+                         release_date, rating, website_id)
+       SELECT DISTINCT ON (s.name, s.website_id, s.release_date::date)
+              s.name, s.description, s.price, d.developer_id, p.publisher_id,
+              s.release_date::date, s.rating, s.website_id
+       FROM staging_game AS s
+       LEFT JOIN developer AS d ON d.developer_name = s.developer_name
+       LEFT JOIN publisher AS p ON p.publisher_name = s.publisher_name
+       ORDER BY s.name, s.website_id, s.release_date::date, s.staging_id DESC
+       ON CONFLICT (name, website_id, release_date) DO UPDATE
+       SET description = EXCLUDED.description, price = EXCLUDED.price,
+           rating = EXCLUDED.rating, developer_id = EXCLUDED.developer_id,
+           publisher_id = EXCLUDED.publisher_id
+       WHERE (game.description, game.price, game.rating)
+             IS DISTINCT FROM
+             (EXCLUDED.description, EXCLUDED.price, EXCLUDED.rating);""",
+    """INSERT INTO platform_assignment (platform_id, game_id)
+       SELECT DISTINCT plat.platform_id, g.game_id
+       FROM staging_game AS s
+       JOIN game AS g
+       ON g.name = s.name AND g.website_id = s.website_id
+       AND g.release_date = s.release_date::date
+       CROSS JOIN LATERAL unnest(s.platform_ids) AS plat (platform_id)
+       ON CONFLICT (game_id, platform_id) DO NOTHING;""",
+    """INSERT INTO game_tag_matching (game_id, tag_id)
+       SELECT DISTINCT g.game_id, t.tag_id
+       FROM staging_game AS s
+       JOIN game AS g
+       ON g.name = s.name AND g.website_id = s.website_id
+       AND g.release_date = s.release_date::date
+       CROSS JOIN LATERAL unnest(s.tags) AS game_tag (tag_name)
+       JOIN tag AS t ON t.tag_name = game_tag.tag_name
+       ON CONFLICT (game_id, tag_id) DO NOTHING;""")
+
+
+def iter_jsonl_games(path: str) -> Iterator[GameRecord]:
+    """Yields each game in a JSON Lines file, one per line."""
+
+    with open(path, encoding="utf-8") as jsonl_file:
+        for line in jsonl_file:
+            if line.strip():
+                yield GameRecord.from_list(json.loads(line))
+
+
+def escape_copy_text(value: str) -> str:
+    """Escapes a value for COPY's text format."""
+
+    return (value.replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def format_array(values: list) -> str:
+    """Returns a list as a Postgres array literal."""
+
+    elements = ('"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+                for value in values)
+
+    return "{" + ",".join(elements) + "}"
+
+
+def format_copy_row(game: GameRecord) -> str:
+    """Returns a game as one line of COPY text, with its tags in the
+    form they are stored in the tag table."""
+
+    tags = list(dict.fromkeys(format_tag(tag, TAG_EXCEPTIONS) for tag in game.tags))
+    values = [game.title, game.description, game.price, game.developer,
+              game.publisher, game.release_date, game.rating, game.website_id,
+              format_array(tags), format_array(game.platform_ids)]
+
+    return "\t".join("\\N" if value is None else escape_copy_text(str(value))
+                     for value in values) + "\n"
+
+
+class GameCopyStream:
+    """A file-like object that COPY reads from. Rows are formatted from the
+    games iterator as they are asked for, so only one read's worth of text
+    is held in memory."""
+
+    def __init__(self, games: Iterable[GameRecord]) -> None:
+        self.games = iter(games)
+        self.rows = 0
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        """Returns up to size characters of COPY text, or the rest
+        of it if size is negative."""
+
+        while size < 0 or len(self._buffer) < size:
+            game = next(self.games, None)
+            if game is None:
+                break
+            self._buffer += format_copy_row(game)
+            self.rows += 1
+
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+
+        return chunk
+
+
+def create_staging_table(cur: connection.cursor) -> None:
+    """Creates the staging table for this session. Temporary tables are
+    unlogged and private to the session, so concurrent backfills cannot
+    see each other's rows."""
+
+    cur.execute("""CREATE TEMPORARY TABLE IF NOT EXISTS staging_game (
+                   staging_id BIGINT GENERATED ALWAYS AS IDENTITY,
+                   name TEXT NOT NULL,
+                   description TEXT,
+                   price FLOAT NOT NULL,
+                   developer_name TEXT,
+                   publisher_name TEXT,
+                   release_date TIMESTAMP NOT NULL,
+                   rating FLOAT,
+                   website_id INT NOT NULL,
+                   tags TEXT[] NOT NULL,
+                   platform_ids INT[] NOT NULL);""")
+
+
+def merge_staging_table(cur: connection.cursor) -> None:
+    """Merges the staging table into the real tables, refreshes the daily
+    rollups for the days it covers, then empties it. Games are upserted
+    on their natural key, as in load.py."""
+
+    for statement in MERGE_STATEMENTS:
+        cur.execute(statement)
+
+    cur.execute("""SELECT DISTINCT website_id, release_date::date AS release_date
+                   FROM staging_game;""")
+    refresh_daily_stats({(row["website_id"], row["release_date"])
+                         for row in cur.fetchall()}, cur)
+
+    cur.execute("""TRUNCATE staging_game;""")
+
+
+def backfill(games: Iterable[GameRecord], conn: connection,
+             batch_size: int = BATCH_SIZE) -> int:
+    """Copies the games into the database in batches of batch_size,
+    committing after each batch is merged. Returns the number of
+    games read."""
+
+    games = iter(games)
+    total_rows = 0
+
+    with conn.cursor() as cur:
+        create_staging_table(cur)
+
+        while True:
+            stream = GameCopyStream(islice(games, batch_size))
+            cur.copy_expert(f"""COPY staging_game ({', '.join(STAGING_COLUMNS)})
+                            FROM STDIN;""", stream)
+            if stream.rows == 0:
+                break
+
+            merge_staging_table(cur)
+            record_load_run(stream.rows, cur)
+            conn.commit()
+            total_rows += stream.rows
+            print(f"Loaded {total_rows} games")
+
+    return total_rows
+
+
+if __name__ == "__main__":
+
+    load_dotenv()
+    db_conn = get_db_connection(ENV)
+    try:
+        backfill(iter_jsonl_games(sys.argv[1]), db_conn)
+    finally:
+        db_conn.close()
@@ -2,6 +2,8 @@
 
 import pytest
 
+from game_record import GameRecord, records_from_payload
+
 
 @pytest.fixture
 def test_game_data() -> list[list[list]]:
@@ -22,3 +24,9 @@ def test_game_data_no_dev_no_pub() -> list[list[list]]:
             None, "2000-11-29 14:48:00", 5, 2,
              ["A", "Great", "Game"], [1]]
             ]
+
+
+@pytest.fixture
+def test_game_records(test_game_data) -> list[GameRecord]:
+    """Returns the games in test_game_data as game records."""
+    return records_from_payload(test_game_data)
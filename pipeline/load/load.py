@@ -1,22 +1,73 @@
 """
-Given some input game data as a list[list] object, we load this data
-into our cloud-based database. Each embedded list should have values in the
-following order,
+Loads each website's games into our cloud-based database. The event is a
+list with one payload from payload.py per website, holding the games'
+columns and, once they are loaded, the watermark to save for the website.
 
-name: str; description: str; price: float; developer: str; publisher: str;
-release_date: str; rating: int; website_id: int; tags: list[str];
-platform: list[int].
+Each game in a payload is read into a GameRecord, with these fields:
+
+title: str; description: str; price: float; developer: str; publisher: str;
+release_date: datetime; rating: float; website_id: int; tags: list[str];
+platform_ids: list[int].
 """
-from datetime import datetime
+from collections.abc import Iterable, Iterator
+from itertools import islice
 from os import environ as ENV
 
 from psycopg2 import connect
-from psycopg2.extras import execute_values, RealDictCursor, RealDictRow
+from psycopg2.extras import execute_values, RealDictCursor
 from psycopg2.extensions import connection
 
+from blob_store import get_blob_store
+from game_record import GameRecord
+from payload import iter_records
+from watermark import Watermark, save_watermark
 from load_tag_exceptions import tag_exception_dict
 
 
+TAG_EXCEPTIONS = tag_exception_dict()
+
+# Games are read from a payload and inserted this many at a time, so a
+# large payload is never held as one list of records.
+LOAD_BATCH_SIZE = 1000
+
+# Tag names mapped to their tag_id. This lives for as long as the Lambda
+# container does, so warm invocations skip loading the tag table.
+TAG_IDS = {}
+
+NAME_TABLES = {"developer": ("developer_id", "developer_name"),
+               "publisher": ("publisher_id", "publisher_name"),
+               "tag": ("tag_id", "tag_name")}
+
+# Each statement takes the website_ids and release_dates of the days to
+# refresh as two arrays of the same length.
+DAILY_STATS_STATEMENTS = (
+    """DELETE FROM daily_game_stats AS s
+       USING unnest(%(website_ids)s::int[], %(release_dates)s::date[])
+             AS d (website_id, release_date)
+       WHERE s.website_id = d.website_id AND s.release_date = d.release_date;""",
+    """INSERT INTO daily_game_stats (website_id, release_date, game_count,
+                                     price_sum, rating_sum, rating_count)
+       SELECT g.website_id, g.release_date, COUNT(*), SUM(g.price),
+              COALESCE(SUM(g.rating), 0), COUNT(g.rating)
+       FROM game AS g
+       JOIN unnest(%(website_ids)s::int[], %(release_dates)s::date[])
+            AS d (website_id, release_date)
+       ON g.website_id = d.website_id AND g.release_date = d.release_date
+       GROUP BY g.website_id, g.release_date;""",
+    """DELETE FROM daily_tag_stats AS s
+       USING unnest(%(website_ids)s::int[], %(release_dates)s::date[])
+             AS d (website_id, release_date)
+       WHERE s.website_id = d.website_id AND s.release_date = d.release_date;""",
+    """INSERT INTO daily_tag_stats (website_id, release_date, tag_id, game_count)
+       SELECT g.website_id, g.release_date, gt.tag_id, COUNT(*)
+       FROM game AS g
+       JOIN unnest(%(website_ids)s::int[], %(release_dates)s::date[])
+            AS d (website_id, release_date)
+       ON g.website_id = d.website_id AND g.release_date = d.release_date
+       JOIN game_tag_matching AS gt ON gt.game_id = g.game_id
+       GROUP BY g.website_id, g.release_date, gt.tag_id;""")
+
+
 def get_db_connection(config) -> connection:
     """Returns a connection to the database."""
 
@@ -30,206 +81,274 @@ def get_db_connection(config) -> connection:
     )
 
 
-def format_release_date_dt(game_data: list[list]) -> list[list]:
-    """Given our game data, we format the release date as a datetime object."""
-
-    for game in game_data:
-        release_date = game[5]
-        game[5] = datetime.strptime(release_date, "%Y-%m-%d %H:%M:%S")
+def get_or_create_ids(names: set, table: str, cursor: connection.cursor) -> dict:
+    """Given a set of names for the developer, publisher or tag table, returns
+    a dict mapping each name to its id, inserting any names that are missing.
+    New names are inserted in one statement that skips names already in the
+    table, including ones a concurrent load has just inserted, and the ids
+    of those are then read in a second statement, which sees them."""
 
-    return game_data
+    if not names:
+        return {}
 
+    id_col, name_col = NAME_TABLES[table]
 
-def get_game_id_from_inputted_game(inputted_game: list,
-                                   cursor: connection.cursor) -> RealDictRow:
-    """Given a game that has already been inputted into the database, return its
-    matched game_id entry in the database."""
-    cursor.execute("""SELECT game_id FROM game
-                        WHERE name = %s;""", (inputted_game[0],))
+    # Inserting in a fixed order stops two loads from deadlocking.
+    rows = execute_values(cursor, f"""INSERT INTO {table} ({name_col}) VALUES %s
+                ON CONFLICT ({name_col}) DO NOTHING
+                RETURNING {id_col}, {name_col};""",
+                          [(name,) for name in sorted(names)], page_size=len(names),
+                          fetch=True)
+    ids = {row[name_col]: row[id_col] for row in rows}
 
-    game_id = cursor.fetchone()['game_id']
+    existing = names - ids.keys()
+    if existing:
+        cursor.execute(f"""SELECT {id_col}, {name_col} FROM {table}
+                           WHERE {name_col} = ANY(%s);""", (sorted(existing),))
+        ids.update({row[name_col]: row[id_col] for row in cursor.fetchall()})
 
-    return game_id
+    return ids
 
 
-def get_dev_id(input_game: list, cursor: connection.cursor) -> RealDictRow:
-    """Given a game, returns the corresponding developer_id entry if its developer 
-    name is in the developer table, and None otherwise."""
+def load_tag_ids(cursor: connection.cursor) -> dict:
+    """Loads the whole tag table into TAG_IDS, unless it has already been
+    loaded in this Lambda container. Returns TAG_IDS."""
 
-    cursor.execute("""SELECT developer_id FROM developer
-                        WHERE developer_name = %s;""", (input_game[3],))
+    if not TAG_IDS:
+        cursor.execute("""SELECT tag_id, tag_name FROM tag;""")
+        TAG_IDS.update({row['tag_name']: row['tag_id']
+                       for row in cursor.fetchall()})
 
-    developer_id_match = cursor.fetchone()
+    return TAG_IDS
 
-    return developer_id_match
 
+def get_tag_ids(tags: set, cursor: connection.cursor) -> dict:
+    """Given a set of formatted tag names, returns a dict mapping each to its
+    tag_id. Known tags come from TAG_IDS, and every unseen tag is inserted
+    in a single statement and added to TAG_IDS."""
 
-def input_game_dev_get_dev_id(input_game: list, conn: connection) -> int:
-    """For each game in our input data, we check if its associated developer is in the
-    developer table. If not, we input it into the developer table.
-    Returns the developer_id entry from the given developer name."""
+    known_tags = load_tag_ids(cursor)
 
-    with conn.cursor() as cur:
-
-        developer_id_match = get_dev_id(input_game, cur)
+    TAG_IDS.update(get_or_create_ids(tags - known_tags.keys(), "tag", cursor))
 
-        if developer_id_match is None:
+    return {tag: TAG_IDS[tag] for tag in tags}
 
-            cur.execute("""INSERT INTO developer (developer_name)
-                    VALUES (%s);""", (input_game[3],))
 
-            developer_id_match = get_dev_id(input_game, cur)
+def format_tag(tag: str, tag_exceptions: dict) -> str:
+    """Returns a tag name in the form it is stored in the tag table."""
 
-    conn.commit()
+    tag_formatted = tag.title()
 
-    return developer_id_match['developer_id']
+    return tag_exceptions.get(tag_formatted, tag_formatted)
 
 
-def get_pub_id(input_game: list, cursor: connection.cursor) -> RealDictRow:
-    """Given a game with a publisher entry, returns the corresponding publisher_id entry 
-    if its publisher name is in the publisher table, and None otherwise."""
+def get_natural_key(game: GameRecord) -> tuple:
+    """Returns the values that identify a game across loads: its name,
+    website_id and release date."""
 
-    cursor.execute("""SELECT publisher_id FROM publisher
-                        WHERE publisher_name = %s;""", (input_game[4],))
+    return (game.title, game.website_id, game.release_date.date())
 
-    publisher_id_match = cursor.fetchone()
-
-    return publisher_id_match
 
+def input_game_into_db(game_data: list[GameRecord], conn: connection) -> list[int]:
+    """Given our game data, we upsert each row into the game table, excluding
+    the platforms and tags. We convert developer name and publisher name into
+    their respective ids, resolving every distinct name in one batch.
+    Games already in the table are matched on their natural key, and are only
+    rewritten if their price, rating or description has changed, so loading
+    the same data twice changes nothing.
+    Returns the game_id of each game, in the same order."""
 
-def input_game_pub_get_pub_id(input_game: list, conn: connection) -> int:
-    """For each game in our input data, we check if its associated publisher is in the
-    publisher table. If not, we input it into the publisher table.
-    Returns the publisher_id entry from the given publisher name."""
+    unique_games = {}
 
     with conn.cursor() as cur:
 
-        publisher_id_match = get_pub_id(input_game, cur)
+        developer_ids = get_or_create_ids(
+            {game.developer for game in game_data if game.developer is not None},
+            "developer", cur)
+        publisher_ids = get_or_create_ids(
+            {game.publisher for game in game_data if game.publisher is not None},
+            "publisher", cur)
 
-        if publisher_id_match is None:
-
-            cur.execute("""INSERT INTO publisher (publisher_name)
-                    VALUES (%s);""", (input_game[4],))
-
-            publisher_id_match = get_pub_id(input_game, cur)
-
-    conn.commit()
-
-    return publisher_id_match['publisher_id']
+        for game in game_data:
 
+            unique_games[get_natural_key(game)] = [
+                game.title, game.description, game.price,
+                developer_ids.get(game.developer), publisher_ids.get(game.publisher),
+                game.release_date, game.rating, game.website_id]
+
+        initial_game_input = [[i] + game for i, game in enumerate(unique_games.values())]
+
+        upserted_games = execute_values(cur, """WITH input_game (ordinal, name, description,
+                price, developer_id, publisher_id, release_date, rating, website_id)
+                AS (VALUES %s),
+            upserted AS (
+                INSERT INTO game (name, description, price, developer_id,
+                                  publisher_id, release_date, rating, website_id)
+                SELECT name, description, price, developer_id, publisher_id,
+                       release_date, rating, website_id
+                FROM input_game
+                ON CONFLICT (name, website_id, release_date) DO UPDATE
+                SET description = EXCLUDED.description, price = EXCLUDED.price,
+                    rating = EXCLUDED.rating, developer_id = EXCLUDED.developer_id,
+                    publisher_id = EXCLUDED.publisher_id
+                WHERE (game.description, game.price, game.rating)
+                      IS DISTINCT FROM
+                      (EXCLUDED.description, EXCLUDED.price, EXCLUDED.rating)
+                RETURNING game_id, name, website_id, release_date)
+            SELECT i.ordinal, COALESCE(u.game_id, g.game_id) AS game_id
+            FROM input_game AS i
+            LEFT JOIN upserted AS u
+            ON u.name = i.name AND u.website_id = i.website_id
+            AND u.release_date = i.release_date
+            LEFT JOIN game AS g
+            ON g.name = i.name AND g.website_id = i.website_id
+            AND g.release_date = i.release_date
+            ORDER BY i.ordinal;""", initial_game_input,
+            template="(%s, %s, %s, %s::float, %s::int, %s::int, %s::date, %s::float, %s::int)",
+            page_size=len(initial_game_input), fetch=True)
+
+    game_ids = dict(zip(unique_games.keys(), [row['game_id'] for row in upserted_games]))
+
+    return [game_ids[get_natural_key(game)] for game in game_data]
+
+
+def input_game_plat_into_db(game_data: list[GameRecord], game_ids: list[int],
+                            conn: connection) -> None:
+    """For each game in our input data, we input all of its supported platforms
+    into the platform_assignment table, using the game_ids returned when the
+    games were inserted."""
 
-def input_game_into_db(game_data: list[list], conn: connection) -> None:
-    """Given our game data, we insert each row into the game table, excluding
-    the platforms and tags. We convert developer name and publisher name into
-    their respective ids."""
+    game_plat_input = []
 
-    initial_game_input = []
+    with conn.cursor() as cur:
 
-    for game in game_data:
+        for game, game_id in zip(game_data, game_ids):
 
-        if game[3] is not None:
-            game[3] = input_game_dev_get_dev_id(game, conn)
-        if game[4] is not None:
-            game[4] = input_game_pub_get_pub_id(game, conn)
+            for plat in game.platform_ids:
 
-        initial_game_input.append(game[:8])
+                game_plat_input.append([plat, game_id])
 
-    with conn.cursor() as cur:
-        execute_values(cur, """INSERT INTO game (name, description, price, 
-                       developer_id, publisher_id, release_date, rating, website_id)
-                       VALUES %s;""", initial_game_input)
+        if game_plat_input:
+            execute_values(cur, """INSERT INTO platform_assignment (platform_id, game_id)
+            VALUES %s ON CONFLICT (game_id, platform_id) DO NOTHING;""",
+                           game_plat_input, page_size=len(game_plat_input))
 
-    conn.commit()
 
+def input_game_tags_into_db(game_data: list[GameRecord], game_ids: list[int],
+                            conn: connection) -> None:
+    """For each game, we iterate through its tags. Where there are variations of tag names
+    different to each website, we refer to the constant variable TAG_EXCEPTIONS.
+    Tag ids come from the in-process tag cache, and any tags it has not seen
+    are inserted in one statement."""
 
-def input_game_plat_into_db(game_data: list[list], conn: connection) -> None:
-    """For each game in our input data, we input all of its supported platforms
-    into the platform_assignment table."""
+    game_tags = [list(dict.fromkeys(format_tag(tag, TAG_EXCEPTIONS) for tag in game.tags))
+                 for game in game_data]
 
-    game_plat_input = []
+    game_tag_input = []
 
     with conn.cursor() as cur:
 
-        for game in game_data:
+        tag_ids = get_tag_ids({tag for tags in game_tags for tag in tags}, cur)
 
-            game_id = get_game_id_from_inputted_game(game, cur)
+        for game_id, tags in zip(game_ids, game_tags):
 
-            game_plat_list = game[-1]
+            for tag in tags:
+                game_tag_input.append([game_id, tag_ids[tag]])
 
-            for plat in game_plat_list:
+        if game_tag_input:
+            execute_values(cur, """INSERT INTO game_tag_matching (game_id, tag_id)
+                        VALUES %s ON CONFLICT (game_id, tag_id) DO NOTHING;""",
+                           game_tag_input, page_size=len(game_tag_input))
 
-                game_plat_input.append([plat, game_id])
 
-        execute_values(cur, """INSERT INTO platform_assignment (platform_id, game_id)
-        VALUES %s;""", game_plat_input)
+def refresh_daily_stats(days: set[tuple], cursor: connection.cursor) -> None:
+    """Given a set of (website_id, release_date) days, recomputes their rows
+    in the daily_game_stats and daily_tag_stats rollups from the game table.
+    Only the given days are read, so this costs as much as the games on
+    those days, however many games there are in total."""
 
-    conn.commit()
+    if not days:
+        return
 
+    website_ids, release_dates = zip(*sorted(days))
+    params = {"website_ids": list(website_ids), "release_dates": list(release_dates)}
 
-def input_game_tags_into_db(game_data: list[list], conn: connection) -> None:
-    """For each game, we iterate through its tags. Where there are variations of tag names
-    different to each website, we refer to the constant variable TAG_EXCEPTIONS,
-    appending the tag iterand into the table if no similar entries are detected."""
+    for statement in DAILY_STATS_STATEMENTS:
+        cursor.execute(statement, params)
 
-    tag_exceptions = tag_exception_dict()
 
-    game_tag_input = []
+def iter_batches(games: Iterable[GameRecord],
+                 batch_size: int = LOAD_BATCH_SIZE) -> Iterator[list[GameRecord]]:
+    """Yields the games in lists of up to batch_size, reading only as many
+    as each list needs."""
 
-    with conn.cursor() as cur:
-        for game in game_data:
+    games = iter(games)
+    while batch := list(islice(games, batch_size)):
+        yield batch
 
-            game_id = get_game_id_from_inputted_game(game, cur)
 
-            game_tags = game[-2]
-            if len(game_tags) > 0:
+def load_games(games: Iterable[GameRecord], conn: connection,
+               batch_size: int = LOAD_BATCH_SIZE) -> int:
+    """Inserts the games, their platforms and their tags a batch at a time,
+    then refreshes the daily rollups for every website and day they were
+    released on. Nothing is committed. Returns the number of games."""
 
-                for tag in game_tags:
-                    tag_formatted = tag.title()
+    days = set()
+    game_count = 0
 
-                    if tag_formatted in tag_exceptions.keys():
-                        tag_formatted = tag_exceptions[tag_formatted]
+    for batch in iter_batches(games, batch_size):
 
-                    cur.execute("""SELECT tag_id FROM tag
-                                WHERE tag_name = %s""",
-                                (tag_formatted,))
+        game_ids = input_game_into_db(batch, conn)
 
-                    tag_id_match = cur.fetchone()
+        input_game_plat_into_db(batch, game_ids, conn)
 
-                    if tag_id_match is None:
-                        cur.execute("""INSERT INTO tag (tag_name)
-                                    VALUES (%s);""", (tag_formatted,))
+        input_game_tags_into_db(batch, game_ids, conn)
 
-                        cur.execute("""SELECT tag_id FROM tag
-                                    WHERE tag_name = %s;""", (tag_formatted,))
+        days.update((game.website_id, game.release_date.date()) for game in batch)
+        game_count += len(batch)
 
-                        tag_id_match = cur.fetchone()
+    with conn.cursor() as cur:
+        refresh_daily_stats(days, cur)
 
-                    tag_id = tag_id_match['tag_id']
+    return game_count
 
-                    game_tag_input.append([game_id, tag_id])
 
-        execute_values(cur, """INSERT INTO game_tag_matching (game_id, tag_id)
-                    VALUES %s;""", game_tag_input)
+def record_load_run(game_count: int, cursor: connection.cursor) -> None:
+    """Records a batch of games being loaded. The dashboard caches its
+    results until a new load run is committed."""
 
-    conn.commit()
+    cursor.execute("""INSERT INTO load_run (game_count) VALUES (%s);""", (game_count,))
 
 
-def handler(event: list[list[list]] = None, context=None) -> None:
-    """Takes in an event (ie. the combined game data) and context, and
-    loads the game data into the database."""
+def handler(event: list = None, context=None) -> None:
+    """Takes in an event (ie. each website's game payload) and context, and
+    loads the game data into the database. Each website's games are read
+    from its payload and inserted LOAD_BATCH_SIZE at a time, then committed
+    together in one transaction, along with the daily rollups for the
+    days they were released on and a load run recording the batch, and
+    only then is the website's watermark saved, so games from a failed
+    run are extracted again."""
 
+    blob_store = get_blob_store(ENV)
     conn = get_db_connection(ENV)
 
-    for game_data in event:
-
-        if len(game_data) > 0:
-
-            formatted_game_data = format_release_date_dt(game_data)
+    try:
+        for game_data in event:
 
-            input_game_into_db(formatted_game_data, conn)
+            game_count = load_games(iter_records(game_data, blob_store), conn)
 
-            input_game_plat_into_db(formatted_game_data, conn)
+            if game_count > 0:
 
-            input_game_tags_into_db(formatted_game_data, conn)
+                with conn.cursor() as cur:
+                    record_load_run(game_count, cur)
+                conn.commit()
 
-    conn.close()
+            if blob_store and isinstance(game_data, dict) and game_data.get("watermark"):
+                save_watermark(Watermark.from_dict(game_data["watermark"]), blob_store)
+    except Exception:
+        conn.rollback()
+        # Tags inserted by the failed batch were rolled back with it.
+        TAG_IDS.clear()
+        raise
+    finally:
+        conn.close()
@@ -0,0 +1,81 @@
+"""Contains unit tests for backfill.py"""
+import json
+
+from unittest.mock import MagicMock
+
+from game_record import GameRecord
+from backfill import (iter_jsonl_games, format_copy_row, format_array,
+                      GameCopyStream, backfill)
+
+
+def test_iter_jsonl_games(tmp_path, test_game_data):
+    """Asserts that every non-blank line of the file is read as a game."""
+
+    path = tmp_path / "games.jsonl"
+    path.write_text("\n".join(json.dumps(game) for game in test_game_data)
+                    + "\n\n", encoding="utf-8")
+
+    assert [game.to_list() for game in iter_jsonl_games(path)] == test_game_data
+
+
+def test_format_array_quotes_elements():
+    """Asserts that quotes and backslashes are escaped inside an array."""
+
+    assert format_array([]) == "{}"
+    assert format_array([1, 2]) == '{"1","2"}'
+    assert format_array(['a"b', "c\\"]) == '{"a\\"b","c\\\\"}'
+
+
+def test_format_copy_row(test_game_data_no_dev_no_pub):
+    """Asserts that a game is written as one tab separated line, with
+    missing values as NULL and tags formatted for the tag table."""
+
+    game = GameRecord.from_list(test_game_data_no_dev_no_pub[0])
+    game.description = "Line one\nLine\ttwo"
+
+    row = format_copy_row(game)
+
+    assert row.endswith("\n")
+    assert row.count("\n") == 1
+    assert row.split("\t") == ["Among Us", "Line one\\nLine\\ttwo", "4.99",
+                               "\\N", "\\N", "2000-11-29 14:48:00", "5", "2",
+                               '{"A","Great","Game"}', '{"1"}\n']
+
+
+def test_game_copy_stream_reads_in_chunks(test_game_records):
+    """Asserts that small reads return the same text as reading all of it,
+    and that rows are only formatted as they are needed."""
+
+    expected = "".join(format_copy_row(game) for game in test_game_records)
+    stream = GameCopyStream(test_game_records)
+
+    first_chunk = stream.read(5)
+    assert stream.rows == 1
+
+    chunks = [first_chunk]
+    while chunk := stream.read(5):
+        chunks.append(chunk)
+
+    assert "".join(chunks) == expected
+    assert stream.rows == 2
+
+
+def test_backfill_copies_and_merges_each_batch(test_game_records):
+    """Asserts that each batch is copied, merged, recorded as a load run
+    and committed, and that the final empty batch ends the backfill."""
+
+    mock_conn = MagicMock()
+    mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+    copied = []
+    mock_cursor.copy_expert.side_effect = lambda sql, stream: copied.append(
+        stream.read())
+
+    total = backfill(test_game_records * 3, mock_conn, batch_size=4)
+
+    assert total == 6
+    assert [chunk.count("\n") for chunk in copied] == [4, 2, 0]
+    assert mock_conn.commit.call_count == 2
+    statements = [call.args[0] for call in mock_cursor.execute.call_args_list]
+    assert sum("TRUNCATE staging_game" in statement for statement in statements) == 2
+    assert mock_cursor.execute.call_args.args == (
+        """INSERT INTO load_run (game_count) VALUES (%s);""", (2,))
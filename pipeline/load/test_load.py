@@ -2,55 +2,229 @@
 from datetime import datetime
 
 from unittest.mock import patch, MagicMock
+from pytest import raises
 from psycopg2.extras import execute_values, RealDictCursor, RealDictRow
 from psycopg2.extensions import connection
 
-from load import (format_release_date_dt, input_game_dev_get_dev_id,
-                  input_game_pub_get_pub_id, input_game_into_db)
+from game_record import records_from_payload
+from payload import encode_payload
+from blob_store import LocalBlobStore
+from watermark import Watermark, read_watermark
+from load import (input_game_into_db, get_or_create_ids, format_tag,
+                  input_game_plat_into_db, input_game_tags_into_db,
+                  get_tag_ids, load_games, refresh_daily_stats,
+                  handler, TAG_IDS)
 
 
-def test_format_release_date_dt(test_game_data):
-    """Asserts that the function format_release_date_dt()
-    formats every timestamp string into a datetime object."""
-    formatted_game_data = format_release_date_dt(test_game_data)
+@patch("load.input_game_tags_into_db")
+@patch("load.input_game_plat_into_db")
+@patch("load.input_game_into_db")
+@patch("load.get_db_connection")
+def test_handler_reads_payload_into_records(mock_connection, mock_games, mock_plats,
+                                            mock_tags, test_game_data, test_game_records):
+    """Asserts that the handler reads each website's payload into records
+    with datetime release dates, and commits each website's batch with a
+    load run recording it."""
+
+    mock_games.return_value = [11, 12]
+
+    handler([encode_payload(test_game_records), encode_payload([]), test_game_data])
+
+    assert mock_games.call_count == 2
+    games = mock_games.call_args_list[0].args[0]
+    assert [game.title for game in games] == ["Stardew Valley", "Minecraft"]
+    assert all(isinstance(game.release_date, datetime) for game in games)
+    assert mock_games.call_args_list[1].args[0] == games
+    mock_plats.assert_called_with(games, [11, 12], mock_connection.return_value)
+    assert mock_connection.return_value.commit.call_count == 2
+    mock_execute = mock_connection.return_value.cursor().__enter__().execute
+    assert [call.args[1] for call in mock_execute.call_args_list
+            if "load_run" in call.args[0]] == [(2,), (2,)]
+
+
+@patch("load.input_game_tags_into_db")
+@patch("load.input_game_plat_into_db")
+@patch("load.input_game_into_db")
+@patch("load.get_db_connection")
+def test_handler_saves_watermark_after_commit(mock_connection, mock_games, mock_plats,
+                                              mock_tags, test_game_records, tmp_path,
+                                              monkeypatch):
+    """Asserts that each website's watermark is saved once its games are
+    committed, and not saved when the batch fails."""
 
-    m = len(formatted_game_data)
+    monkeypatch.setenv("PAYLOAD_DIR", str(tmp_path))
+    blob_store = LocalBlobStore(str(tmp_path))
+    steam_watermark = Watermark("steam", datetime.now(), ["/app/1/"])
+    gog_watermark = Watermark("gog", datetime.now(), ["/en/game/a"])
+    steam_payload = encode_payload(test_game_records)
+    steam_payload["watermark"] = steam_watermark.to_dict()
+    gog_payload = encode_payload(test_game_records)
+    gog_payload["watermark"] = gog_watermark.to_dict()
+    mock_games.side_effect = [[11, 12], ValueError("database error")]
 
-    for i in range(m):
-        assert isinstance(formatted_game_data[i][5], datetime) == True
+    with raises(ValueError):
+        handler([steam_payload, gog_payload])
 
+    assert read_watermark("steam", blob_store) == steam_watermark
+    assert read_watermark("gog", blob_store) != gog_watermark
+    assert mock_connection.return_value.commit.call_count == 1
 
-@patch("load.get_db_connection")
-def test_input_game_dev_get_dev_id(mock_connection, test_game_data):
-    """Asserts that the database is accessed upon inputting game data
-    into input_game_dev_get_dev_id()."""
+
+@patch("load.execute_values")
+def test_get_or_create_ids(mock_execute_values):
+    """Asserts that get_or_create_ids inserts every new name in one statement,
+    reads the ids of names already in the table in another, and maps names
+    to ids."""
+
+    mock_cursor = MagicMock()
+    mock_execute_values.return_value = [{"developer_id": 7, "developer_name": "ConcernedApe"}]
+    mock_cursor.fetchall.return_value = [{"developer_id": 1, "developer_name": "Mojang"}]
+
+    result = get_or_create_ids({"Mojang", "ConcernedApe"}, "developer", mock_cursor)
+
+    assert result == {"Mojang": 1, "ConcernedApe": 7}
+    assert mock_execute_values.call_count == 1
+    assert "ON CONFLICT (developer_name) DO NOTHING" in mock_execute_values.call_args.args[1]
+    assert mock_cursor.execute.call_args.args[1] == (["Mojang"],)
+
+
+@patch("load.execute_values")
+def test_get_or_create_ids_all_new(mock_execute_values):
+    """Asserts that no names are read back when every name was inserted."""
+
+    mock_cursor = MagicMock()
+    mock_execute_values.return_value = [{"tag_id": 3, "tag_name": "Indie"}]
+
+    assert get_or_create_ids({"Indie"}, "tag", mock_cursor) == {"Indie": 3}
+    mock_cursor.execute.assert_not_called()
+
+
+@patch("load.execute_values")
+def test_get_or_create_ids_no_names(mock_execute_values):
+    """Asserts that no query is run when there are no names to resolve."""
+
+    assert get_or_create_ids(set(), "tag", MagicMock()) == {}
+    mock_execute_values.assert_not_called()
+
+
+@patch("load.get_or_create_ids")
+@patch("load.execute_values")
+def test_input_game_into_db(mock_execute_values, mock_get_ids, test_game_records):
+    """Asserts that input_game_into_db swaps developer and publisher names
+    for ids, and inserts every game in one statement."""
+
+    mock_get_ids.side_effect = lambda names, table, cur: {
+        name: i for i, name in enumerate(sorted(names))}
+    mock_execute_values.return_value = [{"ordinal": 0, "game_id": 11},
+                                        {"ordinal": 1, "game_id": 12}]
+
+    game_ids = input_game_into_db(test_game_records, MagicMock())
+
+    assert game_ids == [11, 12]
+    assert mock_get_ids.call_count == 2
+    inserted = mock_execute_values.call_args.args[2]
+    assert [game[4:6] for game in inserted] == [[0, 0], [1, 1]]
+    assert "ON CONFLICT (name, website_id, release_date)" in mock_execute_values.call_args.args[1]
+
+
+@patch("load.get_or_create_ids")
+@patch("load.execute_values")
+def test_input_game_into_db_duplicates(mock_execute_values, mock_get_ids, test_game_data):
+    """Asserts that a game repeated within a batch is only upserted once,
+    and both copies get its game_id."""
+
+    mock_get_ids.side_effect = lambda names, table, cur: {name: 1 for name in names}
+    mock_execute_values.return_value = [{"ordinal": 0, "game_id": 11},
+                                        {"ordinal": 1, "game_id": 12}]
+    games = records_from_payload(test_game_data + [test_game_data[0]])
+
+    game_ids = input_game_into_db(games, MagicMock())
+
+    assert game_ids == [11, 12, 11]
+    assert len(mock_execute_values.call_args.args[2]) == 2
+
+
+@patch("load.execute_values")
+def test_input_game_plat_into_db(mock_execute_values, test_game_records):
+    """Asserts that platforms are matched to the game_ids passed in,
+    without looking games up by name."""
 
     mock_connection = MagicMock()
 
-    mock_cursor = mock_connection.cursor()
+    input_game_plat_into_db(test_game_records, [11, 12], mock_connection)
 
-    mock_execute = mock_cursor.__enter__().execute
+    assert mock_execute_values.call_args.args[2] == [
+        [1, 11], [2, 11], [3, 11], [1, 12], [2, 12], [3, 12]]
+    mock_connection.cursor().__enter__().execute.assert_not_called()
 
-    for game in test_game_data:
 
-        input_game_dev_get_dev_id(game, mock_connection)
+@patch("load.get_tag_ids")
+@patch("load.execute_values")
+def test_input_game_tags_into_db(mock_execute_values, mock_get_ids, test_game_records):
+    """Asserts that tags are matched to the game_ids passed in."""
 
-        mock_execute.assert_called()
+    mock_get_ids.return_value = {"A": 1, "Great": 2, "Game": 3,
+                                 "Herobrine": 4, "Chicken": 5}
 
+    input_game_tags_into_db(test_game_records, [11, 12], MagicMock())
+
+    assert mock_get_ids.call_count == 1
+    assert mock_execute_values.call_args.args[2] == [
+        [11, 1], [11, 2], [11, 3], [12, 4], [12, 5]]
 
-@patch("load.get_db_connection")
-def test_input_game_pub_get_pub_id(mock_connection, test_game_data):
-    """Asserts that the database is accessed upon inputting game data
-    into input_game_pub_get_pub_id()."""
+
+@patch("load.input_game_tags_into_db")
+@patch("load.input_game_plat_into_db")
+@patch("load.input_game_into_db")
+def test_load_games(mock_games, mock_plats, mock_tags, test_game_records):
+    """Asserts that games are inserted a batch at a time as they are read,
+    and the rollups are refreshed once for each distinct website and day
+    the games were released on."""
 
     mock_connection = MagicMock()
+    mock_execute = mock_connection.cursor().__enter__().execute
+    mock_games.side_effect = lambda batch, conn: list(range(len(batch)))
+
+    game_count = load_games(iter(test_game_records * 2), mock_connection, batch_size=3)
+
+    assert game_count == 4
+    assert [len(call.args[0]) for call in mock_games.call_args_list] == [3, 1]
+    assert mock_tags.call_count == 2
+    assert mock_execute.call_count == 4
+    params = mock_execute.call_args.args[1]
+    assert sorted(zip(params["website_ids"], params["release_dates"])) == sorted(
+        {(game.website_id, game.release_date.date()) for game in test_game_records})
+
+
+def test_refresh_daily_stats_no_days():
+    """Asserts that nothing is sent to the database without any days."""
+
+    mock_cursor = MagicMock()
+    refresh_daily_stats(set(), mock_cursor)
+    mock_cursor.execute.assert_not_called()
+
+
+def test_format_tag():
+    """Asserts that tags are title-cased and mapped through the exceptions."""
+
+    assert format_tag("single player", {"Single Player": "Singleplayer"}) == "Singleplayer"
+    assert format_tag("action", {}) == "Action"
 
-    mock_cursor = mock_connection.cursor()
 
-    mock_execute = mock_cursor.__enter__().execute
+@patch.dict(TAG_IDS, clear=True)
+@patch("load.get_or_create_ids")
+def test_get_tag_ids_caches_tags(mock_get_ids):
+    """Asserts that the tag table is loaded once, and only unseen tags
+    are sent to the database."""
 
-    for game in test_game_data:
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [{"tag_id": 1, "tag_name": "Indie"}]
+    mock_get_ids.return_value = {"Horror": 2}
 
-        input_game_pub_get_pub_id(game, mock_connection)
+    assert get_tag_ids({"Indie", "Horror"}, mock_cursor) == {"Indie": 1, "Horror": 2}
+    mock_get_ids.assert_called_once_with({"Horror"}, "tag", mock_cursor)
 
-        mock_execute.assert_called()
+    mock_get_ids.return_value = {}
+    assert get_tag_ids({"Indie", "Horror"}, mock_cursor) == {"Indie": 1, "Horror": 2}
+    assert mock_cursor.execute.call_count == 1
+    mock_get_ids.assert_called_with(set(), "tag", mock_cursor)
@@ -5,6 +5,10 @@ from os import environ as ENV
 from dotenv import load_dotenv
 from boto3 import client
 
+from blob_store import BlobStore, get_blob_store
+from game_record import GameRecord
+from payload import iter_records
+
 TAG_ARNS = {'Action': 'arn:aws:sns:eu-west-2:129033205317:c10-games-action-tag',
             'Adventure': 'arn:aws:sns:eu-west-2:129033205317:c10-games-adventure-tag',
             'Indie': 'arn:aws:sns:eu-west-2:129033205317:c10-games-indie-tag',
@@ -40,33 +44,32 @@ def send_sns(topic: str, games: list, config) -> None:
     print(f'sent {topic} email')
 
 
-def format_games_into_list(games: list) -> list:
-    '''Takes a list of lists of list and formats this
-    for easy manipulation. Returns a list of games with their
-    titles, descriptions and tags.'''
+def format_games_into_list(games: list, blob_store: BlobStore = None) -> list[GameRecord]:
+    '''Takes each website's game payload and formats this
+    for easy manipulation. Returns a single list of game records.'''
     single_list = []
-    for list in games:
-        single_list += list
-    return [[l[0], l[1], l[8]] for l in single_list]
+    for game_data in games:
+        single_list.extend(iter_records(game_data, blob_store))
+    return single_list
 
 
-def format_games_into_string(games: list) -> str:
+def format_games_into_string(games: list[GameRecord]) -> str:
     '''Takes a list of games and turns it into a string which can be used
     in our email.'''
     str_output = ''
     for game in games:
-        str_output += '👾 ' + game[0] + '\n' + game[1] + '\n\n'
+        str_output += '👾 ' + game.title + '\n' + game.description + '\n\n'
     return str_output
 
 
 def handler(event=None, context=None):
     '''Sends messages when receives data.'''
     games_unformatted = event
-    games_formatted = format_games_into_list(games_unformatted)
+    games_formatted = format_games_into_list(games_unformatted, get_blob_store(ENV))
 
     topics = list(TAG_ARNS.keys())
     for topic in topics:
-        games_list = [l for l in games_formatted if topic in l[2]]
+        games_list = [game for game in games_formatted if topic in game.tags]
 
         if None not in games_list and len(games_list) > 0:
             games_string = format_games_into_string(games_list)
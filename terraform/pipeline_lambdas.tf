@@ -17,6 +17,66 @@ resource "aws_iam_role" "lambda-role" {
 }
 
 
+resource "aws_s3_bucket" "pipeline-payloads" {
+  bucket = "c10-games-pipeline-payloads"
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "pipeline-payloads-expiry" {
+  bucket = aws_s3_bucket.pipeline-payloads.id
+
+  rule {
+    id     = "expire-payloads"
+    status = "Enabled"
+
+    filter {
+      prefix = "payloads/"
+    }
+
+    expiration {
+      days = 1
+    }
+  }
+
+  # Cached game pages are revalidated on every run, so an entry only
+  # expires once its game has not been seen for a month.
+  rule {
+    id     = "expire-response-cache"
+    status = "Enabled"
+
+    filter {
+      prefix = "response-cache/"
+    }
+
+    expiration {
+      days = 30
+    }
+  }
+}
+
+data "aws_iam_policy_document" "lambda-payloads-policy" {
+  statement {
+    effect    = "Allow"
+    actions   = ["s3:GetObject", "s3:PutObject"]
+    resources = ["${aws_s3_bucket.pipeline-payloads.arn}/payloads/*",
+                 "${aws_s3_bucket.pipeline-payloads.arn}/watermarks/*",
+                 "${aws_s3_bucket.pipeline-payloads.arn}/response-cache/*"]
+  }
+  # Without ListBucket, S3 answers a GET for a missing key (such as the
+  # first run's watermark) with 403 AccessDenied instead of 404.
+  statement {
+    effect    = "Allow"
+    actions   = ["s3:ListBucket"]
+    resources = [aws_s3_bucket.pipeline-payloads.arn]
+  }
+}
+
+resource "aws_iam_role_policy" "lambda-payloads" {
+  name   = "c10-games-terraform-pipeline-payloads"
+  role   = aws_iam_role.lambda-role.id
+  policy = data.aws_iam_policy_document.lambda-payloads-policy.json
+}
+
+
 
 
 data "aws_ecr_repository" "lambda-ecr-repo-steam" {
@@ -36,7 +96,9 @@ resource "aws_lambda_function" "c10-games-terraform-pipeline-steam" {
     image_uri = data.aws_ecr_image.lambda-image-steam.image_uri
     environment {
         variables = {
-          STEAM_BASE_URL = var.STEAM_BASE_URL       
+          STEAM_BASE_URL = var.STEAM_BASE_URL,
+          PAYLOAD_BUCKET = aws_s3_bucket.pipeline-payloads.bucket,
+          RESPONSE_CACHE_BUCKET = aws_s3_bucket.pipeline-payloads.bucket
         }
     }
     timeout = 300
@@ -61,7 +123,9 @@ resource "aws_lambda_function" "c10-games-terraform-pipeline-gog" {
     image_uri = data.aws_ecr_image.lambda-image-gog.image_uri
     environment {
         variables = {
-          GOG_BASE_URL = var.GOG_BASE_URL       
+          GOG_BASE_URL = var.GOG_BASE_URL,
+          PAYLOAD_BUCKET = aws_s3_bucket.pipeline-payloads.bucket,
+          RESPONSE_CACHE_BUCKET = aws_s3_bucket.pipeline-payloads.bucket
         }
     }
     timeout = 180
@@ -86,7 +150,8 @@ resource "aws_lambda_function" "c10-games-terraform-pipeline-epic" {
     image_uri = data.aws_ecr_image.lambda-image-epic.image_uri
     environment {
         variables = {
-          EPIC_BASE_URL = var.EPIC_BASE_URL       
+          EPIC_BASE_URL = var.EPIC_BASE_URL,
+          PAYLOAD_BUCKET = aws_s3_bucket.pipeline-payloads.bucket
         }
     }
     timeout = 180
@@ -111,7 +176,8 @@ resource "aws_lambda_function" "c10-games-terraform-alert" {
     environment {
         variables = {
         AWS_KEY = var.AWS_KEY,
-        AWS_SECRET = var.AWS_SECRET
+        AWS_SECRET = var.AWS_SECRET,
+        PAYLOAD_BUCKET = aws_s3_bucket.pipeline-payloads.bucket
         }
     }
     timeout = 10
@@ -138,7 +204,8 @@ resource "aws_lambda_function" "c10-games-terraform-load" {
         DB_PASSWORD = var.DB_PASSWORD,
         DB_PORT = var.DB_PORT,
         DB_USER = var.DB_USER,
-        DB_NAME = var.DB_NAME
+        DB_NAME = var.DB_NAME,
+        PAYLOAD_BUCKET = aws_s3_bucket.pipeline-payloads.bucket
         }
     }
     timeout = 120
@@ -58,10 +58,10 @@ class StatsRetriever():
     def total_num_games_released(self) -> int:
         """Returns the total number of games released this week (including duplicates)."""
         with self.conn.cursor() as cur:
-            cur.execute("""SELECT count(name)
-                        FROM game AS g
-                        WHERE g.release_date >= CURRENT_DATE - INTERVAL '7 days'
-                        AND g.release_date <= CURRENT_DATE AND g.website_id IN %s
+            cur.execute("""SELECT COALESCE(SUM(s.game_count), 0) AS count
+                        FROM daily_game_stats AS s
+                        WHERE s.release_date >= CURRENT_DATE - INTERVAL '7 days'
+                        AND s.release_date <= CURRENT_DATE AND s.website_id IN %s
                         """, (self.website_ids,))
             num_games = cur.fetchone()['count']
             return num_games
@@ -69,10 +69,10 @@ class StatsRetriever():
     def num_games_over_week(self):
         """Returns a chart of the number of games released over the week(per day)."""
         with self.conn.cursor() as cur:
-            cur.execute("""SELECT count(g.name), g.release_date
-                            FROM game AS g
-                            WHERE g.release_date >= CURRENT_DATE - INTERVAL '7 days'
-                            AND g.release_date <= CURRENT_DATE AND g.website_id IN %s GROUP BY g.release_date;
+            cur.execute("""SELECT SUM(s.game_count) AS count, s.release_date
+                            FROM daily_game_stats AS s
+                            WHERE s.release_date >= CURRENT_DATE - INTERVAL '7 days'
+                            AND s.release_date <= CURRENT_DATE AND s.website_id IN %s GROUP BY s.release_date;
                             """, (self.website_ids,))
             games = cur.fetchall()
             games = pd.DataFrame(games)
@@ -101,24 +101,24 @@ class StatsRetriever():
         """Returns the average price of the games from the week."""
         with self.conn.cursor() as cur:
             cur.execute(
-                """SELECT ROUND(AVG(CAST(g.price AS numeric)), 2)
-                AS avg_price FROM game AS g
+                """SELECT ROUND(CAST(SUM(s.price_sum) / SUM(s.game_count) AS numeric), 2)
+                AS avg_price FROM daily_game_stats AS s
                 WHERE
-                g.release_date >= CURRENT_DATE - INTERVAL '7 days'
-                AND g.release_date <= CURRENT_DATE AND g.website_id IN %s;""", (self.website_ids,))
+                s.release_date >= CURRENT_DATE - INTERVAL '7 days'
+                AND s.release_date <= CURRENT_DATE AND s.website_id IN %s;""", (self.website_ids,))
             avg_price = cur.fetchone()['avg_price']
             return avg_price
 
     def num_games_per_website(self):
         """Returns a pie chart of the number of games released according to website."""
         with self.conn.cursor() as cur:
-            cur.execute("""SELECT w.website_name, count(*) AS num_games
-                         FROM game as g
+            cur.execute("""SELECT w.website_name, SUM(s.game_count) AS num_games
+                         FROM daily_game_stats as s
                          LEFT JOIN website AS w
-                        ON (g.website_id = w.website_id)
-                         WHERE g.release_date >= CURRENT_DATE - INTERVAL '7 days'
-                         AND g.release_date <= CURRENT_DATE
-                        AND g.website_id IN %s GROUP BY w.website_name ;""", (self.website_ids,))
+                        ON (s.website_id = w.website_id)
+                         WHERE s.release_date >= CURRENT_DATE - INTERVAL '7 days'
+                         AND s.release_date <= CURRENT_DATE
+                        AND s.website_id IN %s GROUP BY w.website_name ;""", (self.website_ids,))
             games = cur.fetchall()
             games = pd.DataFrame(games)
             pie_chart = alt.Chart(games, title='Website-game ratio').mark_arc().encode(
@@ -138,9 +138,11 @@ class StatsRetriever():
     def top_five_tags(self) -> list[str]:
         """Returns the top five tags of this weeks games."""
         with self.conn.cursor() as cur:
-            cur.execute("""SELECT t.tag_name, count(*) from tag AS t INNER JOIN game_tag_matching AS gt ON(t.tag_id=gt.tag_id) WHERE gt.game_id IN
-                        (SELECT game_id from game AS g WHERE g.release_date >= CURRENT_DATE - INTERVAL '7 days'
-                        AND g.release_date <= CURRENT_DATE AND g.website_id IN %s) GROUP BY t.tag_name ORDER BY count(*) DESC LIMIT 5;
+            cur.execute("""SELECT t.tag_name, SUM(s.game_count) AS count FROM daily_tag_stats AS s
+                        INNER JOIN tag AS t ON (t.tag_id = s.tag_id)
+                        WHERE s.release_date >= CURRENT_DATE - INTERVAL '7 days'
+                        AND s.release_date <= CURRENT_DATE AND s.website_id IN %s
+                        GROUP BY t.tag_name ORDER BY SUM(s.game_count) DESC LIMIT 5;
                         """, (self.website_ids,))
             tags = cur.fetchall()
             tag_list = []
@@ -152,9 +154,11 @@ class StatsRetriever():
     def tag_game_ratio(self):
         """Returns the proportion of tags in the form of a pie-chart."""
         with self.conn.cursor() as cur:
-            cur.execute("""SELECT t.tag_name, count(*) from tag AS t INNER JOIN game_tag_matching AS gt ON(t.tag_id=gt.tag_id) WHERE gt.game_id IN
-                        (SELECT game_id from game AS g WHERE g.release_date >= CURRENT_DATE - INTERVAL '7 days'
-                        AND g.release_date <= CURRENT_DATE AND g.website_id IN %s) GROUP BY t.tag_name ORDER BY count(*) DESC LIMIT 5;
+            cur.execute("""SELECT t.tag_name, SUM(s.game_count) AS count FROM daily_tag_stats AS s
+                        INNER JOIN tag AS t ON (t.tag_id = s.tag_id)
+                        WHERE s.release_date >= CURRENT_DATE - INTERVAL '7 days'
+                        AND s.release_date <= CURRENT_DATE AND s.website_id IN %s
+                        GROUP BY t.tag_name ORDER BY SUM(s.game_count) DESC LIMIT 5;
                         """, (self.website_ids,))
             tags = cur.fetchall()
             tags = pd.DataFrame(tags)
@@ -193,11 +197,11 @@ class StatsRetriever():
     def average_rating(self) -> float:
         """Returns the average rating of this weeks games."""
         with self.conn.cursor() as cur:
-            cur.execute("""SELECT ROUND(AVG(CAST(rating AS numeric)), 2)
-                AS avg_rating
-                        FROM game AS g
-                        WHERE g.release_date >= CURRENT_DATE - INTERVAL '7 days'
-                        AND g.release_date <= CURRENT_DATE AND g.website_id IN %s;""", (self.website_ids,))
+            cur.execute("""SELECT ROUND(CAST(SUM(s.rating_sum) / NULLIF(SUM(s.rating_count), 0)
+                AS numeric), 2) AS avg_rating
+                        FROM daily_game_stats AS s
+                        WHERE s.release_date >= CURRENT_DATE - INTERVAL '7 days'
+                        AND s.release_date <= CURRENT_DATE AND s.website_id IN %s;""", (self.website_ids,))
             rating = cur.fetchone()['avg_rating']
             return rating
 
@@ -246,9 +250,11 @@ class StatsRetriever():
         """Returns the result of a sql query which returns tags and the
           number of times it occurs in set of website ids.."""
         with self.conn.cursor() as cur:
-            cur.execute("""SELECT t.tag_name, count(*) from tag AS t INNER JOIN game_tag_matching AS gt ON(t.tag_id=gt.tag_id) WHERE gt.game_id IN
-                        (SELECT game_id from game AS g WHERE g.release_date >= CURRENT_DATE - INTERVAL '7 days'
-                        AND g.release_date <= CURRENT_DATE AND g.website_id IN %s) GROUP BY t.tag_name ORDER BY count(*) DESC;
+            cur.execute("""SELECT t.tag_name, SUM(s.game_count) AS count FROM daily_tag_stats AS s
+                        INNER JOIN tag AS t ON (t.tag_id = s.tag_id)
+                        WHERE s.release_date >= CURRENT_DATE - INTERVAL '7 days'
+                        AND s.release_date <= CURRENT_DATE AND s.website_id IN %s
+                        GROUP BY t.tag_name ORDER BY SUM(s.game_count) DESC;
                         """, (self.website_ids,))
             tags_word_count = cur.fetchall()
             return tags_word_count